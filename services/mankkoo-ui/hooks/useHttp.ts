@@ -94,20 +94,51 @@ export function patchJson(apiPath: string, body: {[key: string]: unknown}, succe
     })
 }
 
+type ImportJobStatus = {
+    jobId: string;
+    status: 'queued' | 'running' | 'succeeded' | 'failed';
+    rowsParsed: number;
+    rowsStored: number;
+    error?: string;
+}
+
+const importJobPollIntervalMs = 1000;
+
 export function uploadFile(apiPath: string, file: File) {
     const data = new FormData();
     data.set('operations', file);
 
-    axios.post(`${API_BASE}/${apiPath.replace(/^\//, '')}`,
+    axios.post<{jobId?: string}>(`${API_BASE}/${apiPath.replace(/^\//, '')}`,
         data,
         { headers: {
             'Content-Type': 'multipart/form-data',
             'Content-Length': `${file.size}`,
         }} )
-    .then(_ => {
+    .then(response => {
+        if (!response.data.jobId) {
+            return undefined;
+        }
+        MySwal.fire({
+            title: 'Importing...',
+            text: 'File was uploaded, its operations are being imported',
+            allowOutsideClick: false,
+            didOpen: () => MySwal.showLoading()
+        });
+        return waitForImportJob(response.data.jobId);
+    })
+    .then(job => {
+        if (job?.status === 'failed') {
+            MySwal.fire({
+                title: 'Error!',
+                text: `Import of the file has failed: ${job.error}`,
+                icon: 'error',
+                confirmButtonText: 'Ok'
+            })
+            return;
+        }
         MySwal.fire({
             title: 'Success!',
-            text: 'File uploaded correctly',
+            text: job ? `File imported correctly, ${job.rowsStored} new operation(s) were added` : 'File uploaded correctly',
             icon: 'success',
             confirmButtonText: 'Cool'})
     })
@@ -121,3 +152,13 @@ export function uploadFile(apiPath: string, file: File) {
         })
     });
 }
+
+async function waitForImportJob(jobId: string): Promise<ImportJobStatus> {
+    while (true) {
+        const response = await axios.get<ImportJobStatus>(`${API_BASE}/accounts/imports/${jobId}`);
+        if (response.data.status === 'succeeded' || response.data.status === 'failed') {
+            return response.data;
+        }
+        await new Promise(resolve => setTimeout(resolve, importJobPollIntervalMs));
+    }
+}
@@ -0,0 +1,257 @@
+"""Measures phases of importing bank statements (account.add_new_operations) against a local Postgres.
+
+Each run imports a synthetic statement into a new account, in a separate process, so that its peak RSS
+isn't affected by other runs. For each phase (parse, format, deduplicate, prepare events, store) wall
+time, number of database queries and peak RSS at its end are reported.
+
+Runs use the DB_* variables, except for DB_NAME - a database is given with the required --database
+flag. It's created if missing and its tables are truncated before each run, so a database which
+already exists, but wasn't created by the benchmark, is refused. From within the `services/mankkoo` folder:
+
+    uv run python -m benchmarks.import_benchmark --database mankkoo_benchmark --sizes 1000,10000,100000,1000000
+    uv run python -m benchmarks.import_benchmark --database mankkoo_benchmark --output results.json
+    uv run python -m benchmarks.import_benchmark --database mankkoo_benchmark --baseline results.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import uuid
+
+stages = ["parsed", "formatted", "deduplicated", "prepared", "stored"]
+
+database_comment = "mankkoo import benchmark"
+"""Comment of databases created by the benchmark, only their tables are truncated"""
+
+
+class QueryCounter:
+    """Counts statements executed through pooled connections, i.e. database round-trips."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def install(self) -> None:
+        import mankkoo.database as db
+
+        counter = self
+
+        class CountingCursor:
+            def __init__(self, cursor):
+                self._cursor = cursor
+
+            def execute(self, *args, **kwargs):
+                counter.queries += 1
+                return self._cursor.execute(*args, **kwargs)
+
+            def executemany(self, query, params_list):
+                params_list = list(params_list)
+                counter.queries += len(params_list)
+                return self._cursor.executemany(query, params_list)
+
+            def __getattr__(self, name):
+                return getattr(self._cursor, name)
+
+            def __iter__(self):
+                return iter(self._cursor)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return self._cursor.__exit__(*args)
+
+        db.PooledConnection.cursor = lambda conn, *args, **kwargs: CountingCursor(
+            conn.raw.cursor(*args, **kwargs)
+        )
+
+
+class PhaseRecorder:
+    """ImportProgress callback, which adds time and queries since the previous report to a reported stage."""
+
+    def __init__(self, counter: QueryCounter):
+        self.counter = counter
+        self.phases = {stage: empty_phase() for stage in stages}
+        self._last_report_at = time.perf_counter()
+        self._last_queries = counter.queries
+
+    def __call__(self, stage: str, rows: int, total: int | None) -> None:
+        now = time.perf_counter()
+        phase = self.phases.setdefault(stage, empty_phase())
+        phase["seconds"] += now - self._last_report_at
+        phase["queries"] += self.counter.queries - self._last_queries
+        phase["rows"] = rows
+        phase["peakRssMb"] = peak_rss_mb()
+        self._last_report_at = now
+        self._last_queries = self.counter.queries
+
+
+def empty_phase() -> dict:
+    return {"seconds": 0.0, "queries": 0, "rows": 0, "peakRssMb": 0.0}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run(bank_code: str, rows: int, chunksize: int) -> dict:
+    """Imports a synthetic statement of a bank with a given number of rows, in the current process."""
+    os.environ["IMPORT_CHUNK_SIZE"] = str(chunksize)
+
+    import mankkoo.account.account as account
+    import mankkoo.database as db
+    import mankkoo.event_store as es
+    from benchmarks.statements import generators
+    from mankkoo.account.models import Bank
+
+    bank = Bank[bank_code]
+    contents = generators[bank](rows)
+
+    db.execute(
+        "TRUNCATE events, streams, views, stream_daily_balance, stream_current_state, operation_fingerprints;"
+    )
+    stream = es.Stream(
+        uuid.uuid4(),
+        "account",
+        "checking",
+        "Benchmark account",
+        "Benchmark bank",
+        True,
+        0,
+        {"importer": bank.value},
+    )
+    es.create([stream])
+
+    counter = QueryCounter()
+    counter.install()
+    recorder = PhaseRecorder(counter)
+    started_at = time.perf_counter()
+    account.add_new_operations(str(stream.id), contents=contents, progress=recorder)
+    seconds = time.perf_counter() - started_at
+
+    return {
+        "bank": bank.value,
+        "rows": rows,
+        "chunksize": chunksize,
+        "seconds": seconds,
+        "queries": counter.queries,
+        "peakRssMb": peak_rss_mb(),
+        "phases": recorder.phases,
+    }
+
+
+def __ensure_database() -> None:
+    import psycopg2
+
+    import mankkoo.database as db
+    import mankkoo.schema as schema
+
+    params = db.connection_params()
+    name = params["database"]
+    conn = psycopg2.connect(**{**params, "database": "postgres"})
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s;",
+                (name,),
+            )
+            existing = cur.fetchone()
+            if existing is None:
+                cur.execute(
+                    f"CREATE DATABASE \"{name}\" ENCODING 'UTF8' TEMPLATE template0;"
+                )
+                cur.execute(f'COMMENT ON DATABASE "{name}" IS %s;', (database_comment,))
+            elif existing[0] != database_comment:
+                raise SystemExit(
+                    f"The '{name}' database wasn't created by the benchmark, its tables won't be truncated. "
+                    "Provide a name of a new database with --database."
+                )
+    finally:
+        conn.close()
+    schema.migrate()
+
+
+def __print_result(result: dict) -> None:
+    print(
+        f"\n{result['bank']} - {result['rows']:,} rows (chunks of {result['chunksize']:,}): "
+        f"{result['seconds']:.2f}s, {result['rows'] / result['seconds']:,.0f} rows/s, "
+        f"{result['queries']} queries, peak RSS {result['peakRssMb']} MB"
+    )
+    print(f"  {'phase':<14}{'seconds':>10}{'rows/s':>14}{'queries':>10}{'RSS MB':>10}")
+    for stage, phase in result["phases"].items():
+        rate = phase["rows"] / phase["seconds"] if phase["seconds"] else 0
+        print(
+            f"  {stage:<14}{phase['seconds']:>10.3f}{rate:>14,.0f}"
+            f"{phase['queries']:>10}{phase['peakRssMb']:>10}"
+        )
+
+
+def __regressions(results: list[dict], baseline: list[dict], tolerance: float):
+    previous = {(result["bank"], result["rows"]): result for result in baseline}
+    for result in results:
+        before = previous.get((result["bank"], result["rows"]))
+        if before is None:
+            continue
+        for stage, phase in result["phases"].items():
+            old = before["phases"].get(stage)
+            # phases shorter than 50ms are too noisy to be compared
+            if old is None or max(old["seconds"], phase["seconds"]) < 0.05:
+                continue
+            if phase["seconds"] > old["seconds"] * (1 + tolerance):
+                yield f"{result['bank']} {result['rows']:,} rows, {stage}: {old['seconds']:.3f}s -> {phase['seconds']:.3f}s"
+            if phase["queries"] > old["queries"]:
+                yield f"{result['bank']} {result['rows']:,} rows, {stage}: {old['queries']} -> {phase['queries']} queries"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database",
+        required=True,
+        help="dedicated database, created by the benchmark, whose tables are truncated",
+    )
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--banks", default="PL_ING,PL_MILLENIUM,PL_MBANK")
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--output", help="file to which results are written as JSON")
+    parser.add_argument("--baseline", help="results (JSON) to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown of a phase compared to the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    os.environ["DB_NAME"] = args.database
+    __ensure_database()
+
+    results = []
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for bank in args.banks.split(","):
+            for rows in [int(size) for size in args.sizes.split(",")]:
+                result = pool.apply(run, (bank, rows, args.chunksize))
+                __print_result(result)
+                results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = list(__regressions(results, json.load(file), args.tolerance))
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Measures how many rows per second importers parse and format.
+
+From within the `services/mankkoo` folder:
+
+    uv run python -m benchmarks.importers_benchmark [rows] [chunksize]
+"""
+
+import sys
+import time
+
+import mankkoo.account.importer.importer as importer
+from benchmarks.statements import generators
+
+
+def measure(bank, contents: bytes, rows: int, chunksize: int | None) -> float:
+    started_at = time.perf_counter()
+    result = importer.load_bank_data(
+        None, contents, bank, "benchmark-account", chunksize=chunksize
+    )
+    duration = time.perf_counter() - started_at
+    assert len(result) == rows, f"{bank.value}: expected {rows}, got {len(result)}"
+    return duration
+
+
+def main(rows: int = 100_000, chunksize: int | None = 10_000) -> None:
+    print(f"{'importer':<14}{'rows':>10}{'seconds':>10}{'rows/s':>12}")
+    for bank, generate in generators.items():
+        contents = generate(rows)
+        duration = measure(bank, contents, rows, chunksize)
+        print(f"{bank.value:<14}{rows:>10}{duration:>10.3f}{rows / duration:>12,.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
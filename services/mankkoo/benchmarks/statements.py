@@ -0,0 +1,96 @@
+"""Generators of synthetic bank statements, in the layouts of exports supported by importers."""
+
+import random
+from datetime import date, timedelta
+
+from mankkoo.account.models import Bank
+
+counterparties = ["Biedronka", "PKP Intercity", "Spotify AB", "Jane Doe", "ZUS"]
+descriptions = [
+    "Zakupy, karta",
+    "Bilet  IC",
+    "Subskrypcja",
+    "Przelew   własny",
+    "Składka",
+]
+
+
+def operations(rows: int, seed: int = 42) -> list[tuple[date, str, str, float]]:
+    """Random operations (date, counterparty, description, amount), from the newest one,
+    as banks export them."""
+    generator = random.Random(seed)
+    day = date(2024, 1, 1) + timedelta(days=rows // 20)
+    result = []
+    for _ in range(rows):
+        if generator.random() < 0.05:
+            day -= timedelta(days=1)
+        amount = round(generator.uniform(-500, 500), 2) or 0.01
+        result.append(
+            (
+                day,
+                generator.choice(counterparties),
+                generator.choice(descriptions),
+                amount,
+            )
+        )
+    return result
+
+
+def pl_ing(rows: int, seed: int = 42) -> bytes:
+    lines = [
+        '"Lista transakcji";;;;;"ING Bank Śląski S.A.";',
+        '"Dokument nr 0000000001";',
+        "",
+        '"Data transakcji";"Data księgowania";"Dane kontrahenta";"Tytuł";"Nr rachunku";"Nazwa banku";'
+        '"Szczegóły";"Nr transakcji";"Kwota transakcji (waluta rachunku)";"Waluta";'
+        '"Kwota blokady/zwolnienie blokady";"Waluta";"Kwota płatności w walucie";"Waluta";"Konto";'
+        '"Saldo po transakcji";"Waluta";;;;',
+    ]
+    for day, counterparty, description, amount in operations(rows, seed):
+        amount = f"{amount:.2f}".replace(".", ",")
+        lines.append(
+            f'{day};{day};"{counterparty}";"{description}";\'1111\';"";"";\'1\';{amount};PLN;;;;;'
+            f'"KONTO Z LWEM";0,00;PLN;;;;'
+        )
+    lines += [
+        "",
+        '"Dokument ma charakter informacyjny, nie stanowi dowodu księgowego";',
+    ]
+    return ("\n".join(lines) + "\n").encode("windows-1250")
+
+
+def pl_millenium(rows: int, seed: int = 42) -> bytes:
+    lines = [
+        '"Numer rachunku/karty","Data transakcji","Data rozliczenia","Rodzaj transakcji",'
+        '"Na konto/Z konta","Odbiorca/Zleceniodawca","Opis","Obciążenia","Uznania","Saldo","Waluta"'
+    ]
+    for day, counterparty, description, amount in operations(rows, seed):
+        debit, credit = (f"{amount:.2f}", "") if amount < 0 else ("", f"{amount:.2f}")
+        lines.append(
+            f'"PL22 2222","{day}","{day}","PRZELEW","","{counterparty}","{description}",'
+            f'"{debit}","{credit}","0.00","PLN"'
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def pl_mbank(rows: int, seed: int = 42) -> bytes:
+    lines = [
+        "mBank S.A. Bankowość Detaliczna;",
+        "#Klient;",
+        "JOHN DOE;",
+        "",
+        "#Data operacji;#Opis operacji;#Rachunek;#Kategoria;#Kwota;",
+    ]
+    for day, counterparty, description, amount in operations(rows, seed):
+        amount = f"{amount:.2f}".replace(".", ",")
+        lines.append(
+            f'{day};"{counterparty} - {description}";"eKonto 2222";"Bez kategorii";{amount} PLN;;'
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+generators = {
+    Bank.PL_ING: pl_ing,
+    Bank.PL_MILLENIUM: pl_millenium,
+    Bank.PL_MBANK: pl_mbank,
+}
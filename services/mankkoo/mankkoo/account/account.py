@@ -1,85 +1,96 @@
-import uuid
+import io
+import os
 
-import numpy as np
 import pandas as pd
 
 import mankkoo.account.account_db as db
 import mankkoo.account.importer.importer as importer
-import mankkoo.event_store as es
+import mankkoo.account.models as models
+import mankkoo.database as database
 from mankkoo.base_logger import log
 
 log.basicConfig(level=log.DEBUG)
 
 
-def add_new_operations(account_id: str, file_name=None, contents=None) -> None:
+def add_new_operations(
+    account_id: str,
+    file_name=None,
+    contents=None,
+    progress: models.ImportProgress | None = None,
+) -> None:
     """Append bank accounts history with new operations.
-    This method return a pandas DataFrame with calculated balance.
+    A file is decoded, parsed and formatted in chunks of IMPORT_CHUNK_SIZE rows, and each chunk is
+    copied to a temporary table, so that a single chunk is held in memory at a time. Operations are
+    put in chronological order, deduplicated, given balances and appended to an account by the database,
+    all of them in a single transaction, so a failed import doesn't store any operation.
 
     Args:
         bank (importer.Bank): enum of a bank company
         file_name (str): name of a file from which data will be loaded
         contents (bytes): content of a file
+        progress (ImportProgress, optional): notified after each stage of each chunk
 
     Raises:
         KeyError: raised when unsupported bank enum is provided
     """
     log.info("Adding new operations for %s account", account_id)
+    progress = __with_logging(progress)
+    chunksize = __import_chunk_size()
     bank = db.get_bank_type(account_id)
-    df_new = importer.load_bank_data(file_name, contents, bank, account_id)
-
-    log.info(
-        f"{df_new['Account'].size} new operations for {account_id} account were added."
+    order, chunks = importer.load_bank_chunks(
+        file_name, contents, bank, account_id, chunksize=chunksize, progress=progress
     )
 
-    events = __prepare_events(account_id, df_new)
-
-    log.info(f"{len(events)} events prepared. Storing them...")
-    es.store(events)
+    with database.get_connection() as conn:
+        with conn.cursor() as cur:
+            version, balance = db.lock_account(cur, account_id)
+            db.create_staged_operations(cur)
+            parsed = 0
+            for chunk in chunks:
+                db.stage_operations(cur, __to_csv(chunk, first_position=parsed))
+                parsed += len(chunk)
+
+            known = db.skip_known_operations(cur, account_id, order)
+            if known:
+                log.info(f"{known} operations were already imported, skipping them")
+            total = parsed - known
+            progress("deduplicated", total, parsed)
+            log.info(f"{total} new operations for {account_id} account were loaded.")
+
+            db.number_staged_operations(cur, version, balance, order)
+            progress("prepared", total, total)
+
+            for start in range(0, total, chunksize):
+                stored = min(start + chunksize, total)
+                db.append_staged_operations(
+                    cur, account_id, version + start + 1, version + stored
+                )
+                progress("stored", stored, total)
+            conn.commit()
     log.info("All events were stored")
 
 
-def __prepare_events(account_id: str, df: pd.DataFrame) -> list[es.Event]:
-
-    version = 0
-    stream_id = uuid.uuid4()
-
-    stream = es.get_stream_by_id(account_id)
-    if stream is not None:
-        version = stream.version
-        stream_id = stream.id
-    else:
-        log.info(
-            f"No stream found for accountNumber={account_id}. Creating a new one with id={stream_id}"
-        )
-
-    events = []
-    latest_balance = db.get_account_balance(account_id)
-
-    for _, row in df.iterrows():
+def __to_csv(df: pd.DataFrame, first_position: int) -> io.StringIO:
+    rows = pd.DataFrame(
+        {
+            "position": range(first_position, first_position + len(df)),
+            "day": pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d").values,
+            "title": df["Title"].fillna("Title not provided").values,
+            "amount": df["Operation"].values,
+            "currency": df["Currency"].values,
+        }
+    )
+    return io.StringIO(rows.to_csv(index=False, header=False))
 
-        version += 1
-        latest_balance = round(latest_balance + row["Operation"], 2)
 
-        event = es.Event(
-            stream_type="account",
-            stream_id=stream_id,
-            event_type="MoneyDeposited" if row["Operation"] > 0 else "MoneyWithdrawn",
-            data={
-                "title": __titleOrDefault(row["Title"]),
-                "amount": row["Operation"],
-                "currency": row["Currency"],
-                "balance": latest_balance,
-            },
-            occured_at=row["Date"],
-            version=version,
-        )
-        events.append(event)
+def __import_chunk_size() -> int:
+    return max(1, int(os.getenv("IMPORT_CHUNK_SIZE", "10000")))
 
-    return events
 
+def __with_logging(progress: models.ImportProgress | None) -> models.ImportProgress:
+    def log_progress(stage: str, rows: int, total: int | None) -> None:
+        log.info(f"Import progress: {stage} {rows} of {total or '?'} operations")
+        if progress is not None:
+            progress(stage, rows, total)
 
-def __titleOrDefault(transaction_title) -> str:
-    if transaction_title is np.NaN:
-        return "Title not provided"
-    else:
-        return transaction_title
+    return log_progress
@@ -1,8 +1,11 @@
+from decimal import Decimal
+from typing import TextIO
+
 from apiflask import Schema
 from apiflask.fields import Boolean, Float, String
 
 import mankkoo.database as db
-from mankkoo.account.models import Bank
+from mankkoo.account.models import Bank, OperationsOrder
 from mankkoo.base_logger import log
 
 
@@ -69,7 +72,7 @@ def load_all_accounts() -> list[Account]:
     return result
 
 
-def get_bank_type(account_id: str) -> Bank:
+def get_bank_type(account_id: str) -> Bank | None:
     log.info(f"Looking for bank enum for account_id {account_id}...")
     query = f"""
     SELECT
@@ -89,6 +92,10 @@ def get_bank_type(account_id: str) -> Bank:
             else:
                 (importer,) = result
 
+    if importer is None:
+        log.info(f"No importer set for account_id ({account_id}), it will be detected")
+        return None
+
     try:
         bank = Bank[importer]
         log.info(f"Found bank by account_id ({account_id}): {bank}")
@@ -101,26 +108,181 @@ def get_bank_type(account_id: str) -> Bank:
 
 def get_account_balance(account_id: str) -> float:
     log.info(f"Getting balance for an account: {account_id}...")
-    query = f"""
+    query = """
     SELECT
-        (data ->> 'balance')::numeric AS balance
+        balance
     FROM
-        events
+        stream_current_state
     WHERE
-        stream_id = '{account_id}'
-    ORDER BY
-        version DESC
-    LIMIT 1;
+        stream_id = %s;
     """
     with db.get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query, (str(account_id),))
             result = cur.fetchone()
             if result is None:
                 return 0
             else:
                 (balance,) = result
-    return float(balance)
+    return 0 if balance is None else float(balance)
+
+
+__operations_order_by = {
+    OperationsOrder.FILE: "position",
+    OperationsOrder.REVERSED: "position DESC",
+    OperationsOrder.DATE: "day, position",
+}
+
+
+def lock_account(cur, account_id: str) -> tuple[int, Decimal]:
+    """Locks an account stream until the end of a transaction, so that imports don't interleave.
+
+    Returns:
+        tuple[int, Decimal]: version and balance of an account
+    """
+    query = """
+    SELECT
+        s.version,
+        COALESCE(c.balance, 0)
+    FROM streams s
+    LEFT JOIN stream_current_state c ON c.stream_id = s.id
+    WHERE s.id = %s
+    FOR UPDATE OF s;
+    """
+    cur.execute(query, (str(account_id),))
+    result = cur.fetchone()
+    if result is None:
+        raise ValueError(
+            f"Failed to import operations. There is no account with an id '{account_id}'"
+        )
+    return result
+
+
+def create_staged_operations(cur) -> None:
+    """Creates a temporary table for operations of an import, which is dropped with the end of a transaction."""
+    cur.execute("""
+    CREATE TEMPORARY TABLE staged_operations (
+        position    bigint PRIMARY KEY,
+        day         date NOT NULL,
+        title       text NOT NULL,
+        amount      numeric,
+        currency    text,
+        version     bigint,
+        balance     numeric
+    ) ON COMMIT DROP;
+    """)
+
+
+def stage_operations(cur, rows: TextIO) -> None:
+    """Copies CSV rows of formatted operations (position, day, title, amount, currency) to the staged operations."""
+    cur.copy_expert(
+        "COPY staged_operations (position, day, title, amount, currency) FROM STDIN WITH (FORMAT csv)",
+        rows,
+    )
+
+
+def skip_known_operations(cur, account_id: str, order: OperationsOrder) -> int:
+    """Removes staged operations which were already imported to an account, by their fingerprints.
+    Identical operations (same day, amount and title) are told apart by the order of occurrence.
+
+    Returns:
+        int: number of removed operations
+    """
+    log.info(f"Looking for already imported operations of an account: {account_id}...")
+    query = f"""
+    WITH
+    fingerprints AS (
+        SELECT
+            position,
+            day,
+            operation_amount_key(amount) AS amount,
+            operation_title_key(title) AS title,
+            row_number() OVER (
+                PARTITION BY day, operation_amount_key(amount), operation_title_key(title)
+                ORDER BY {__operations_order_by[order]}
+            ) - 1 AS occurrence
+        FROM staged_operations
+    )
+    DELETE FROM staged_operations o
+    USING fingerprints fp, operation_fingerprints f
+    WHERE
+        o.position = fp.position
+        AND f.stream_id = %s::uuid
+        AND f.day = fp.day
+        AND f.amount = fp.amount
+        AND f.title = fp.title
+        AND f.occurrence = fp.occurrence;
+    """
+    cur.execute(query, (str(account_id),))
+    return cur.rowcount
+
+
+def number_staged_operations(
+    cur, version: int, balance: Decimal, order: OperationsOrder
+) -> int:
+    """Sets versions of staged operations, from the next version of an account, and their balances.
+    Amounts are summed up as numerics, so that rounding errors don't add up.
+
+    Returns:
+        int: number of staged operations
+    """
+    query = f"""
+    UPDATE staged_operations o
+    SET
+        version = n.version,
+        balance = n.balance
+    FROM (
+        SELECT
+            position,
+            %(version)s + row_number() OVER w AS version,
+            %(balance)s::numeric + SUM(round(amount, 2)) OVER w AS balance
+        FROM staged_operations
+        WINDOW w AS (ORDER BY {__operations_order_by[order]} ROWS UNBOUNDED PRECEDING)
+    ) n
+    WHERE o.position = n.position;
+    """
+    cur.execute(query, {"version": version, "balance": balance})
+    return cur.rowcount
+
+
+def append_staged_operations(
+    cur, account_id: str, from_version: int, to_version: int
+) -> None:
+    """Appends staged operations with versions in a range, as events of an account stream."""
+    query = """
+    SELECT append_events(
+        %(stream_id)s::uuid,
+        'account',
+        (
+            SELECT
+                jsonb_agg(
+                    jsonb_build_object(
+                        'id', gen_random_uuid(),
+                        'type', CASE WHEN amount > 0 THEN 'MoneyDeposited' ELSE 'MoneyWithdrawn' END,
+                        'data', jsonb_build_object(
+                            'title', title,
+                            'amount', amount,
+                            'currency', currency,
+                            'balance', balance
+                        ),
+                        'version', version,
+                        'occured_at', to_char(day, 'YYYY-MM-DD') || 'T00:00:00+00:00'
+                    )
+                    ORDER BY version
+                )
+            FROM staged_operations
+            WHERE version BETWEEN %(from_version)s AND %(to_version)s
+        )
+    );
+    """
+    cur.execute(
+        query,
+        {
+            "stream_id": str(account_id),
+            "from_version": from_version,
+            "to_version": to_version,
+        },
+    )
 
 
 class AccountOperation(Schema):
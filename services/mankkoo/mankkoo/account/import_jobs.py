@@ -0,0 +1,181 @@
+"""Background jobs importing bank statements.
+
+Parsing a statement, computing balances and storing its events can take longer than an HTTP request
+should, so the import endpoint only submits a job and returns its id. Jobs are run on a local pool of
+IMPORT_WORKERS threads (1 by default, so that imports into the same account don't interleave) and
+their progress, reported by ``account.add_new_operations``, is kept in memory. An upload is copied to
+a temporary file (in IMPORT_SPOOL_DIR, a system one by default), which is read by a job in chunks
+and removed once the job finishes, so a queued upload isn't held in memory. Importers (and pandas
+they depend on) are loaded by the first job, not when the service starts.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import BinaryIO
+
+from mankkoo.base_logger import log
+
+
+class ImportJob:
+    def __init__(self, account_id: str, file_name: str | None = None):
+        self.id = str(uuid.uuid4())
+        self.account_id = str(account_id)
+        self.file_name = file_name
+        self.status = "queued"
+        self.submitted_at = datetime.now(timezone.utc)
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.rows_parsed = 0
+        self.rows_stored = 0
+        self.rows_total: int | None = None
+        self.stages: dict[str, float] = {}
+        self.error: str | None = None
+        self._last_report_at: float | None = None
+
+    def start(self) -> None:
+        self.status = "running"
+        self.started_at = datetime.now(timezone.utc)
+        self._last_report_at = time.perf_counter()
+
+    def progress(self, stage: str, rows: int, total: int | None) -> None:
+        """ImportProgress callback. Time since the previous report is added to the reported stage."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last_report_at
+        self._last_report_at = now
+
+        if stage == "parsed":
+            self.rows_parsed = rows
+        elif stage == "stored":
+            self.rows_stored = rows
+            self.rows_total = total
+
+    def finish(self, error: str | None = None) -> None:
+        self.status = "succeeded" if error is None else "failed"
+        self.error = error
+        self.finished_at = datetime.now(timezone.utc)
+
+    def to_dict(self) -> dict:
+        duration_ms = None
+        if self.started_at is not None:
+            finished_at = self.finished_at or datetime.now(timezone.utc)
+            duration_ms = round((finished_at - self.started_at).total_seconds() * 1000)
+
+        return {
+            "jobId": self.id,
+            "accountId": self.account_id,
+            "fileName": self.file_name,
+            "status": self.status,
+            "submittedAt": self.submitted_at.isoformat(),
+            "startedAt": (
+                None if self.started_at is None else self.started_at.isoformat()
+            ),
+            "finishedAt": (
+                None if self.finished_at is None else self.finished_at.isoformat()
+            ),
+            "durationMs": duration_ms,
+            "rowsParsed": self.rows_parsed,
+            "rowsStored": self.rows_stored,
+            "rowsTotal": self.rows_total,
+            "stages": {
+                stage: {"durationMs": round(seconds * 1000, 1)}
+                for stage, seconds in self.stages.items()
+            },
+            "error": self.error,
+        }
+
+
+class ImportJobs:
+    """Runs imports on a thread pool and remembers the last ``retention`` jobs."""
+
+    def __init__(self, workers: int = 1, retention: int = 100):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="account-import"
+        )
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, ImportJob] = OrderedDict()
+        self._futures: dict[str, Future] = {}
+
+    def submit(
+        self, account_id: str, upload: BinaryIO, file_name: str | None = None
+    ) -> ImportJob:
+        job = ImportJob(account_id, file_name)
+        file_path = self._spool(upload)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, file_path)
+            self._forget_old_jobs()
+        log.info(f"Import job {job.id} for account {account_id} was submitted")
+        return job
+
+    def get(self, job_id: str) -> ImportJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float | None = None) -> ImportJob | None:
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        return self.get(job_id)
+
+    def _spool(self, upload: BinaryIO) -> str:
+        with tempfile.NamedTemporaryFile(
+            prefix="mankkoo-import-",
+            suffix=".csv",
+            dir=os.getenv("IMPORT_SPOOL_DIR"),
+            delete=False,
+        ) as file:
+            shutil.copyfileobj(upload, file)
+            return file.name
+
+    def _run(self, job: ImportJob, file_path: str) -> None:
+        import mankkoo.account.account as account
+
+        job.start()
+        try:
+            account.add_new_operations(
+                job.account_id, file_name=file_path, progress=job.progress
+            )
+            job.finish()
+            log.info(f"Import job {job.id} has finished")
+        except Exception as ex:
+            log.info(
+                f"Import job {job.id} has failed. Err: {ex}, traceback: {traceback.format_exc()}"
+            )
+            job.finish(str(ex) or type(ex).__name__)
+        finally:
+            os.remove(file_path)
+
+    def _forget_old_jobs(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in ("succeeded", "failed")
+        ]
+        for job_id in finished[: max(0, len(self._jobs) - self.retention)]:
+            del self._jobs[job_id]
+            del self._futures[job_id]
+
+
+__import_jobs: ImportJobs | None = None
+__import_jobs_lock = threading.Lock()
+
+
+def get_import_jobs() -> ImportJobs:
+    global __import_jobs
+    with __import_jobs_lock:
+        if __import_jobs is None:
+            __import_jobs = ImportJobs(
+                workers=max(1, int(os.getenv("IMPORT_WORKERS", "1"))),
+                retention=max(1, int(os.getenv("IMPORT_JOBS_RETENTION", "100"))),
+            )
+        return __import_jobs
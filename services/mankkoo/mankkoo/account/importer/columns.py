@@ -0,0 +1,55 @@
+"""Building blocks shared by bank importers to create columns of Mankkoo's account format."""
+
+import numpy as np
+import pandas as pd
+
+import mankkoo.database as db
+
+
+def title(counterparty: pd.Series, description: pd.Series) -> pd.Series:
+    """Joins a counterparty and a description, removes commas and squashes whitespaces."""
+    titles = (counterparty + " - " + description).str.replace(",", "", regex=False)
+    # splitting on whitespaces and joining with a single space also strips a title
+    return titles.str.split().str.join(" ")
+
+
+def dates(values: pd.Series, date_format: str) -> pd.Series:
+    return pd.to_datetime(values, format=date_format).dt.date
+
+
+def constant(value, length: int) -> pd.Categorical:
+    """A column with the same value in each row, stored as a single category."""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), [value])
+
+
+def currencies(values: pd.Series, default: str = "PLN") -> pd.Series:
+    values = values.astype("category")
+    if default not in values.cat.categories:
+        values = values.cat.add_categories(default)
+    return values.fillna(default)
+
+
+def account_operations(
+    account_id: str,
+    dates: pd.Series,
+    titles: pd.Series,
+    operations: pd.Series,
+    currencies: pd.Series,
+) -> pd.DataFrame:
+    """Creates a DataFrame in Mankkoo's format at once, instead of adding columns one by one."""
+    length = len(operations)
+    empty = np.full(length, np.NaN)
+    return pd.DataFrame(
+        {
+            "Account": constant(str(account_id), length),
+            "Date": dates.to_numpy(),
+            "Title": titles.to_numpy(),
+            "Details": empty,
+            "Category": empty,
+            "Comment": empty,
+            "Operation": operations.to_numpy(dtype="float64"),
+            "Currency": pd.Categorical(currencies),
+            "Balance": empty,
+        },
+        columns=db.account_columns,
+    )
@@ -1,25 +1,94 @@
+from typing import Iterator
+
 import pandas as pd
 
-import mankkoo.account.importer.pl_ing as pl_ing_importer
-import mankkoo.account.importer.pl_mbank as pl_mbank_importer
-import mankkoo.account.importer.pl_millenium as pl_millenium_importer
+import mankkoo.account.importer.registry as registry
+import mankkoo.account.importer.sniffer as sniffer
 import mankkoo.account.models as models
 
 
 def load_bank_data(
-    file_path: str, contents: bytes, kind: models.Bank, account_id: str
+    file_path: str,
+    contents: bytes,
+    kind: models.Bank,
+    account_id: str,
+    chunksize: int | None = None,
+    progress: models.ImportProgress | None = None,
 ) -> pd.DataFrame:
     """Load data from a CSV file
 
     Args:
         file_path (str): absolut file location
         contents (bytes): content of a file
-        kind (mankkoo.account.models.Bank): bank name
+        kind (mankkoo.account.models.Bank): bank name, if None it's detected from the beginning of a file.
+            Otherwise a file is rejected, before it's parsed, if it doesn't look like an export of that bank
         account_id: id of an account
+        chunksize (int, optional): if provided, a file is parsed and formatted in chunks of that many rows,
+            which are then concatenated, so operations of a whole file are held in memory.
+            Use ``load_bank_chunks`` to process a file chunk by chunk
+        progress (ImportProgress, optional): notified after each parsed and formatted chunk
 
     Returns:
         [pd.Dataframe]: holds history of operations for an account
     """
+    bank, spec, file_format = __get_importer(file_path, contents, kind, account_id)
+
+    if chunksize is not None and spec.streaming:
+        progress = progress or __ignore_progress
+        chunks = __format_chunks(
+            bank, file_path, contents, file_format, account_id, chunksize, progress
+        )
+        df = bank.sort_operations(pd.concat(chunks, ignore_index=True))
+        progress("formatted", len(df), len(df))
+        return df
+
+    if file_path is not None:
+        df = bank.load_file_by_filename(file_path, file_format)
+    else:
+        df = bank.load_file_by_contents(contents, file_format)
+    if progress is not None:
+        progress("parsed", len(df), None)
+    df = bank.format_file(df, account_id)
+    if progress is not None:
+        progress("formatted", len(df), len(df))
+    return df
+
+
+def load_bank_chunks(
+    file_path: str,
+    contents: bytes,
+    kind: models.Bank,
+    account_id: str,
+    chunksize: int,
+    progress: models.ImportProgress | None = None,
+) -> tuple[models.OperationsOrder, Iterator[pd.DataFrame]]:
+    """Load data from a CSV file lazily, in chunks of formatted operations, so that only
+    a single chunk of a file is held in memory at a time.
+
+    Args are the same as of ``load_bank_data``. A bank is detected (and a file is checked)
+    right away, while chunks are parsed and formatted as they are iterated over.
+
+    Returns:
+        tuple[OperationsOrder, Iterator[pd.DataFrame]]: order of operations in chunks, which are
+            yielded in the order of a file (chronological one for importers which can't parse a file in chunks)
+    """
+    bank, spec, file_format = __get_importer(file_path, contents, kind, account_id)
+    progress = progress or __ignore_progress
+
+    if spec.streaming:
+        chunks = __format_chunks(
+            bank, file_path, contents, file_format, account_id, chunksize, progress
+        )
+        return bank.operations_order, chunks
+
+    return models.OperationsOrder.FILE, iter(
+        [load_bank_data(file_path, contents, kind, account_id, progress=progress)]
+    )
+
+
+def __get_importer(
+    file_path: str, contents: bytes, kind: models.Bank, account_id: str
+) -> tuple[models.Importer, registry.ImporterSpec, models.FileFormat]:
     if account_id is None:
         raise ValueError('Could not load data file. "account_id" needs to provided')
 
@@ -33,26 +102,56 @@ def load_bank_data(
             'Could not load data file. Both "file_path" and "contents" has been provided. Only one of them can be'
         )
 
+    file_format = sniffer.sniff(__read_head(file_path, contents))
     if kind is None:
+        kind = file_format.bank
+        if kind is None:
+            raise ValueError(
+                'Could not load data file. "kind" (bank, investment, stock) argument was not provided and it could not be detected'
+            )
+
+    spec = registry.get_spec(kind)
+    if spec.markers and file_format.bank is not kind:
+        detected = (
+            ""
+            if file_format.bank is None
+            else f" It looks like a {file_format.bank.value} export."
+        )
         raise ValueError(
-            'Could not load data file. "kind" (bank, investment, stock) argument was not provided'
+            f"Could not load data file. It is not a {kind.value} export.{detected}"
         )
+    return registry.get_importer(kind), spec, file_format
+
+
+def __read_head(file_path: str, contents: bytes) -> bytes:
+    if contents is not None:
+        return contents[: registry.sniff_size]
+    with open(file_path, "rb") as file:
+        return file.read(registry.sniff_size)
 
-    if kind is models.Bank.PL_ING:
-        bank = pl_ing_importer.Ing()
-    elif kind is models.Bank.PL_MBANK:
-        bank = pl_mbank_importer.Mbank()
-    elif kind is models.Bank.PL_MILLENIUM:
-        bank = pl_millenium_importer.Millenium()
-    else:
-        raise KeyError(
-            "Failed to load data from file. Not known bank. Was provided {} bank".format(
-                str(kind)
-            )
-        )
 
+def __format_chunks(
+    bank: models.Importer,
+    file_path: str,
+    contents: bytes,
+    file_format: models.FileFormat,
+    account_id: str,
+    chunksize: int,
+    progress: models.ImportProgress,
+) -> Iterator[pd.DataFrame]:
     if file_path is not None:
-        df = bank.load_file_by_filename(file_path)
+        raw_chunks = bank.load_chunks_by_filename(file_path, chunksize, file_format)
     else:
-        df = bank.load_file_by_contents(contents)
-    return bank.format_file(df, account_id)
+        raw_chunks = bank.load_chunks_by_contents(contents, chunksize, file_format)
+
+    rows_parsed = 0
+    for raw_chunk in raw_chunks:
+        rows_parsed += len(raw_chunk)
+        progress("parsed", rows_parsed, None)
+        chunk = bank.format_chunk(raw_chunk, account_id)
+        progress("formatted", rows_parsed, None)
+        yield chunk
+
+
+def __ignore_progress(stage: str, rows: int, total: int | None) -> None:
+    pass
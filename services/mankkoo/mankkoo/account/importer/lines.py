@@ -0,0 +1,98 @@
+"""Reading bank exports line by line, so that a file is decoded and parsed as a stream.
+
+Exports are opened as binary files (or in-memory bytes) and decoded by a ``TextIOWrapper``, lines
+around the table (a bank's header and footer) are skipped by generators, and the remaining lines are
+handed to the CSV parser through a file-like ``LinesReader``. Nothing of a file is held in memory
+besides the lines of a chunk which is being parsed.
+"""
+
+import io
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, Iterator
+
+import mankkoo.account.importer.registry as registry
+import mankkoo.account.importer.sniffer as sniffer
+
+
+@contextmanager
+def open_binary(file_path: str | None, contents: bytes | None) -> Iterator[BinaryIO]:
+    """Opens a file, or wraps its contents (without copying them), as a binary stream."""
+    if file_path is not None:
+        with open(file_path, "rb") as file:
+            yield file
+    else:
+        yield io.BytesIO(contents)
+
+
+def decode(file: BinaryIO, encoding: str | None = None) -> io.TextIOWrapper:
+    """Decodes a binary stream lazily, with an encoding detected from its beginning if not provided."""
+    if encoding is None:
+        encoding = sniffer.detect_encoding(file.read(registry.sniff_size))
+        file.seek(0)
+    return io.TextIOWrapper(file, encoding=encoding, newline="")
+
+
+def starting_with(lines: Iterable[str], marker: str) -> Iterator[str]:
+    """Lines from the first one containing a marker (e.g. a header row of a table)."""
+    lines = iter(lines)
+    for line in lines:
+        if marker in line:
+            yield line
+            yield from lines
+            return
+    raise ValueError(f"There is no '{marker}' header row")
+
+
+def until(lines: Iterable[str], marker: str) -> Iterator[str]:
+    """Lines before the first one containing a marker (e.g. a footer of a table)."""
+    for line in lines:
+        if marker in line:
+            return
+        yield line
+
+
+def without_last_line(lines: Iterable[str]) -> Iterator[str]:
+    """Lines without the last non empty one (and empty lines after it)."""
+    held = []
+    for line in lines:
+        if line.strip():
+            yield from held
+            held = [line]
+        else:
+            held.append(line)
+
+
+class LinesReader(io.TextIOBase):
+    """A read-only text stream over lines, consumed lazily as the parser asks for more text."""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> str:
+        if size is None or size < 0:
+            result = self._buffer + "".join(self._lines)
+            self._buffer = ""
+            return result
+
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        text = "".join(parts)
+        result, self._buffer = text[:size], text[size:]
+        return result
+
+    def readline(self, size: int | None = -1) -> str:
+        if "\n" not in self._buffer:
+            self._buffer += next(self._lines, "")
+        end = self._buffer.find("\n") + 1 or len(self._buffer)
+        line, self._buffer = self._buffer[:end], self._buffer[end:]
+        return line
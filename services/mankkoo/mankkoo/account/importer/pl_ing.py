@@ -1,147 +1,96 @@
-import io
+from typing import BinaryIO, Iterable, Iterator
 
-import numpy as np
 import pandas as pd
 
+import mankkoo.account.importer.columns as columns
+import mankkoo.account.importer.lines as lines
 import mankkoo.account.models as models
-import mankkoo.database as db
 
-
-def remove_non_tabular_data(df: pd.DataFrame) -> pd.DataFrame:
-    # remove first rows without data
-    column = df.iloc[:, 0]
-    start_row_index = column.index[column == "Data transakcji"].item()
-    df = df.iloc[start_row_index:, :]
-
-    #  remove last row
-    df = df[:-1]
-
-    # make first row a header
-    df.columns = df.iloc[0]
-    df = df[1:]
-
-    # drop columns with header with nan name
-    df = df.loc[:, df.columns.notnull()]
-    return df.reset_index(drop=True)
-
-
-def prepare_tile(df: pd.DataFrame) -> pd.DataFrame:
-    df["Title"] = df["Dane kontrahenta"] + " - " + df["Tytuł"]
-    df["Title"] = df["Title"].str.replace(",", "")
-    df["Title"] = df["Title"].str.replace(r"\s+", " ", regex=True)
-    df["Title"] = df["Title"].str.strip()
-    return df
-
-
-def select_only_required_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df[
-        [
-            "Data transakcji",
-            "Title",
-            "Kwota transakcji (waluta rachunku)",
-            "Waluta",
-            "Kwota blokady/zwolnienie blokady",
-        ]
-    ]
-    return df
-
-
-def remove_duplicated_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.loc[:, ~df.columns.duplicated()]
-    return df
-
-
-def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.rename(columns={"Data transakcji": "Date", "Waluta": "Currency"})
-    return df
-
-
-def format_date_column(df: pd.DataFrame) -> pd.DataFrame:
-    df["Date"] = pd.to_datetime(df.Date)
-    df["Date"] = df["Date"].dt.date
-    return df
-
-
-def get_operation(df: pd.DataFrame) -> pd.DataFrame:
-    df["Operation"] = np.where(
-        df["Kwota transakcji (waluta rachunku)"].isna(),
-        df["Kwota blokady/zwolnienie blokady"],
-        df["Kwota transakcji (waluta rachunku)"],
+header_row_prefix = '"Data transakcji";'
+date_format = "%Y-%m-%d"
+
+# columns read from an export with their types, amounts are parsed with a decimal comma
+dtypes = {
+    "Data transakcji": str,
+    "Dane kontrahenta": str,
+    "Tytuł": str,
+    "Kwota transakcji (waluta rachunku)": "float64",
+    "Waluta": "category",
+    "Kwota blokady/zwolnienie blokady": "float64",
+}
+
+
+def tabular_data_lines(file_lines: Iterable[str]) -> Iterator[str]:
+    # cuts off lines before a header and the footer (the last non empty line) of an export
+    return lines.without_last_line(lines.starting_with(file_lines, header_row_prefix))
+
+
+def read_csv(
+    file: BinaryIO,
+    file_format: models.FileFormat | None = None,
+    chunksize: int | None = None,
+):
+    file_format = file_format or models.FileFormat()
+    return pd.read_csv(
+        lines.LinesReader(tabular_data_lines(lines.decode(file, file_format.encoding))),
+        sep=file_format.delimiter or ";",
+        usecols=list(dtypes),
+        dtype=dtypes,
+        decimal=",",
+        chunksize=chunksize,
     )
-    df["Operation"] = df["Operation"].str.replace(",", ".")
-    df["Operation"] = pd.to_numeric(df["Operation"])
-    return df
 
 
-def remove_unnecessary_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.drop(
-        columns=[
-            "Kwota transakcji (waluta rachunku)",
-            "Kwota blokady/zwolnienie blokady",
-        ]
+def get_operation(df: pd.DataFrame) -> pd.Series:
+    # pending operations have only an amount of a blockade
+    return df["Kwota transakcji (waluta rachunku)"].fillna(
+        df["Kwota blokady/zwolnienie blokady"]
     )
-    return df
-
-
-def add_account_id_to_each_row(df: pd.DataFrame, account_id: str) -> pd.DataFrame:
-    df["Account"] = account_id
-    df["Account"] = df["Account"].astype("string")
-    return df
-
-
-def add_details_and_balance_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df["Details"] = np.NaN
-    df["Balance"] = np.NaN
-    return df
-
-
-def add_empty_columns(df: pd.DataFrame, columns) -> pd.DataFrame:
-    existing_columns = list(df.columns)
-    return df.reindex(columns=existing_columns + columns)
-
-
-def add_pln_currency_if_empty(df: pd.DataFrame) -> pd.DataFrame:
-    df["Currency"] = df["Currency"].fillna("PLN")
-    return df
-
-
-def sort_rows_by_date(df: pd.DataFrame) -> pd.DataFrame:
-    return df.sort_values(by="Date")
-
-
-def reset_row_indexes(df: pd.DataFrame) -> pd.DataFrame:
-    df.reset_index(drop=True, inplace=True)
-    return df
-
-
-def order_columns(df: pd.DataFrame, columns_in_order: list[str]) -> pd.DataFrame:
-    return df[columns_in_order]
 
 
 class Ing(models.Importer):
     # ING bank (PL) - https://www.ing.pl
 
-    def load_file_by_filename(self, file_path: str):
-        return pd.read_csv(file_path, sep=";")
-
-    def load_file_by_contents(self, contents: bytes):
-        return pd.read_csv(io.StringIO(contents.decode("windows-1250")), sep=";")
+    operations_order = models.OperationsOrder.DATE
+
+    def load_file_by_filename(
+        self, file_path: str, file_format: models.FileFormat | None = None
+    ):
+        with lines.open_binary(file_path, None) as file:
+            return read_csv(file, file_format)
+
+    def load_file_by_contents(
+        self, contents: bytes, file_format: models.FileFormat | None = None
+    ):
+        with lines.open_binary(None, contents) as file:
+            return read_csv(file, file_format)
+
+    def load_chunks_by_filename(
+        self,
+        file_path: str,
+        chunksize: int,
+        file_format: models.FileFormat | None = None,
+    ):
+        with lines.open_binary(file_path, None) as file:
+            yield from read_csv(file, file_format, chunksize)
+
+    def load_chunks_by_contents(
+        self,
+        contents: bytes,
+        chunksize: int,
+        file_format: models.FileFormat | None = None,
+    ):
+        with lines.open_binary(None, contents) as file:
+            yield from read_csv(file, file_format, chunksize)
 
     def format_file(self, df: pd.DataFrame, account_id: str):
-        return (
-            df.pipe(remove_non_tabular_data)
-            .pipe(prepare_tile)
-            .pipe(select_only_required_columns)
-            .pipe(remove_duplicated_columns)
-            .pipe(rename_columns)
-            .pipe(format_date_column)
-            .pipe(get_operation)
-            .pipe(remove_unnecessary_columns)
-            .pipe(add_account_id_to_each_row, account_id)
-            .pipe(add_details_and_balance_columns)
-            .pipe(add_empty_columns, ["Category", "Comment"])
-            .pipe(add_pln_currency_if_empty)
-            .pipe(sort_rows_by_date)
-            .pipe(reset_row_indexes)
-            .pipe(order_columns, db.account_columns)
+        return self.sort_operations(self.format_chunk(df, account_id))
+
+    def format_chunk(self, df: pd.DataFrame, account_id: str):
+        return columns.account_operations(
+            account_id,
+            dates=columns.dates(df["Data transakcji"], date_format),
+            titles=columns.title(df["Dane kontrahenta"], df["Tytuł"]),
+            operations=get_operation(df),
+            currencies=columns.currencies(df["Waluta"]),
         )
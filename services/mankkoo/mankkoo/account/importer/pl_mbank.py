@@ -1,86 +1,90 @@
-import base64
-import os
-import pathlib
+from typing import BinaryIO, Iterable, Iterator
 
-import numpy as np
 import pandas as pd
 
+import mankkoo.account.importer.columns as columns
+import mankkoo.account.importer.lines as lines
 import mankkoo.account.models as models
-import mankkoo.database as db
 
-data_path = str(pathlib.Path(__file__).parent.absolute()) + "/data/"
+header_row_prefix = "#Data operacji"
+footer_row_prefix = "#Saldo"
+date_format = "%Y-%m-%d"
 
 
-class Mbank(models.Importer):
-    # Mbank bank (PL) - https://www.mbank.pl
-    def load_file_by_filename(self, file_path: str) -> pd.DataFrame:
-
-        skip_lines = self.__skip_rows_footer(file_path)
-
-        return pd.read_csv(file_path, sep=";", skiprows=skip_lines["skiprows"])
-
-    def load_file_by_contents(self, contents: bytes) -> pd.DataFrame:
-        raise Exception("Loading file by its content is not supported!")
-        content_type, content_string = contents.split(",")
-        decoded = base64.b64decode(content_string)
+def tabular_data(file_lines: Iterable[str]) -> Iterator[str]:
+    """Cuts off lines before the header and from the footer of an export."""
+    try:
+        return lines.until(
+            lines.starting_with(file_lines, header_row_prefix), footer_row_prefix
+        )
+    except ValueError as ex:
+        raise ValueError(f"Failed to load Mbank file. {ex}") from ex
 
-        temp_file_path = data_path + "temp_mbank.csv"
-        temp_file = open(temp_file_path, "w", encoding="utf-8")
 
-        decoded_str = decoded.decode("utf-8")
-        lines = decoded_str.split("\n")
-        non_empty_lines = [line for line in lines if line.strip() != ""]
-        cleaned_decoded_content = ""
-        for line in non_empty_lines:
-            cleaned_decoded_content += line + "\n"
+def read_csv(
+    file: BinaryIO,
+    file_format: models.FileFormat | None = None,
+    chunksize: int | None = None,
+):
+    file_format = file_format or models.FileFormat()
+    return pd.read_csv(
+        lines.LinesReader(tabular_data(lines.decode(file, file_format.encoding))),
+        sep=file_format.delimiter or ";",
+        chunksize=chunksize,
+    )
 
-        temp_file.write(cleaned_decoded_content)
-        temp_file.close()
 
-        result = self.load_file_by_filename("temp_mbank.csv")
-        os.remove(temp_file_path)
-
-        return result
+class Mbank(models.Importer):
+    # Mbank bank (PL) - https://www.mbank.pl
 
-    def __skip_rows_footer(self, file_path: str):
-        skiprows = 0
-        skipfooter = 0
-        lines = 0
-        for row in open(file_path):
-            if "#Data operacji" in row:
-                skiprows = lines
-            if "#Saldo" in row:
-                skipfooter = lines
-            lines += 1
-        return {"skiprows": skiprows, "skipfooter": lines - skipfooter}
+    operations_order = models.OperationsOrder.DATE
+
+    def load_file_by_filename(
+        self, file_path: str, file_format: models.FileFormat | None = None
+    ) -> pd.DataFrame:
+        with lines.open_binary(file_path, None) as file:
+            return read_csv(file, file_format)
+
+    def load_file_by_contents(
+        self, contents: bytes, file_format: models.FileFormat | None = None
+    ) -> pd.DataFrame:
+        with lines.open_binary(None, contents) as file:
+            return read_csv(file, file_format)
+
+    def load_chunks_by_filename(
+        self,
+        file_path: str,
+        chunksize: int,
+        file_format: models.FileFormat | None = None,
+    ):
+        with lines.open_binary(file_path, None) as file:
+            yield from read_csv(file, file_format, chunksize)
+
+    def load_chunks_by_contents(
+        self,
+        contents: bytes,
+        chunksize: int,
+        file_format: models.FileFormat | None = None,
+    ):
+        with lines.open_binary(None, contents) as file:
+            yield from read_csv(file, file_format, chunksize)
 
     def format_file(self, df: pd.DataFrame, account_id: str):
-
-        df = df[["#Data operacji", "#Kategoria"]]
-        df = df.loc[:, ~df.columns.duplicated()]
-
-        df = df.rename(columns={"#Data operacji": "Title", "#Kategoria": "Operation"})
-        df["Operation"] = df["Operation"].str.replace(r"PLN", "")
-        df["Date"] = df.index
-
-        df["Date"] = pd.to_datetime(df.Date)
-        df["Date"] = df["Date"].dt.date
-        df["Account"] = account_id
-        df["Account"] = df["Account"].astype("string")
-        df["Currency"] = "PLN"
-        df["Details"] = np.NaN
-        df["Balance"] = np.NaN
-
-        df["Operation"] = df["Operation"].str.replace(",", ".")
-        df["Operation"] = df["Operation"].str.replace(" ", "")
-        df["Operation"] = pd.to_numeric(df["Operation"])
-
-        result = self.__add_missing_columns(df, ["Category", "Comment"])
-        result = result.sort_values(by="Date")
-        result.reset_index(drop=True, inplace=True)
-        result = result[db.account_columns]
-        return result
-
-    def __add_missing_columns(self, df: pd.DataFrame, columns):
-        existing_columns = list(df.columns)
-        return df.reindex(columns=existing_columns + columns)
+        return self.sort_operations(self.format_chunk(df, account_id))
+
+    def format_chunk(self, df: pd.DataFrame, account_id: str):
+        # data rows have more fields than the header, so dates are read as an index
+        # and descriptions of operations end up in the '#Data operacji' column
+        operations = (
+            df["#Kategoria"]
+            .str.replace("PLN", "", regex=False)
+            .str.replace(",", ".", regex=False)
+            .str.replace(" ", "", regex=False)
+        )
+        return columns.account_operations(
+            account_id,
+            dates=columns.dates(df.index.to_series(), date_format),
+            titles=df["#Data operacji"],
+            operations=pd.to_numeric(operations),
+            currencies=columns.constant("PLN", len(df)),
+        )
@@ -1,102 +1,88 @@
-import io
+from typing import BinaryIO
 
-import numpy as np
 import pandas as pd
 
+import mankkoo.account.importer.columns as columns
+import mankkoo.account.importer.lines as lines
 import mankkoo.account.models as models
-import mankkoo.database as db
 
+date_format = "%Y-%m-%d"
 
-def select_only_required_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df[
-        [
-            "Data transakcji",
-            "Odbiorca/Zleceniodawca",
-            "Opis",
-            "Obciążenia",
-            "Uznania",
-            "Waluta",
-        ]
-    ]
-    return df
+# columns read from an export with their types
+dtypes = {
+    "Data transakcji": str,
+    "Odbiorca/Zleceniodawca": str,
+    "Opis": str,
+    "Obciążenia": "float64",
+    "Uznania": "float64",
+    "Waluta": "category",
+}
 
 
-def get_operation(df: pd.DataFrame) -> pd.DataFrame:
-    df["Operation"] = np.where(df["Obciążenia"] < 0, df["Obciążenia"], df["Uznania"])
-    return df
+def read_csv(
+    file: BinaryIO,
+    file_format: models.FileFormat | None = None,
+    chunksize: int | None = None,
+):
+    file_format = file_format or models.FileFormat()
+    return pd.read_csv(
+        lines.decode(file, file_format.encoding),
+        sep=file_format.delimiter or ",",
+        usecols=list(dtypes),
+        dtype=dtypes,
+        chunksize=chunksize,
+    )
 
 
-def prepare_tile(df: pd.DataFrame) -> pd.DataFrame:
-    df["Title"] = df["Odbiorca/Zleceniodawca"] + " - " + df["Opis"]
-    df["Title"] = df["Title"].str.replace(",", "")
-    df["Title"] = df["Title"].str.replace(r"\s+", " ", regex=True)
-    df["Title"] = df["Title"].str.strip()
-    return df
-
-
-def remove_unnecessary_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.drop(columns=["Obciążenia", "Uznania", "Odbiorca/Zleceniodawca"])
-    return df
-
-
-def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.rename(columns={"Data transakcji": "Date", "Waluta": "Currency"})
-    return df
-
-
-def format_date_column(df: pd.DataFrame) -> pd.DataFrame:
-    df["Date"] = pd.to_datetime(df.Date)
-    df["Date"] = df["Date"].dt.date
-    return df
-
-
-def add_account_id_to_each_row(df: pd.DataFrame, account_id: str) -> pd.DataFrame:
-    df["Account"] = account_id
-    df["Account"] = df["Account"].astype("string")
-    return df
-
-
-def add_details_and_balance_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df["Details"] = np.NaN
-    df["Balance"] = np.NaN
-    return df
-
-
-def add_empty_columns(df: pd.DataFrame, columns) -> pd.DataFrame:
-    existing_columns = list(df.columns)
-    return df.reindex(columns=existing_columns + columns)
-
-
-def reverse_rows_order(df: pd.DataFrame) -> pd.DataFrame:
-    return df.iloc[::-1]
-
-
-def order_columns(df: pd.DataFrame, columns_in_order: list[str]) -> pd.DataFrame:
-    return df[columns_in_order]
+def get_operation(df: pd.DataFrame) -> pd.Series:
+    debits = df["Obciążenia"]
+    return debits.where(debits < 0, df["Uznania"])
 
 
 class Millenium(models.Importer):
     # Millenium bank (PL) - https://www.bankmillennium.pl
 
-    def load_file_by_filename(self, file_path: str):
-        return pd.read_csv(file_path)
-
-    def load_file_by_contents(self, contents: bytes):
-        return pd.read_csv(io.StringIO(contents.decode("utf-8")))
+    # operations are exported from the newest one
+    operations_order = models.OperationsOrder.REVERSED
+
+    def load_file_by_filename(
+        self, file_path: str, file_format: models.FileFormat | None = None
+    ):
+        with lines.open_binary(file_path, None) as file:
+            return read_csv(file, file_format)
+
+    def load_file_by_contents(
+        self, contents: bytes, file_format: models.FileFormat | None = None
+    ):
+        with lines.open_binary(None, contents) as file:
+            return read_csv(file, file_format)
+
+    def load_chunks_by_filename(
+        self,
+        file_path: str,
+        chunksize: int,
+        file_format: models.FileFormat | None = None,
+    ):
+        with lines.open_binary(file_path, None) as file:
+            yield from read_csv(file, file_format, chunksize)
+
+    def load_chunks_by_contents(
+        self,
+        contents: bytes,
+        chunksize: int,
+        file_format: models.FileFormat | None = None,
+    ):
+        with lines.open_binary(None, contents) as file:
+            yield from read_csv(file, file_format, chunksize)
 
     def format_file(self, df: pd.DataFrame, account_id: str):
-        df = (
-            df.pipe(select_only_required_columns)
-            .pipe(get_operation)
-            .pipe(prepare_tile)
-            .pipe(remove_unnecessary_columns)
-            .pipe(rename_columns)
-            .pipe(format_date_column)
-            .pipe(add_account_id_to_each_row, account_id)
-            .pipe(add_details_and_balance_columns)
-            .pipe(add_empty_columns, ["Category", "Comment"])
-            .pipe(reverse_rows_order)
-            .pipe(order_columns, db.account_columns)
+        return self.sort_operations(self.format_chunk(df, account_id))
+
+    def format_chunk(self, df: pd.DataFrame, account_id: str):
+        return columns.account_operations(
+            account_id,
+            dates=columns.dates(df["Data transakcji"], date_format),
+            titles=columns.title(df["Odbiorca/Zleceniodawca"], df["Opis"]),
+            operations=get_operation(df),
+            currencies=columns.currencies(df["Waluta"]),
         )
-
-        return df
@@ -0,0 +1,136 @@
+"""Registry of bank account importers.
+
+Importers are registered with a ``"module:Class"`` reference, so a bank module (and everything it
+imports) is loaded only when a file of that bank is imported for the first time. Then a single
+instance of an importer is kept for the lifetime of the process.
+
+Each registration also declares whether an importer can parse a file in chunks (``streaming``) and
+byte ``markers`` which all need to be found at the beginning of a file of that bank, so that a file
+can be routed to an importer without loading any of them.
+
+Importers defined in already loaded modules can be registered with the ``importer`` decorator.
+"""
+
+import importlib
+import threading
+from dataclasses import dataclass
+
+import mankkoo.account.models as models
+from mankkoo.account.models import Bank
+
+sniff_size = 8192
+"""Number of bytes from the beginning of a file in which markers are looked for"""
+
+
+@dataclass(frozen=True)
+class ImporterSpec:
+    bank: Bank
+    target: str | type
+    streaming: bool = False
+    markers: tuple[bytes, ...] = ()
+
+    def matches(self, head: bytes) -> bool:
+        return bool(self.markers) and all(marker in head for marker in self.markers)
+
+
+__specs: dict[Bank, ImporterSpec] = {}
+__instances: dict[Bank, models.Importer] = {}
+__lock = threading.Lock()
+
+
+def register(
+    bank: Bank,
+    target: str | type,
+    streaming: bool = False,
+    markers: tuple[bytes, ...] = (),
+) -> None:
+    """Registers an importer of a bank, replacing a previous one.
+
+    Args:
+        bank (Bank): bank whose exports are handled by an importer
+        target (str | type): ``"module:Class"`` reference to an importer class (loaded on first use) or a class itself
+        streaming (bool): True if an importer implements ``load_chunks_by_*`` methods
+        markers (tuple[bytes]): byte strings which all occur in the first ``sniff_size`` bytes of an export
+    """
+    with __lock:
+        __specs[bank] = ImporterSpec(bank, target, streaming, tuple(markers))
+        __instances.pop(bank, None)
+
+
+def unregister(bank: Bank) -> None:
+    with __lock:
+        __specs.pop(bank, None)
+        __instances.pop(bank, None)
+
+
+def importer(bank: Bank, streaming: bool = False, markers: tuple[bytes, ...] = ()):
+    """Class decorator registering an importer of a bank."""
+
+    def decorator(cls: type) -> type:
+        register(bank, cls, streaming, markers)
+        return cls
+
+    return decorator
+
+
+def get_spec(bank: Bank) -> ImporterSpec:
+    with __lock:
+        spec = __specs.get(bank)
+    if spec is None:
+        raise KeyError(
+            "Failed to load data from file. Not known bank. Was provided {} bank".format(
+                str(bank)
+            )
+        )
+    return spec
+
+
+def get_importer(bank: Bank) -> models.Importer:
+    """Returns a shared instance of a bank importer, loading its module on first use."""
+    spec = get_spec(bank)
+    with __lock:
+        instance = __instances.get(bank)
+        if instance is None:
+            instance = __load_class(spec.target)()
+            __instances[bank] = instance
+        return instance
+
+
+def detect(contents: bytes) -> Bank | None:
+    """Finds a bank whose markers all occur at the beginning of a file, without loading any importer."""
+    head = contents[:sniff_size]
+    with __lock:
+        specs = list(__specs.values())
+    return next((spec.bank for spec in specs if spec.matches(head)), None)
+
+
+def banks() -> list[Bank]:
+    with __lock:
+        return list(__specs)
+
+
+def __load_class(target: str | type) -> type:
+    if isinstance(target, type):
+        return target
+    module_name, class_name = target.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+register(
+    Bank.PL_ING,
+    "mankkoo.account.importer.pl_ing:Ing",
+    streaming=True,
+    markers=(b'"Data transakcji";', b'"Dane kontrahenta"'),
+)
+register(
+    Bank.PL_MBANK,
+    "mankkoo.account.importer.pl_mbank:Mbank",
+    streaming=True,
+    markers=(b"#Data operacji;",),
+)
+register(
+    Bank.PL_MILLENIUM,
+    "mankkoo.account.importer.pl_millenium:Millenium",
+    streaming=True,
+    markers=(b'"Data transakcji"', b'"Odbiorca/Zleceniodawca"'),
+)
@@ -0,0 +1,43 @@
+"""Recognizes a format of a bank export from its first few KB, without parsing it."""
+
+import codecs
+
+import mankkoo.account.importer.registry as registry
+from mankkoo.account.models import Bank, FileFormat
+
+delimiters = (";", ",", "\t")
+
+
+def sniff(contents: bytes) -> FileFormat:
+    """Detects a bank (by markers of registered importers), an encoding and a delimiter of an export.
+
+    Only the first ``registry.sniff_size`` bytes are read, so it takes the same time for any file size.
+    """
+    head = contents[: registry.sniff_size]
+    bank = registry.detect(head)
+    return FileFormat(bank, detect_encoding(head), __detect_delimiter(head, bank))
+
+
+def detect_encoding(contents: bytes) -> str:
+    """Polish banks export either UTF-8 (optionally with BOM) or windows-1250 files."""
+    head = contents[: registry.sniff_size]
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # an incremental decoder doesn't fail on a character cut in half at the end of the head
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "windows-1250"
+
+
+def __detect_delimiter(head: bytes, bank: Bank | None) -> str | None:
+    if bank is None:
+        return None
+    marker = registry.get_spec(bank).markers[0]
+    start = head.find(marker)
+    start = head.rfind(b"\n", 0, start) + 1
+    header = head[start:].split(b"\n", 1)[0]
+    counts = {delimiter: header.count(delimiter.encode()) for delimiter in delimiters}
+    delimiter = max(counts, key=counts.get)
+    return delimiter if counts[delimiter] > 0 else None
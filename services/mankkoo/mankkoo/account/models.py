@@ -1,18 +1,57 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from enum import Enum
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    # loaded only by importers, so that the models don't load pandas at startup
+    import pandas as pd
+
+ImportProgress = Callable[[str, int, int | None], None]
+"""Callback notified about import progress with a stage name ('parsed', 'formatted', 'deduplicated',
+'prepared', 'stored'), number of rows processed so far and total number of rows (None if not known yet).
+Stages of chunked imports interleave, so time between two notifications is spent on the reported stage."""
+
+
+class OperationsOrder(Enum):
+    """Order in which an export lists operations, from which they're put in chronological order
+
+    Args:
+        Enum (str): FILE - from the oldest one, REVERSED - from the newest one, DATE - by their dates
+            (operations of the same day keep the order of a file)
+    """
+
+    FILE = "file"
+    REVERSED = "reversed"
+    DATE = "date"
 
-import pandas as pd
+
+@dataclass(frozen=True)
+class FileFormat:
+    """Format of an export recognized by ``sniffer.sniff``, None if it's not known"""
+
+    bank: Bank | None = None
+    encoding: str | None = None
+    delimiter: str | None = None
 
 
 class Importer(ABC):
     """Parent class for every bank account importer, which takes care for transforming bank specific format into Mankkoo's"""
 
+    operations_order = OperationsOrder.FILE
+    """Order of operations in an export, used to sort chunks of a file without holding all of them"""
+
     @abstractmethod
-    def load_file_by_filename(self, file_name: str) -> pd.DataFrame:
+    def load_file_by_filename(
+        self, file_name: str, file_format: FileFormat | None = None
+    ) -> pd.DataFrame:
         """Load bank specific account history file located in /data folder into Pandas DataFrame
 
         Args:
             file_name (str): name of a file
+            file_format (FileFormat, optional): encoding and delimiter of a file, detected if not provided
 
         Returns:
             pd.DataFrame: raw, unformatted Pandas Dataframe
@@ -20,11 +59,14 @@ class Importer(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def load_file_by_contents(self, contents: bytes) -> pd.DataFrame:
+    def load_file_by_contents(
+        self, contents: bytes, file_format: FileFormat | None = None
+    ) -> pd.DataFrame:
         """Load bank specific account history from 64base encoded string, provided from UI
 
         Args:
             contents (str): base64 encoded string
+            file_format (FileFormat, optional): encoding and delimiter of a file, detected if not provided
 
         Returns:
             pd.DataFrame: raw, unformatted Pandas Dataframe
@@ -44,6 +86,64 @@ class Importer(ABC):
         """
         raise NotImplementedError
 
+    def load_chunks_by_filename(
+        self, file_path: str, chunksize: int, file_format: FileFormat | None = None
+    ) -> Iterator[pd.DataFrame]:
+        """Load bank specific account history file in chunks of raw rows. Importers which can't
+        parse a file in chunks load it as a single chunk.
+
+        Args:
+            file_path (str): absolute file location
+            chunksize (int): max number of rows in a chunk
+            file_format (FileFormat, optional): encoding and delimiter of a file, detected if not provided
+
+        Returns:
+            Iterator[pd.DataFrame]: raw, unformatted chunks, in the order of a file
+        """
+        yield self.load_file_by_filename(file_path, file_format)
+
+    def load_chunks_by_contents(
+        self, contents: bytes, chunksize: int, file_format: FileFormat | None = None
+    ) -> Iterator[pd.DataFrame]:
+        """Load bank specific account history from file contents in chunks of raw rows.
+
+        Args:
+            contents (bytes): content of a file
+            chunksize (int): max number of rows in a chunk
+            file_format (FileFormat, optional): encoding and delimiter of a file, detected if not provided
+
+        Returns:
+            Iterator[pd.DataFrame]: raw, unformatted chunks, in the order of a file
+        """
+        yield self.load_file_by_contents(contents, file_format)
+
+    def format_chunk(self, df: pd.DataFrame, account_id: str) -> pd.DataFrame:
+        """Transforms a chunk of raw rows into Mankkoo's format, without changing the order of rows
+
+        Args:
+            df (pd.DataFrame): raw, unformatted chunk of account history
+            account_id (str): id of an account
+
+        Returns:
+            pd.DataFrame: formatted chunk
+        """
+        return self.format_file(df, account_id)
+
+    def sort_operations(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Orders formatted operations from the oldest one, according to ``operations_order``
+
+        Args:
+            df (pd.DataFrame): formatted operations, in the order of a file
+
+        Returns:
+            pd.DataFrame: operations in chronological order
+        """
+        if self.operations_order is OperationsOrder.REVERSED:
+            df = df.iloc[::-1]
+        elif self.operations_order is OperationsOrder.DATE:
+            df = df.sort_values(by="Date", kind="stable")
+        return df.reset_index(drop=True)
+
 
 class FileType(Enum):
     """Representation of file type supported in Mankkoo
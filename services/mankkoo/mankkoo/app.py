@@ -1,3 +1,4 @@
+import atexit
 import os
 import select
 import threading
@@ -7,6 +8,10 @@ from apiflask import APIFlask
 from flask_cors import CORS
 
 import mankkoo.database as db
+import mankkoo.partitioning as partitioning
+import mankkoo.projections as projections
+import mankkoo.refresh_scheduler as refresh_scheduler
+import mankkoo.schema as schema
 import mankkoo.views as views
 from mankkoo.base_logger import log
 from mankkoo.config import DevConfig, ProdConfig
@@ -60,7 +65,17 @@ def create_app(app_config=None):
     app.register_blueprint(investment_endpoints, url_prefix="/api/investments")
     app.register_blueprint(stream_endpoints, url_prefix="/api/streams")
 
-    db.init_db()
+    # replicas may leave migrations to a deployment step (python -m mankkoo.schema)
+    if os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true":
+        schema.migrate()
+    partitioning.ensure_partitions()
+    projections.rebuild_if_empty()
+    atexit.register(db.close_pool)
+
+    @app.cli.command("rebuild-projections")
+    def rebuild_projections_command():
+        """Rebuild all projection tables from the events."""
+        projections.rebuild_all()
 
     start_listener_thread()
     return app
@@ -74,11 +89,12 @@ def start_listener_thread():
 def listen_to_db_notifications():
     log.info("Starting listening to database notifications...")
 
-    conn = db.get_connection()
+    conn = db.create_connection()
     conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
 
     cursor = conn.cursor()
     cursor.execute("LISTEN events_added;")
+    cursor.execute("LISTEN views_updated;")
 
     while True:
         if select.select([conn], [], [], 5) == ([], [], []):
@@ -93,7 +109,12 @@ def handle_notification(notify):
     log.info(
         f"Received notification. Channel: '{notify.channel}'. Payload: '{notify.payload}'"
     )
-    views.update_views(notify.payload)
+    if notify.channel == "views_updated":
+        views.invalidate_cache(notify.payload or None)
+        return
+
+    from_date, stream_ids = refresh_scheduler.parse_notification(notify.payload)
+    refresh_scheduler.get_scheduler().submit(from_date, stream_ids)
 
 
 if __name__ == "__main__":
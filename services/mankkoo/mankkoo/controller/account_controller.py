@@ -1,10 +1,8 @@
-import traceback
+from apiflask import APIBlueprint, Schema, abort
+from apiflask.fields import Dict, File, Float, Integer, Nested, String
 
-from apiflask import APIBlueprint, Schema
-from apiflask.fields import File, String
-
-from mankkoo.account import account
 from mankkoo.account import account_db as database
+from mankkoo.account import import_jobs
 from mankkoo.account.account_db import Account, AccountOperation
 from mankkoo.base_logger import log
 
@@ -14,6 +12,27 @@ account_endpoints = APIBlueprint("account_endpoints", __name__, tag="Account")
 class AccountOperationResult(Schema):
     result = String()
     details = String()
+    jobId = String()
+
+
+class ImportJobStage(Schema):
+    durationMs = Float()
+
+
+class ImportJobStatus(Schema):
+    jobId = String()
+    accountId = String()
+    fileName = String(allow_none=True)
+    status = String()
+    submittedAt = String()
+    startedAt = String(allow_none=True)
+    finishedAt = String(allow_none=True)
+    durationMs = Integer(allow_none=True)
+    rowsParsed = Integer()
+    rowsStored = Integer()
+    rowsTotal = Integer(allow_none=True)
+    stages = Dict(keys=String(), values=Nested(ImportJobStage))
+    error = String(allow_none=True)
 
 
 @account_endpoints.route("", methods=["GET"])
@@ -43,25 +62,32 @@ class OperationsImport(Schema):
 
 @account_endpoints.route("/<account_id>/operations/import", methods=["POST"])
 @account_endpoints.input(OperationsImport, location="files")
-@account_endpoints.output(AccountOperationResult, status_code=200)
+@account_endpoints.output(AccountOperationResult, status_code=202)
 @account_endpoints.doc(
     summary="Import account operations",
-    description="Import new operations from a file to an account",
+    description="Submit a job importing new operations from a file to an account. Its progress can be checked with the returned job id.",
 )
 def import_operations(account_id, files_data):
-    log.info(f'Adding new operations to account with id {account_id}"...')
-
-    try:
-        account.add_new_operations(account_id, None, files_data["operations"].read())
-        log.info(
-            f'New account operations have been added to account with id "{account_id}".'
-        )
-        return {
-            "result": "Success",
-            "details": "New account operations have been added!",
-        }
-    except Exception as ex:
-        log.info(
-            f"Failed to add new operations. Err: {ex}, traceback: {traceback.format_exc()}"
-        )
-        return {"result": "Failure", "details": str(ex)}, 500
+    log.info(f'Submitting import of new operations to account with id {account_id}"...')
+
+    file = files_data["operations"]
+    job = import_jobs.get_import_jobs().submit(account_id, file.stream, file.filename)
+    return {
+        "result": "Accepted",
+        "details": "New account operations will be added in the background.",
+        "jobId": job.id,
+    }
+
+
+@account_endpoints.route("/imports/<job_id>", methods=["GET"])
+@account_endpoints.output(ImportJobStatus, status_code=200)
+@account_endpoints.doc(
+    summary="Import job status",
+    description="Get rows parsed and stored, timing of each stage and an error (if any) of an import job",
+)
+def import_job_status(job_id):
+    log.info(f"Fetching status of the {job_id} import job...")
+    job = import_jobs.get_import_jobs().get(job_id)
+    if job is None:
+        abort(404, f"There is no import job with an id '{job_id}'")
+    return job.to_dict()
@@ -1,6 +1,8 @@
 from apiflask import APIBlueprint, Schema
-from apiflask.fields import Date, List, Raw, String
+from apiflask.fields import Date, Dict, Float, Integer, List, Nested, Raw, String
 
+import mankkoo.database as db
+import mankkoo.refresh_scheduler as refresh_scheduler
 import mankkoo.views as views
 
 admin_endpoints = APIBlueprint("admin_endpoints", __name__, tag="Admin Operations")
@@ -81,3 +83,80 @@ def load_specific_view(view_name):
             "success": "false",
             "message": f'Error loading view "{view_name}": {str(e)}',
         }, 500
+
+
+class ViewsRefreshResponse(Schema):
+    startedAt = String()
+    fromDate = String(allow_none=True)
+    streamIds = List(String(), allow_none=True)
+    durationMs = Float()
+    views = Dict(keys=String(), values=Float())
+    skipped = List(String())
+    inputs = Dict(keys=String(), values=Float())
+    errors = Dict(keys=String(), values=String())
+
+
+@admin_endpoints.route("/views-refresh", methods=["GET"])
+@admin_endpoints.output(ViewsRefreshResponse, status_code=200)
+@admin_endpoints.doc(
+    summary="Last Views Refresh",
+    description="Timings (in milliseconds) of each view and shared input from the last views refresh",
+)
+def last_views_refresh():
+    return views.last_refresh() or {}
+
+
+class ScheduledRefreshSchema(Schema):
+    fromDate = String(allow_none=True)
+    streamIds = List(String(), allow_none=True)
+    requests = Integer()
+    firstRequestedAt = String()
+    startedAt = String(allow_none=True)
+    finishedAt = String(allow_none=True)
+    error = String(allow_none=True)
+
+
+class ViewsRefreshSchedulerResponse(Schema):
+    quietPeriodMs = Integer()
+    maxDelayMs = Integer()
+    pending = Nested(ScheduledRefreshSchema, allow_none=True)
+    running = Nested(ScheduledRefreshSchema, allow_none=True)
+    lastCompleted = Nested(ScheduledRefreshSchema, allow_none=True)
+
+
+@admin_endpoints.route("/views-refresh/scheduler", methods=["GET"])
+@admin_endpoints.output(ViewsRefreshSchedulerResponse, status_code=200)
+@admin_endpoints.doc(
+    summary="Views Refresh Scheduler Status",
+    description="Pending (coalesced) and running views refreshes triggered by database notifications",
+)
+def views_refresh_scheduler_status():
+    return refresh_scheduler.get_scheduler().status()
+
+
+class DbPoolStatsResponse(Schema):
+    minSize = Integer()
+    maxSize = Integer()
+    size = Integer()
+    idle = Integer()
+    inUse = Integer()
+    peakInUse = Integer()
+    saturation = Float()
+    checkouts = Integer()
+    waits = Integer()
+    timeouts = Integer()
+    waitTimeTotalMs = Float()
+    waitTimeMaxMs = Float()
+    waitTimeAvgMs = Float()
+    connectionsCreated = Integer()
+    connectionsDiscarded = Integer()
+
+
+@admin_endpoints.route("/db-pool", methods=["GET"])
+@admin_endpoints.output(DbPoolStatsResponse, status_code=200)
+@admin_endpoints.doc(
+    summary="Database Connection Pool Metrics",
+    description="Current size, saturation, checkouts and wait times of the database connection pool",
+)
+def db_pool_stats():
+    return db.pool_stats()
@@ -2,6 +2,7 @@ from apiflask import APIBlueprint, Schema
 from apiflask.fields import Boolean, Float, Integer, List, String
 
 import mankkoo.views as views
+from mankkoo.controller.view_response import view_response
 from mankkoo.investment import investment_db
 from mankkoo.investment.investment import create_investment_event_entry
 
@@ -22,10 +23,10 @@ class InvestmentIndicators(Schema):
     description="Key investment performance metrics including total investments, yearly results, and inflation comparison",
 )
 def investment_indicators():
-    indicators = views.load_view(views.investment_indicators_key)
-    if indicators is None:
+    response = view_response(views.investment_indicators_key)
+    if response is None:
         return {"result": "Failure", "details": "Indicators not available"}, 404
-    return indicators
+    return response
 
 
 class WalletsResponse(Schema):
@@ -59,6 +60,8 @@ class InvestmentStreamResponse(Schema):
     investmentType = String()
     subtype = String()
     balance = Float()
+    units = Float()
+    pricePerUnit = Float(allow_none=True)
 
 
 @investment_endpoints.route("")
@@ -2,6 +2,7 @@ from apiflask import APIBlueprint, Schema
 from apiflask.fields import Float, List, String
 
 import mankkoo.views as views
+from mankkoo.controller.view_response import view_response
 
 main_endpoints = APIBlueprint("main_endpoints", __name__, tag="Main Page")
 
@@ -19,7 +20,7 @@ class MainIndicators(Schema):
     summary="Main Indicators", description="Key indicators of a total wealth"
 )
 def indicators():
-    return views.load_view(views.main_indicators_key)
+    return view_response(views.main_indicators_key)
 
 
 class SavingsDistribution(Schema):
@@ -35,7 +36,7 @@ class SavingsDistribution(Schema):
     description="Information about the distribution of wealth",
 )
 def savings_distribution():
-    return views.load_view(views.current_savings_distribution_key)
+    return view_response(views.current_savings_distribution_key)
 
 
 class TotalHistoryPerDay(Schema):
@@ -49,7 +50,7 @@ class TotalHistoryPerDay(Schema):
     summary="Total History", description="A history of a total wealth in each day"
 )
 def total_history():
-    return views.load_view(views.total_history_per_day_key)
+    return view_response(views.total_history_per_day_key)
 
 
 class TotalMonthlyProfits(Schema):
@@ -64,4 +65,4 @@ class TotalMonthlyProfits(Schema):
     description="A history of a monthly profit and loss statements",
 )
 def monthly_profits():
-    return views.load_view(views.monthly_income_key)
+    return view_response(views.monthly_income_key)
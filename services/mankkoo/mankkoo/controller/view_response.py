@@ -0,0 +1,31 @@
+from flask import Response, request
+
+import mankkoo.views as views
+
+
+def view_response(view_name: str):
+    """Returns a view as a response with its pre-serialized JSON payload (gzipped if the client accepts it),
+    or an empty 304 response if the client already has its current version (If-None-Match header).
+    None if the view doesn't exist."""
+    entry = views.load_view_entry(view_name)
+    if entry is None:
+        return None
+
+    gzipped = entry.payload_gzip is not None and "gzip" in request.accept_encodings
+    # representations with different encodings must have different (strong) ETags
+    etag = f"{entry.etag}-gzip" if gzipped else entry.etag
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(
+            entry.payload_gzip, mimetype="application/json", headers=headers
+        )
+    return Response(entry.payload, mimetype="application/json", headers=headers)
@@ -1,6 +1,9 @@
 import os
+import threading
+import time
 
 import psycopg2
+import psycopg2.extensions
 
 from mankkoo.base_logger import log
 
@@ -46,124 +49,6 @@ total_columns = ["Date", "Total"]
 total_monthly_columns = ["Date", "Income", "Spending", "Profit"]
 
 
-def init_db():
-    log.info("Initializing database with tables and functions...")
-    execute("""
-        CREATE TABLE IF NOT EXISTS streams
-        (
-            id              UUID                      NOT NULL    PRIMARY KEY,
-            type            TEXT                      NOT NULL,
-            subtype         TEXT                      NOT NULL,
-            bank            TEXT,
-            name            TEXT                      NOT NULL,
-            active          BOOLEAN                   NOT NULL    default true,
-            version         BIGINT                    NOT NULL,
-            metadata        JSONB,
-            labels          JSONB
-        );
-
-        CREATE TABLE IF NOT EXISTS events
-        (
-            id              UUID                      NOT NULL    PRIMARY KEY,
-            stream_id       UUID                      NOT NULL,
-            type            TEXT                      NOT NULL,
-            data            JSONB                     NOT NULL,
-            version         BIGINT                    NOT NULL,
-            occured_at      timestamp with time zone  NOT NULL,
-            added_at        timestamp with time zone  NOT NULL    default (now()),
-
-            FOREIGN KEY(stream_id) REFERENCES streams(id),
-            CONSTRAINT events_stream_and_version UNIQUE(stream_id, version)
-        );
-
-        CREATE TABLE IF NOT EXISTS views
-        (
-            name            TEXT                      NOT NULL    PRIMARY KEY,
-            content         JSONB,
-            updated_at      timestamp with time zone  NOT NULL    default (now())
-        );
-
-        CREATE OR REPLACE FUNCTION append_event
-        (
-            id uuid,
-            data jsonb,
-            type text,
-            stream_id uuid,
-            stream_type text,
-            occured_at timestamp with time zone,
-            expected_stream_version bigint default null
-        ) RETURNS boolean
-            LANGUAGE plpgsql
-            AS $$
-            DECLARE
-                stream_version int;
-                error_message text;
-            BEGIN
-
-                -- get stream version
-                SELECT
-                    version INTO stream_version
-                FROM streams as s
-                WHERE
-                    s.id = stream_id FOR UPDATE;
-
-                -- if stream doesn't exist - create new one with version 0
-                IF stream_version IS NULL THEN
-                    stream_version := 0;
-
-                    INSERT INTO streams
-                        (id, type, subtype, name, bank, version)
-                    VALUES
-                        (stream_id, stream_type, 'Default stream subtype', 'Default Stream Name', 'Default Bank', stream_version);
-                END IF;
-
-                -- increment event_version
-                stream_version := stream_version + 1;
-
-                -- check optimistic concurrency
-                IF expected_stream_version IS NOT NULL AND stream_version != expected_stream_version THEN
-                    RAISE EXCEPTION 'Expecting "%', stream_version || '" as next stream version but "' || expected_stream_version || '" was provided';
-                END IF;
-
-                -- append event
-                INSERT INTO events
-                    (id, data, stream_id, type, version, occured_at)
-                VALUES
-                    (id, data::jsonb, stream_id, type, stream_version, occured_at);
-
-
-                -- update stream version
-                UPDATE streams as s
-                    SET version = stream_version
-                WHERE
-                    s.id = stream_id;
-
-                RETURN TRUE;
-            END;
-            $$;
-
-        CREATE OR REPLACE FUNCTION notification_trigger() RETURNS TRIGGER AS
-            $$
-            DECLARE
-                oldest_occured_date text;
-            BEGIN
-
-                SELECT min(occured_at)::date::text
-                INTO oldest_occured_date
-                FROM events WHERE added_at >= NOW() - interval '20 days';
-
-                PERFORM pg_notify('events_added', oldest_occured_date);
-                RETURN NULL;
-            END;
-            $$ LANGUAGE plpgsql;
-
-        CREATE OR REPLACE TRIGGER capture_event_added_trigger AFTER INSERT ON events
-        FOR EACH STATEMENT EXECUTE FUNCTION notification_trigger();
-        """)
-
-    log.info("Database initialized")
-
-
 def execute(sql: str, params=None):
     with get_connection() as conn:
         with conn.cursor() as cur:
@@ -174,17 +59,319 @@ def execute(sql: str, params=None):
             conn.commit()
 
 
-def get_connection():
-    host = os.getenv("DB_HOST", "localhost")
-    port = os.getenv("DB_PORT", "5432")
-    database = os.getenv("DB_NAME", "postgres")
-    username = os.getenv("DB_USERNAME", "postgres")
-    password = os.getenv("DB_PASSWORD", "postgres")
+def connection_params() -> dict:
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": os.getenv("DB_PORT", "5432"),
+        "database": os.getenv("DB_NAME", "postgres"),
+        "user": os.getenv("DB_USERNAME", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "postgres"),
+    }
+
+
+def create_connection():
+    """Open a new, non-pooled connection. Use it only for long-lived sessions (e.g. LISTEN)."""
+    params = connection_params()
     log.info(
-        f"Getting connection to db: postgresql://{host}:{port}/{database}?user={username}&password={password}..."
+        f"Opening connection to db: postgresql://{params['host']}:{params['port']}/{params['database']}?user={params['user']}..."
     )
+    return psycopg2.connect(**params)
 
-    conn = psycopg2.connect(
-        host=host, port=port, database=database, user=username, password=password
-    )
-    return conn
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class _PoolEntry:
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class PooledConnection:
+    """Thin proxy over a psycopg2 connection checked out from a ConnectionPool.
+
+    It behaves like a regular connection, but leaving the ``with`` block (or calling ``close()``)
+    hands the connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry: _PoolEntry | None = entry
+
+    @property
+    def raw(self):
+        if self._entry is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return self._entry.conn
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.raw, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.autocommit = True must change the connection, not the proxy
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.raw, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.raw.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Process-wide, thread-safe pool of psycopg2 connections.
+
+    Connections are health-checked on checkout when they were idle for longer than
+    ``health_check_after`` seconds and recycled once they are older than ``max_lifetime`` seconds.
+    When all ``max_size`` connections are in use, callers wait up to ``timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        params: dict,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 3600,
+        timeout: float = 30,
+        health_check_after: float = 30,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size. min_size={min_size}, max_size={max_size}"
+            )
+        self.params = params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._idle: list[_PoolEntry] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._peak_in_use = 0
+        self._created = 0
+        self._discarded = 0
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+            self._size += 1
+
+    def getconn(self) -> PooledConnection:
+        started_at = time.monotonic()
+        waited = False
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started_at)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Could not get a database connection within {self.timeout}s (max_size={self.max_size})"
+                    )
+                self._condition.wait(remaining)
+
+        try:
+            entry = self._ensure_usable(entry)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        wait_time = time.monotonic() - started_at
+        with self._condition:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+            self._peak_in_use = max(self._peak_in_use, self._size - len(self._idle))
+        return PooledConnection(self, entry)
+
+    def release(self, entry: _PoolEntry):
+        conn = entry.conn
+        keep = not self._closed and not conn.closed and not self._expired(entry)
+        if keep:
+            try:
+                if (
+                    conn.get_transaction_status()
+                    != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                keep = False
+
+        with self._condition:
+            if keep and not self._closed:
+                entry.last_used_at = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+                self._discarded += 1
+                self.__close_quietly(conn)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for entry in idle:
+            self.__close_quietly(entry.conn)
+        log.info("Database connection pool closed")
+
+    def stats(self) -> dict:
+        with self._condition:
+            in_use = self._size - len(self._idle)
+            return {
+                "minSize": self.min_size,
+                "maxSize": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "inUse": in_use,
+                "peakInUse": self._peak_in_use,
+                "saturation": round(in_use / self.max_size, 4),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "waitTimeTotalMs": round(self._wait_time_total * 1000, 3),
+                "waitTimeMaxMs": round(self._wait_time_max * 1000, 3),
+                "waitTimeAvgMs": (
+                    round(self._wait_time_total * 1000 / self._checkouts, 3)
+                    if self._checkouts
+                    else 0.0
+                ),
+                "connectionsCreated": self._created,
+                "connectionsDiscarded": self._discarded,
+            }
+
+    def _open(self) -> _PoolEntry:
+        conn = psycopg2.connect(**self.params)
+        with self._condition:
+            self._created += 1
+        return _PoolEntry(conn)
+
+    def _expired(self, entry: _PoolEntry) -> bool:
+        return time.monotonic() - entry.created_at > self.max_lifetime
+
+    def _ensure_usable(self, entry: _PoolEntry | None) -> _PoolEntry:
+        if entry is not None:
+            if entry.conn.closed or self._expired(entry):
+                self.__discard(entry)
+                entry = None
+            elif time.monotonic() - entry.last_used_at > self.health_check_after:
+                try:
+                    with entry.conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    entry.conn.rollback()
+                except psycopg2.Error:
+                    log.warning("Discarding broken database connection from the pool")
+                    self.__discard(entry)
+                    entry = None
+
+        if entry is None:
+            entry = self._open()
+        return entry
+
+    def __discard(self, entry: _PoolEntry):
+        with self._condition:
+            self._discarded += 1
+        self.__close_quietly(entry.conn)
+
+    @staticmethod
+    def __close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    params = connection_params()
+    pool = _pool
+    if pool is not None and pool.params == params:
+        return pool
+
+    with _pool_lock:
+        if _pool is not None and _pool.params == params:
+            return _pool
+        if _pool is not None:
+            # connection settings (e.g. DB_NAME set by create_app) have changed
+            _pool.close()
+
+        log.info(
+            f"Creating connection pool for db: postgresql://{params['host']}:{params['port']}/{params['database']}?user={params['user']}..."
+        )
+        _pool = ConnectionPool(
+            params,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            health_check_after=float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30")),
+        )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats() -> dict:
+    pool = _pool
+    return pool.stats() if pool is not None else {}
+
+
+def get_connection() -> PooledConnection:
+    return get_pool().getconn()
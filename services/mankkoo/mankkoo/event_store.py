@@ -144,24 +144,39 @@ def store(events: list[Event]):
     log.info(f"Storing {len(events)} event(s)...")
     with db.get_connection() as conn:
         with conn.cursor() as cur:
-            for event in events:
-                log.info(f"Storing {event}...")
+            for stream_id, stream_events in __group_by_stream(events).items():
+                log.info(
+                    f"Appending {len(stream_events)} event(s) to the stream {stream_id}..."
+                )
                 cur.execute(
-                    "SELECT append_event(%s::uuid, %s::jsonb, %s::text, %s::uuid, %s::text, %s, %s::bigint);",
+                    "SELECT append_events(%s::uuid, %s::text, %s::jsonb);",
                     (
-                        str(event.id),
-                        json.dumps(event.data),
-                        event.event_type,
-                        str(event.stream_id),
-                        event.stream_type,
-                        event.occured_at,
-                        event.version,
+                        str(stream_id),
+                        stream_events[0].stream_type,
+                        json.dumps([__event_to_json(event) for event in stream_events]),
                     ),
                 )
             conn.commit()
     log.info("All events have been stored")
 
 
+def __group_by_stream(events: list[Event]) -> dict[UUID, list[Event]]:
+    result: dict[UUID, list[Event]] = {}
+    for event in events:
+        result.setdefault(event.stream_id, []).append(event)
+    return result
+
+
+def __event_to_json(event: Event) -> dict:
+    return {
+        "id": str(event.id),
+        "type": event.event_type,
+        "data": event.data,
+        "version": event.version,
+        "occured_at": event.occured_at.isoformat(),
+    }
+
+
 def load(stream_id: UUID) -> list[Event]:
     log.info(f"Loading events for a stream {stream_id}...")
     result = []
@@ -209,6 +224,103 @@ def load_latest_event_id(stream_id: str) -> Event:
     )
 
 
+class StreamState:
+    """State of a stream folded by the database from its events."""
+
+    def __init__(
+        self,
+        stream_id: UUID,
+        version: int = 0,
+        units: float = 0.0,
+        balance: float | None = None,
+        price: float | None = None,
+        last_occured_at: datetime | None = None,
+    ):
+        self.stream_id = stream_id
+        self.version = version
+        self.units = units
+        self.balance = balance
+        self.price = price
+        self.last_occured_at = last_occured_at
+
+    def __str__(self):
+        return f"StreamState(stream_id={self.stream_id}, version={self.version}, units={self.units}, balance={self.balance}, price={self.price}, last_occured_at={self.last_occured_at})"
+
+    def __eq__(self, other):
+        if not isinstance(other, StreamState):
+            return NotImplemented
+
+        return (
+            self.stream_id == other.stream_id
+            and self.version == other.version
+            and self.units == other.units
+            and self.balance == other.balance
+            and self.price == other.price
+            and self.last_occured_at == other.last_occured_at
+        )
+
+
+def load_stream_states(stream_ids: list[UUID | str]) -> dict[UUID, StreamState]:
+    """Fold events of streams inside the database, with a single aggregate query.
+    Used when an event is about to be appended, reads should use the stream_current_state projection.
+
+    Units (or weight) of events are summed up, except for *Priced events, which only revalue
+    a stream (units of TreasuryBondsPriced are the total held, not a change). Balance and price
+    (per unit, see the event_price SQL function) are taken from the latest event which has them.
+    Only the folded state is sent back, not the events.
+
+    Returns:
+        dict[UUID, StreamState]: states by stream id, streams without events have an empty state
+    """
+    ids = [str(stream_id) for stream_id in stream_ids]
+    states = {UUID(stream_id): StreamState(UUID(stream_id)) for stream_id in ids}
+    if not ids:
+        return states
+
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT
+                    e.stream_id,
+                    max(e.version),
+                    COALESCE(sum(e.units) FILTER (WHERE e.type NOT LIKE '%%Priced'), 0),
+                    (array_agg(e.balance ORDER BY e.version DESC) FILTER (WHERE e.balance IS NOT NULL))[1],
+                    (array_agg(e.price ORDER BY e.version DESC) FILTER (WHERE e.price IS NOT NULL))[1],
+                    max(e.occured_at)
+                FROM (
+                    SELECT
+                        ev.stream_id,
+                        ev.type,
+                        ev.version,
+                        ev.occured_at,
+                        to_number(COALESCE(ev.data->>'units', ev.data->>'weight')) AS units,
+                        to_number(ev.data->>'balance') AS balance,
+                        event_price(s.type, ev.data) AS price
+                    FROM events ev
+                    JOIN streams s ON s.id = ev.stream_id
+                    WHERE ev.stream_id = ANY(%s::uuid[])
+                ) e
+                GROUP BY e.stream_id;
+                """,
+                (ids,),
+            )
+            for stream_id, version, units, balance, price, last_occured_at in cur:
+                states[UUID(stream_id)] = StreamState(
+                    UUID(stream_id),
+                    version,
+                    float(units),
+                    float(balance) if balance is not None else None,
+                    float(price) if price is not None else None,
+                    last_occured_at,
+                )
+    return states
+
+
+def load_stream_state(stream_id: UUID | str) -> StreamState:
+    return load_stream_states([stream_id])[UUID(str(stream_id))]
+
+
 def get_stream_by_id(stream_id: str) -> Stream | None:
     log.info(f'Loading stream by id "{stream_id}"...')
     with db.get_connection() as conn:
@@ -250,8 +362,10 @@ def get_stream_by_metadata(key: str, value) -> Stream | None:
     )
     with db.get_connection() as conn:
         with conn.cursor() as cur:
+            # containment (unlike "metadata ->> key") is supported by the GIN index on metadata
             cur.execute(
-                f"SELECT id, type, subtype, name, bank, active, version, metadata, labels FROM streams WHERE metadata ->> '{key}' = '{value}'"
+                "SELECT id, type, subtype, name, bank, active, version, metadata, labels FROM streams WHERE metadata @> %s::jsonb",
+                (json.dumps({key: value}),),
             )
             result = cur.fetchone()
             if result is None:
@@ -14,17 +14,6 @@ import mankkoo.event_store as es
 from mankkoo.base_logger import log
 
 
-def _as_float(value: float | int | str) -> float:
-    if isinstance(value, (int, float)):
-        return float(value)
-    if isinstance(value, str):
-        cleaned = value.strip().replace(" ", "").replace(",", ".")
-        if not cleaned:
-            raise ValueError("Numeric value cannot be empty")
-        return float(cleaned)
-    raise TypeError(f"Unsupported numeric value type: {type(value)}")
-
-
 def __map_event_type(stream_subtype: str, event_type: str) -> str:
     mapping_by_subtype = {
         "ETF": {
@@ -229,17 +218,9 @@ def create_investment_event_entry(data: Dict[str, Any]) -> Tuple[Dict[str, Any],
         units_value_float: float | None = None
         total_value_float: float | None = None
 
-        current_balance = 0.0
-        current_units = 0.0
-        events = es.load(UUID(stream_id_str))
-        events.sort(key=lambda e: e.version)
-
-        for event in events:
-            event_data = event.data
-            if "balance" in event_data:
-                current_balance = _as_float(event_data["balance"])
-            if "units" in event_data:
-                current_units += _as_float(event_data["units"])
+        state = es.load_stream_state(stream_id_str)
+        current_balance = state.balance if state.balance is not None else 0.0
+        current_units = state.units
 
         if event_type_str in {"buy", "sell"}:
             if units is None or total_value is None:
@@ -1,3 +1,4 @@
+import json
 import re
 
 import mankkoo.database as db
@@ -32,25 +33,22 @@ def load_investments(active: bool, wallet: str) -> list[dict]:
     if active is not None:
         conditions.append(f"(active = {active})")
     if wallet:
-        conditions.append(f"s.labels->>'wallet' = '{wallet}'")
+        conditions.append("s.labels @> %(labels)s::jsonb")
 
     where_clause = ""
     if conditions:
         where_clause = "WHERE " + " AND ".join(conditions)
 
     query = f"""
-    WITH latest_events AS (
-        SELECT DISTINCT ON (e.stream_id) e.stream_id, e.data, e.version
-        FROM events e
-        ORDER BY e.stream_id, e.version DESC
-    )
     SELECT s.id,
         name,
         type AS investment_type,
         subtype,
-        COALESCE((le.data->>'balance')::numeric, 0) AS balance
+        COALESCE(c.balance, 0) AS balance,
+        COALESCE(c.units, 0) AS units,
+        c.price
     FROM streams s
-    LEFT JOIN latest_events le ON le.stream_id = s.id AND le.version = s.version
+    LEFT JOIN stream_current_state c ON c.stream_id = s.id
     {where_clause}
     ORDER BY balance DESC;
     """
@@ -58,7 +56,7 @@ def load_investments(active: bool, wallet: str) -> list[dict]:
     result = []
     with db.get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query, {"labels": json.dumps({"wallet": wallet})})
             for row in cur.fetchall():
                 result.append(
                     {
@@ -67,6 +65,8 @@ def load_investments(active: bool, wallet: str) -> list[dict]:
                         "investmentType": row[2],
                         "subtype": row[3],
                         "balance": float(row[4]) if row[4] is not None else 0.0,
+                        "units": float(row[5]),
+                        "pricePerUnit": float(row[6]) if row[6] is not None else None,
                     }
                 )
     return result
@@ -0,0 +1,445 @@
+-- tables, functions and triggers of the event store, its projections and views
+
+CREATE TABLE IF NOT EXISTS streams
+(
+    id              UUID                      NOT NULL    PRIMARY KEY,
+    type            TEXT                      NOT NULL,
+    subtype         TEXT                      NOT NULL,
+    bank            TEXT,
+    name            TEXT                      NOT NULL,
+    active          BOOLEAN                   NOT NULL    default true,
+    version         BIGINT                    NOT NULL,
+    metadata        JSONB,
+    labels          JSONB
+);
+
+CREATE TABLE IF NOT EXISTS events
+(
+    id              UUID                      NOT NULL    PRIMARY KEY,
+    stream_id       UUID                      NOT NULL,
+    type            TEXT                      NOT NULL,
+    data            JSONB                     NOT NULL,
+    version         BIGINT                    NOT NULL,
+    occured_at      timestamp with time zone  NOT NULL,
+    added_at        timestamp with time zone  NOT NULL    default (now()),
+
+    FOREIGN KEY(stream_id) REFERENCES streams(id),
+    CONSTRAINT events_stream_and_version UNIQUE(stream_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS views
+(
+    name            TEXT                      NOT NULL    PRIMARY KEY,
+    content         JSONB,
+    updated_at      timestamp with time zone  NOT NULL    default (now())
+);
+
+-- content serialized to compact JSON (and gzip), served by the API as it is
+ALTER TABLE views ADD COLUMN IF NOT EXISTS payload BYTEA;
+ALTER TABLE views ADD COLUMN IF NOT EXISTS payload_gzip BYTEA;
+
+CREATE TABLE IF NOT EXISTS stream_daily_balance
+(
+    stream_id       UUID                      NOT NULL,
+    day             DATE                      NOT NULL,
+    balance         NUMERIC,
+    version         BIGINT                    NOT NULL,
+
+    FOREIGN KEY(stream_id) REFERENCES streams(id),
+    PRIMARY KEY(stream_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS stream_current_state
+(
+    stream_id       UUID                      NOT NULL    PRIMARY KEY,
+    version         BIGINT                    NOT NULL,
+    balance         NUMERIC,
+    units           NUMERIC                   NOT NULL    default 0,
+    price           NUMERIC,
+    currency        TEXT,
+    last_occured_at timestamp with time zone  NOT NULL,
+
+    FOREIGN KEY(stream_id) REFERENCES streams(id)
+);
+
+-- fingerprints of imported bank operations, a re-imported operation has the same fingerprint;
+-- occurrence distinguishes identical operations (same day, amount and title) of an account
+CREATE TABLE IF NOT EXISTS operation_fingerprints
+(
+    stream_id       UUID                      NOT NULL,
+    day             DATE                      NOT NULL,
+    amount          BIGINT                    NOT NULL,
+    title           TEXT                      NOT NULL,
+    occurrence      INTEGER                   NOT NULL,
+    event_id        UUID                      NOT NULL,
+
+    FOREIGN KEY(stream_id) REFERENCES streams(id),
+    PRIMARY KEY(stream_id, day, amount, title, occurrence)
+);
+
+CREATE OR REPLACE FUNCTION append_event
+(
+    id uuid,
+    data jsonb,
+    type text,
+    stream_id uuid,
+    stream_type text,
+    occured_at timestamp with time zone,
+    expected_stream_version bigint default null
+) RETURNS boolean
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        stream_version int;
+        error_message text;
+    BEGIN
+
+        -- get stream version
+        SELECT
+            version INTO stream_version
+        FROM streams as s
+        WHERE
+            s.id = stream_id FOR UPDATE;
+
+        -- if stream doesn't exist - create new one with version 0
+        IF stream_version IS NULL THEN
+            stream_version := 0;
+
+            INSERT INTO streams
+                (id, type, subtype, name, bank, version)
+            VALUES
+                (stream_id, stream_type, 'Default stream subtype', 'Default Stream Name', 'Default Bank', stream_version);
+        END IF;
+
+        -- increment event_version
+        stream_version := stream_version + 1;
+
+        -- check optimistic concurrency
+        IF expected_stream_version IS NOT NULL AND stream_version != expected_stream_version THEN
+            RAISE EXCEPTION 'Expecting "%', stream_version || '" as next stream version but "' || expected_stream_version || '" was provided';
+        END IF;
+
+        -- append event
+        INSERT INTO events
+            (id, data, stream_id, type, version, occured_at)
+        VALUES
+            (id, data::jsonb, stream_id, type, stream_version, occured_at);
+
+
+        -- update stream version
+        UPDATE streams as s
+            SET version = stream_version
+        WHERE
+            s.id = stream_id;
+
+        RETURN TRUE;
+    END;
+    $$;
+
+CREATE OR REPLACE FUNCTION append_events
+(
+    stream_id uuid,
+    stream_type text,
+    new_events jsonb
+) RETURNS bigint
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        stream_version bigint;
+        provided_version bigint;
+        expected_version bigint;
+        events_count bigint;
+    BEGIN
+
+        -- get stream version, a single lock for the whole batch
+        SELECT
+            version INTO stream_version
+        FROM streams as s
+        WHERE
+            s.id = stream_id FOR UPDATE;
+
+        -- if stream doesn't exist - create new one with version 0
+        IF stream_version IS NULL THEN
+            stream_version := 0;
+
+            INSERT INTO streams
+                (id, type, subtype, name, bank, version)
+            VALUES
+                (stream_id, stream_type, 'Default stream subtype', 'Default Stream Name', 'Default Bank', stream_version);
+        END IF;
+
+        -- check optimistic concurrency for each event of the batch
+        SELECT
+            (e.event->>'version')::bigint, stream_version + e.ord
+        INTO
+            provided_version, expected_version
+        FROM jsonb_array_elements(new_events) WITH ORDINALITY AS e(event, ord)
+        WHERE
+            e.event->>'version' IS NOT NULL
+            AND (e.event->>'version')::bigint != stream_version + e.ord
+        ORDER BY e.ord
+        LIMIT 1;
+
+        IF provided_version IS NOT NULL THEN
+            RAISE EXCEPTION 'Expecting "%" as next stream version but "%" was provided', expected_version, provided_version;
+        END IF;
+
+        -- append events
+        INSERT INTO events
+            (id, data, stream_id, type, version, occured_at)
+        SELECT
+            (e.event->>'id')::uuid,
+            e.event->'data',
+            stream_id,
+            e.event->>'type',
+            stream_version + e.ord,
+            (e.event->>'occured_at')::timestamp with time zone
+        FROM jsonb_array_elements(new_events) WITH ORDINALITY AS e(event, ord);
+
+        GET DIAGNOSTICS events_count = ROW_COUNT;
+
+        -- update stream version
+        stream_version := stream_version + events_count;
+
+        UPDATE streams as s
+            SET version = stream_version
+        WHERE
+            s.id = stream_id;
+
+        RETURN stream_version;
+    END;
+    $$;
+
+-- lenient conversion of numbers, legacy events may store them as text like "1 234,56"
+CREATE OR REPLACE FUNCTION to_number(value text) RETURNS numeric
+    LANGUAGE sql
+    IMMUTABLE
+    AS $$
+    SELECT
+        CASE
+            WHEN cleaned ~ '^[-+]?([0-9]+([.][0-9]*)?|[.][0-9]+)([eE][-+]?[0-9]+)?$' THEN cleaned::numeric
+        END
+    FROM (SELECT replace(replace(value, ' ', ''), ',', '.') AS cleaned) v;
+    $$;
+
+CREATE OR REPLACE FUNCTION stream_daily_balance_trigger() RETURNS TRIGGER AS
+    $$
+    BEGIN
+
+        -- balance at the end of a day is taken from the latest (by version) event dated on or before
+        -- that day, so a back-dated event changes balances of all later days of its stream too
+        INSERT INTO stream_daily_balance
+            (stream_id, day, balance, version)
+        SELECT
+            d.stream_id, d.day, to_number(latest.data->>'balance'), latest.version
+        FROM (
+            SELECT DISTINCT e.stream_id, e.occured_at::date AS day
+            FROM events e
+            JOIN (
+                SELECT n.stream_id, MIN(n.occured_at::date) AS from_day
+                FROM new_events n
+                GROUP BY n.stream_id
+            ) changed ON changed.stream_id = e.stream_id
+            WHERE e.occured_at >= changed.from_day
+        ) d
+        CROSS JOIN LATERAL (
+            SELECT e.version, e.data
+            FROM events e
+            WHERE e.stream_id = d.stream_id
+              AND e.occured_at::date <= d.day
+            ORDER BY e.version DESC
+            LIMIT 1
+        ) latest
+        ON CONFLICT (stream_id, day) DO UPDATE
+            SET balance = EXCLUDED.balance, version = EXCLUDED.version
+            WHERE stream_daily_balance.version < EXCLUDED.version;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER maintain_stream_daily_balance_trigger AFTER INSERT ON events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT EXECUTE FUNCTION stream_daily_balance_trigger();
+
+-- price (per unit) of an event, read from the fields used by a type of stream
+CREATE OR REPLACE FUNCTION event_price(stream_type text, data jsonb) RETURNS numeric AS
+    $$
+        SELECT to_number(
+            CASE
+                WHEN stream_type = 'investment' THEN COALESCE(data->>'pricePerUnit', data->>'unitPrice')
+                WHEN stream_type = 'account' THEN data->>'amount'
+                ELSE data->>'averagePrice'
+            END
+        );
+    $$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION stream_current_state_trigger() RETURNS TRIGGER AS
+    $$
+    BEGIN
+
+        INSERT INTO stream_current_state
+            (stream_id, version, balance, units, price, currency, last_occured_at)
+        SELECT
+            latest.stream_id,
+            latest.version,
+            to_number(latest.data->>'balance'),
+            totals.units,
+            totals.price,
+            COALESCE(latest.data->>'currency', totals.currency),
+            totals.last_occured_at
+        FROM (
+            SELECT DISTINCT ON (n.stream_id) n.stream_id, n.version, n.data
+            FROM new_events n
+            ORDER BY n.stream_id, n.version DESC
+        ) latest
+        JOIN (
+            SELECT
+                n.stream_id,
+                -- *Priced events only revalue a stream (units of TreasuryBondsPriced are the total held)
+                COALESCE(SUM(to_number(COALESCE(n.data->>'units', n.data->>'weight'))) FILTER (WHERE n.type NOT LIKE '%Priced'), 0) AS units,
+                (array_agg(event_price(s.type, n.data) ORDER BY n.version DESC) FILTER (WHERE event_price(s.type, n.data) IS NOT NULL))[1] AS price,
+                (array_agg(n.data->>'currency' ORDER BY n.version DESC) FILTER (WHERE n.data ? 'currency'))[1] AS currency,
+                MAX(n.occured_at) AS last_occured_at
+            FROM new_events n
+            JOIN streams s ON s.id = n.stream_id
+            GROUP BY n.stream_id
+        ) totals ON totals.stream_id = latest.stream_id
+        ON CONFLICT (stream_id) DO UPDATE
+            SET version = EXCLUDED.version,
+                balance = EXCLUDED.balance,
+                units = stream_current_state.units + EXCLUDED.units,
+                price = COALESCE(EXCLUDED.price, stream_current_state.price),
+                currency = COALESCE(EXCLUDED.currency, stream_current_state.currency),
+                last_occured_at = GREATEST(stream_current_state.last_occured_at, EXCLUDED.last_occured_at)
+            WHERE stream_current_state.version < EXCLUDED.version;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER maintain_stream_current_state_trigger AFTER INSERT ON events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT EXECUTE FUNCTION stream_current_state_trigger();
+
+CREATE OR REPLACE FUNCTION operation_amount_key(amount numeric) RETURNS bigint AS
+    $$
+        SELECT round(amount * 100)::bigint;
+    $$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION operation_title_key(title text) RETURNS text AS
+    $$
+        SELECT btrim(regexp_replace(COALESCE(title, ''), '[[:space:]]+', ' ', 'g'));
+    $$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION operation_fingerprints_trigger() RETURNS TRIGGER AS
+    $$
+    BEGIN
+        INSERT INTO operation_fingerprints
+            (stream_id, day, amount, title, occurrence, event_id)
+        SELECT
+            o.stream_id,
+            o.day,
+            o.amount,
+            o.title,
+            COALESCE(known.max_occurrence, -1)
+                + row_number() OVER (PARTITION BY o.stream_id, o.day, o.amount, o.title ORDER BY o.version),
+            o.id
+        FROM (
+            SELECT
+                n.id,
+                n.stream_id,
+                n.version,
+                n.occured_at::date AS day,
+                operation_amount_key(to_number(n.data->>'amount')) AS amount,
+                operation_title_key(n.data->>'title') AS title
+            FROM new_events n
+            JOIN streams s ON s.id = n.stream_id
+            WHERE s.type = 'account'
+              AND n.type IN ('MoneyDeposited', 'MoneyWithdrawn')
+        ) o
+        LEFT JOIN LATERAL (
+            SELECT max(f.occurrence) AS max_occurrence
+            FROM operation_fingerprints f
+            WHERE f.stream_id = o.stream_id
+              AND f.day = o.day
+              AND f.amount = o.amount
+              AND f.title = o.title
+        ) known ON true
+        WHERE o.amount IS NOT NULL
+        ON CONFLICT DO NOTHING;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER maintain_operation_fingerprints_trigger AFTER INSERT ON events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT EXECUTE FUNCTION operation_fingerprints_trigger();
+
+CREATE OR REPLACE FUNCTION notification_trigger() RETURNS TRIGGER AS
+    $$
+    DECLARE
+        payload jsonb;
+    BEGIN
+
+        SELECT jsonb_build_object(
+            'minOccuredAt', min(occured_at),
+            'maxOccuredAt', max(occured_at),
+            'streamIds', jsonb_agg(DISTINCT stream_id)
+        )
+        INTO payload
+        FROM new_events;
+
+        IF payload ->> 'minOccuredAt' IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        -- notification payload must be shorter than 8000 bytes,
+        -- without stream ids all streams are considered as affected
+        IF octet_length(payload::text) >= 8000 THEN
+            payload := payload - 'streamIds';
+        END IF;
+
+        PERFORM pg_notify('events_added', payload::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER capture_event_added_trigger AFTER INSERT ON events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT EXECUTE FUNCTION notification_trigger();
+
+-- lets other processes invalidate their caches of views, an empty payload means all views
+CREATE OR REPLACE FUNCTION views_notification_trigger() RETURNS TRIGGER AS
+    $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            PERFORM pg_notify('views_updated', '');
+        ELSE
+            PERFORM pg_notify('views_updated', NEW.name);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER capture_view_updated_trigger AFTER INSERT OR UPDATE ON views
+FOR EACH ROW EXECUTE FUNCTION views_notification_trigger();
+
+CREATE OR REPLACE TRIGGER capture_views_truncated_trigger AFTER TRUNCATE ON views
+FOR EACH STATEMENT EXECUTE FUNCTION views_notification_trigger();
+
+-- payloads which don't match updated content are dropped, they are recreated when a view is loaded
+CREATE OR REPLACE FUNCTION views_stale_payload_trigger() RETURNS TRIGGER AS
+    $$
+    BEGIN
+        IF NEW.content IS DISTINCT FROM OLD.content AND NEW.payload IS NOT DISTINCT FROM OLD.payload THEN
+            NEW.payload := NULL;
+            NEW.payload_gzip := NULL;
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER drop_stale_view_payload_trigger BEFORE UPDATE ON views
+FOR EACH ROW EXECUTE FUNCTION views_stale_payload_trigger();
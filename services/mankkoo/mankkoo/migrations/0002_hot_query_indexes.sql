@@ -0,0 +1,18 @@
+-- migration: no-transaction
+-- indexes of hot queries, their usage is checked by tests/query_plan_test.py;
+-- built concurrently, so that events can be appended while they're created
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_stream_occured_at_idx ON events (stream_id, occured_at, version);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS streams_type_active_idx ON streams (type, active);
+
+-- streams counted in wealth, as filtered by views
+CREATE INDEX CONCURRENTLY IF NOT EXISTS streams_in_wealth_idx ON streams (type, active)
+    WHERE labels->>'include_in_wealth' IS NULL OR labels->>'include_in_wealth' = 'true';
+
+-- lookups by labels, e.g. streams of a wallet (labels @> '{"wallet": "..."}')
+CREATE INDEX CONCURRENTLY IF NOT EXISTS streams_labels_idx ON streams USING GIN (labels jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS streams_metadata_idx ON streams USING GIN (metadata jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS stream_daily_balance_day_idx ON stream_daily_balance (day);
@@ -0,0 +1,332 @@
+"""Optional partitioning of the events table by time of events (occured_at).
+
+A partitioned ``events`` table has a partition per month (``events_m2024_01``) or per year
+(``events_y2024``) and a default partition (``events_default``) for events outside of them.
+Queries bounded by ``occured_at`` scan only matching partitions, and vacuum of old, unchanged
+partitions is cheap. Readers, ``append_event`` and the triggers of projections work the same on
+both kinds of the table.
+
+Partition keys must be a part of unique constraints, so constraints of a partitioned table include
+``occured_at``. Ids of events and versions of streams are kept unique by the not partitioned
+``event_keys`` table instead, to which a trigger of the events table copies them (an event with
+a taken id or version fails to be appended). Versions of a stream are still assigned one by one,
+under a lock of its row in ``streams`` (see ``append_events``).
+
+An existing table is converted with ``python -m mankkoo.partitioning partition --interval year``.
+Partitions of upcoming periods are created on startup, events which ended up in the default
+partition are moved to partitions of their own then.
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+import mankkoo.database as db
+from mankkoo.base_logger import log
+
+events_table = "events"
+default_partition = "events_default"
+keys_table = "event_keys"
+intervals = ["month", "year"]
+# an arbitrary key, unique among advisory locks taken in the database
+advisory_lock_key = 2_316_741_599
+
+__partition_name_patterns = {
+    "month": re.compile(r"^events_m(\d{4})_(\d{2})$"),
+    "year": re.compile(r"^events_y(\d{4})$"),
+}
+
+
+def partitions_ahead() -> int:
+    return max(1, int(os.getenv("EVENTS_PARTITIONS_AHEAD", "3")))
+
+
+def is_partitioned() -> bool:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            return __is_partitioned(cur)
+
+
+def partition_events(interval: str = "year", ahead: int | None = None) -> list[str]:
+    """Converts the events table into a partitioned one, together with its events.
+
+    The table is locked during the conversion and all events are copied, without firing triggers
+    of projections, in a single transaction.
+
+    Args:
+        interval (str): period covered by each partition, "month" or "year"
+        ahead (int, optional): number of partitions created for upcoming periods,
+            EVENTS_PARTITIONS_AHEAD by default
+
+    Returns:
+        list[str]: names of created partitions
+    """
+    if interval not in intervals:
+        raise ValueError(
+            f"Unknown partition interval '{interval}', it must be one of: {', '.join(intervals)}"
+        )
+    ahead = partitions_ahead() if ahead is None else ahead
+
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            if __is_partitioned(cur):
+                raise ValueError(f"The '{events_table}' table is already partitioned")
+
+            log.info(f"Partitioning '{events_table}' table by {interval}...")
+            cur.execute(f"LOCK TABLE {events_table} IN ACCESS EXCLUSIVE MODE;")
+            cur.execute(
+                f"SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = '{events_table}'::regclass AND NOT tgisinternal;"
+            )
+            triggers = [row[0] for row in cur.fetchall()]
+            # indexes of constraints are recreated together with the constraints
+            cur.execute(f"""
+                SELECT pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                WHERE i.indrelid = '{events_table}'::regclass
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid);
+                """)
+            indexes = [row[0] for row in cur.fetchall()]
+            cur.execute(f"SELECT min(occured_at), max(occured_at) FROM {events_table};")
+            first, last = cur.fetchone()
+
+            cur.execute(f"""
+                ALTER TABLE {events_table} RENAME TO {events_table}_unpartitioned;
+                CREATE TABLE {events_table}
+                    (LIKE {events_table}_unpartitioned INCLUDING DEFAULTS INCLUDING STORAGE INCLUDING COMMENTS)
+                    PARTITION BY RANGE (occured_at);
+                CREATE TABLE {default_partition} PARTITION OF {events_table} DEFAULT;
+                """)
+            now = datetime.now(timezone.utc)
+            periods = __periods(
+                min(first or now, now),
+                max(last or now, __ahead(now, interval, ahead)),
+                interval,
+            )
+            created = [__create_partition(cur, start, interval) for start in periods]
+
+            # triggers are created after the copy, so that projections are not updated again
+            cur.execute(f"""
+                INSERT INTO {events_table} SELECT * FROM {events_table}_unpartitioned;
+                CREATE TABLE {keys_table}
+                (
+                    id          UUID      NOT NULL    PRIMARY KEY,
+                    stream_id   UUID      NOT NULL,
+                    version     BIGINT    NOT NULL,
+
+                    UNIQUE(stream_id, version)
+                );
+                INSERT INTO {keys_table} (id, stream_id, version)
+                    SELECT id, stream_id, version FROM {events_table}_unpartitioned;
+                DROP TABLE {events_table}_unpartitioned;
+                ALTER TABLE {events_table} ADD PRIMARY KEY (id, occured_at);
+                ALTER TABLE {events_table} ADD CONSTRAINT events_stream_and_version UNIQUE (stream_id, version, occured_at);
+                ALTER TABLE {events_table} ADD FOREIGN KEY (stream_id) REFERENCES streams(id);
+                """)
+            for statement in indexes + triggers:
+                cur.execute(statement)
+            cur.execute(f"""
+                CREATE OR REPLACE FUNCTION event_keys_trigger() RETURNS TRIGGER AS
+                    $$
+                    BEGIN
+                        INSERT INTO {keys_table} (id, stream_id, version)
+                            SELECT n.id, n.stream_id, n.version FROM new_events n;
+                        RETURN NULL;
+                    END;
+                    $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER maintain_event_keys_trigger AFTER INSERT ON {events_table}
+                REFERENCING NEW TABLE AS new_events
+                FOR EACH STATEMENT EXECUTE FUNCTION event_keys_trigger();
+                """)
+            cur.execute(f"ANALYZE {events_table};")
+            conn.commit()
+
+    log.info(
+        f"The '{events_table}' table is partitioned by {interval}, {len(created)} partition(s) created"
+    )
+    return created
+
+
+def ensure_partitions(ahead: int | None = None) -> list[str]:
+    """Creates partitions of upcoming periods and of periods of events from the default partition.
+
+    Does nothing if the events table is not partitioned.
+
+    Returns:
+        list[str]: names of created partitions
+    """
+    ahead = partitions_ahead() if ahead is None else ahead
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            if not __is_partitioned(cur):
+                return []
+            # replicas starting at the same time would create the same partitions
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (advisory_lock_key,))
+
+            existing = __partition_names(cur)
+            interval = __interval(existing)
+            now = datetime.now(timezone.utc)
+            periods = __periods(now, __ahead(now, interval, ahead), interval)
+
+            cur.execute(
+                f"SELECT min(occured_at), max(occured_at) FROM {default_partition};"
+            )
+            first, last = cur.fetchone()
+            if first is not None:
+                periods += __periods(first, last, interval)
+
+            created = [
+                __create_partition(cur, start, interval)
+                for start in sorted(set(periods))
+                if __partition_name(start, interval) not in existing
+            ]
+            conn.commit()
+
+    if created:
+        log.info(f"Created partitions of '{events_table}': {', '.join(created)}")
+    return created
+
+
+def partitions() -> list[dict]:
+    """Partitions of the events table with their bounds and estimated number of rows."""
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            if not __is_partitioned(cur):
+                return []
+            cur.execute(f"""
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = '{events_table}'::regclass
+                ORDER BY c.relname;
+                """)
+            return [
+                {"name": name, "bounds": bounds, "rows": max(0, int(rows))}
+                for name, bounds, rows in cur.fetchall()
+            ]
+
+
+def __is_partitioned(cur) -> bool:
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s));",
+        (events_table,),
+    )
+    return cur.fetchone()[0]
+
+
+def __partition_names(cur) -> set[str]:
+    cur.execute(f"""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = '{events_table}'::regclass;
+        """)
+    return {row[0] for row in cur.fetchall()}
+
+
+def __interval(partition_names: set[str]) -> str:
+    for interval, pattern in __partition_name_patterns.items():
+        if any(pattern.match(name) for name in partition_names):
+            return interval
+    raise ValueError(
+        f"Could not find out the interval of '{events_table}' partitions: {', '.join(sorted(partition_names))}"
+    )
+
+
+def __create_partition(cur, start: datetime, interval: str) -> str:
+    name = __partition_name(start, interval)
+    bounds = {"start": start, "end": __next(start, interval)}
+    cur.execute(
+        f"SELECT count(*) FROM {default_partition} WHERE occured_at >= %(start)s AND occured_at < %(end)s;",
+        bounds,
+    )
+    if cur.fetchone()[0] == 0:
+        cur.execute(
+            f"CREATE TABLE {name} PARTITION OF {events_table} FOR VALUES FROM (%(start)s) TO (%(end)s);",
+            bounds,
+        )
+        return name
+
+    # events of that period are in the default partition, they are moved to the new one
+    # before it's attached, inserts to a partition don't fire triggers of the events table
+    cur.execute(
+        f"""
+        CREATE TABLE {name} (LIKE {events_table} INCLUDING DEFAULTS INCLUDING STORAGE);
+        WITH moved AS (
+            DELETE FROM {default_partition}
+            WHERE occured_at >= %(start)s AND occured_at < %(end)s
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved;
+        ALTER TABLE {events_table} ATTACH PARTITION {name} FOR VALUES FROM (%(start)s) TO (%(end)s);
+        """,
+        bounds,
+    )
+    return name
+
+
+def __partition_name(start: datetime, interval: str) -> str:
+    if interval == "year":
+        return f"{events_table}_y{start:%Y}"
+    return f"{events_table}_m{start:%Y_%m}"
+
+
+def __start(moment: datetime, interval: str) -> datetime:
+    moment = moment.astimezone(timezone.utc)
+    month = 1 if interval == "year" else moment.month
+    return datetime(moment.year, month, 1, tzinfo=timezone.utc)
+
+
+def __next(start: datetime, interval: str) -> datetime:
+    if interval == "year":
+        return start.replace(year=start.year + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def __ahead(moment: datetime, interval: str, periods: int) -> datetime:
+    start = __start(moment, interval)
+    for _ in range(periods):
+        start = __next(start, interval)
+    return start
+
+
+def __periods(first: datetime, last: datetime, interval: str) -> list[datetime]:
+    """Starts of periods from the one of the first moment to the one of the last moment, inclusive."""
+    start = __start(first, interval)
+    periods = []
+    while start <= last:
+        periods.append(start)
+        start = __next(start, interval)
+    return periods
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Partitioning of the events table")
+    parser.add_argument(
+        "command",
+        choices=["partition", "ensure", "list"],
+        help="partition the events table, create partitions of upcoming periods or list partitions",
+    )
+    parser.add_argument("--interval", choices=intervals, default="year")
+    parser.add_argument(
+        "--ahead",
+        type=int,
+        help="number of partitions of upcoming periods, EVENTS_PARTITIONS_AHEAD by default",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "partition":
+        partition_events(args.interval, args.ahead)
+    elif args.command == "ensure":
+        ensure_partitions(args.ahead)
+    for partition in partitions():
+        print(f"{partition['name']:<24}{partition['rows']:>12,}  {partition['bounds']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Projections maintained from the event store.
+
+Projection tables are kept up to date by database triggers on the ``events`` table. Functions
+in this module (re)build them from scratch, e.g. after the projection was introduced to a
+database with existing events.
+"""
+
+from uuid import UUID
+
+import mankkoo.database as db
+from mankkoo.base_logger import log
+
+stream_daily_balance_table = "stream_daily_balance"
+stream_current_state_table = "stream_current_state"
+operation_fingerprints_table = "operation_fingerprints"
+
+
+def rebuild_stream_daily_balance(stream_id: UUID | str | None = None) -> None:
+    log.info(
+        f"Rebuilding '{stream_daily_balance_table}' projection (stream: {stream_id or 'all'})..."
+    )
+    stream_condition = "" if stream_id is None else "WHERE stream_id = %(stream_id)s"
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"DELETE FROM stream_daily_balance {stream_condition};",
+                {"stream_id": str(stream_id)},
+            )
+            cur.execute(
+                f"""
+                INSERT INTO stream_daily_balance
+                    (stream_id, day, balance, version)
+                SELECT
+                    d.stream_id, d.day, to_number(e.data->>'balance'), e.version
+                FROM (
+                    -- the latest event dated on or before each day with events
+                    SELECT
+                        stream_id,
+                        day,
+                        MAX(version) OVER (PARTITION BY stream_id ORDER BY day) AS version
+                    FROM (
+                        SELECT stream_id, occured_at::date AS day, MAX(version) AS version
+                        FROM events
+                        {stream_condition}
+                        GROUP BY stream_id, occured_at::date
+                    ) per_day
+                ) d
+                JOIN events e ON e.stream_id = d.stream_id AND e.version = d.version;
+                """,
+                {"stream_id": str(stream_id)},
+            )
+            rows = cur.rowcount
+            conn.commit()
+    log.info(f"The '{stream_daily_balance_table}' projection has {rows} row(s)")
+
+
+def rebuild_stream_current_state(stream_id: UUID | str | None = None) -> None:
+    log.info(
+        f"Rebuilding '{stream_current_state_table}' projection (stream: {stream_id or 'all'})..."
+    )
+    stream_condition = "" if stream_id is None else "WHERE stream_id = %(stream_id)s"
+    events_condition = "" if stream_id is None else "WHERE e.stream_id = %(stream_id)s"
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"DELETE FROM stream_current_state {stream_condition};",
+                {"stream_id": str(stream_id)},
+            )
+            cur.execute(
+                f"""
+                INSERT INTO stream_current_state
+                    (stream_id, version, balance, units, price, currency, last_occured_at)
+                SELECT
+                    e.stream_id,
+                    MAX(e.version),
+                    to_number((array_agg(e.data->>'balance' ORDER BY e.version DESC))[1]),
+                    COALESCE(SUM(to_number(COALESCE(e.data->>'units', e.data->>'weight'))) FILTER (WHERE e.type NOT LIKE '%%Priced'), 0),
+                    (array_agg(event_price(s.type, e.data) ORDER BY e.version DESC) FILTER (WHERE event_price(s.type, e.data) IS NOT NULL))[1],
+                    (array_agg(e.data->>'currency' ORDER BY e.version DESC) FILTER (WHERE e.data ? 'currency'))[1],
+                    MAX(e.occured_at)
+                FROM events e
+                JOIN streams s ON s.id = e.stream_id
+                {events_condition}
+                GROUP BY e.stream_id;
+                """,
+                {"stream_id": str(stream_id)},
+            )
+            rows = cur.rowcount
+            conn.commit()
+    log.info(f"The '{stream_current_state_table}' projection has {rows} row(s)")
+
+
+def rebuild_operation_fingerprints(stream_id: UUID | str | None = None) -> None:
+    log.info(
+        f"Rebuilding '{operation_fingerprints_table}' projection (stream: {stream_id or 'all'})..."
+    )
+    stream_condition = "" if stream_id is None else "WHERE stream_id = %(stream_id)s"
+    events_condition = "" if stream_id is None else "AND e.stream_id = %(stream_id)s"
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"DELETE FROM operation_fingerprints {stream_condition};",
+                {"stream_id": str(stream_id)},
+            )
+            cur.execute(
+                f"""
+                INSERT INTO operation_fingerprints
+                    (stream_id, day, amount, title, occurrence, event_id)
+                SELECT
+                    o.stream_id,
+                    o.day,
+                    o.amount,
+                    o.title,
+                    row_number() OVER (PARTITION BY o.stream_id, o.day, o.amount, o.title ORDER BY o.version) - 1,
+                    o.id
+                FROM (
+                    SELECT
+                        e.id,
+                        e.stream_id,
+                        e.version,
+                        e.occured_at::date AS day,
+                        operation_amount_key(to_number(e.data->>'amount')) AS amount,
+                        operation_title_key(e.data->>'title') AS title
+                    FROM events e
+                    JOIN streams s ON s.id = e.stream_id
+                    WHERE s.type = 'account'
+                      AND e.type IN ('MoneyDeposited', 'MoneyWithdrawn')
+                      {events_condition}
+                ) o
+                WHERE o.amount IS NOT NULL;
+                """,
+                {"stream_id": str(stream_id)},
+            )
+            rows = cur.rowcount
+            conn.commit()
+    log.info(f"The '{operation_fingerprints_table}' projection has {rows} row(s)")
+
+
+def rebuild_if_empty() -> None:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    EXISTS (SELECT 1 FROM events),
+                    EXISTS (SELECT 1 FROM stream_daily_balance),
+                    EXISTS (SELECT 1 FROM stream_current_state),
+                    EXISTS (SELECT 1 FROM operation_fingerprints);
+                """)
+            has_events, has_daily_balance, has_current_state, has_fingerprints = (
+                cur.fetchone()
+            )
+
+    if has_events and not has_daily_balance:
+        rebuild_stream_daily_balance()
+    if has_events and not has_current_state:
+        rebuild_stream_current_state()
+    if has_events and not has_fingerprints:
+        rebuild_operation_fingerprints()
+
+
+def rebuild_all() -> None:
+    rebuild_stream_daily_balance()
+    rebuild_stream_current_state()
+    rebuild_operation_fingerprints()
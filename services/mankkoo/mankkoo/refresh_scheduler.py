@@ -0,0 +1,212 @@
+"""Coalescing scheduler of views refreshes.
+
+Every batch of appended events produces an ``events_added`` notification with the range of their
+``occured_at`` dates and ids of affected streams. Instead of refreshing all views for each of them,
+notifications are collected until there were no new ones for a quiet period (or until the oldest one
+waits longer than a max delay) and handled by a single refresh starting from the oldest affected date.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Callable
+
+from mankkoo.base_logger import log
+
+
+class _RefreshRequest:
+    def __init__(self, from_date: date | None, stream_ids: set[str] | None):
+        now = time.monotonic()
+        self.from_date = from_date
+        self.stream_ids = None if stream_ids is None else set(stream_ids)
+        self.requests = 1
+        self.first_requested_at = now
+        self.last_requested_at = now
+        self.first_requested_at_utc = datetime.now(timezone.utc)
+        self.started_at_utc: datetime | None = None
+
+    def merge(self, from_date: date | None, stream_ids: set[str] | None):
+        # a request without a date means that all views need to be rebuilt from scratch
+        if self.from_date is not None:
+            self.from_date = (
+                None if from_date is None else min(self.from_date, from_date)
+            )
+        # and a request without stream ids that all streams were affected
+        if self.stream_ids is not None:
+            self.stream_ids = (
+                None if stream_ids is None else self.stream_ids | stream_ids
+            )
+        self.requests += 1
+        self.last_requested_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {
+            "fromDate": None if self.from_date is None else self.from_date.isoformat(),
+            "streamIds": None if self.stream_ids is None else sorted(self.stream_ids),
+            "requests": self.requests,
+            "firstRequestedAt": self.first_requested_at_utc.isoformat(),
+            "startedAt": (
+                None if self.started_at_utc is None else self.started_at_utc.isoformat()
+            ),
+        }
+
+
+class RefreshScheduler:
+    """Collapses bursts of refresh requests into a single call of ``refresh``.
+
+    Args:
+        refresh (Callable): function refreshing views, it gets the oldest affected date and ids of
+            affected streams (None means a full refresh)
+        quiet_period (float): seconds without new requests after which a refresh starts
+        max_delay (float): max seconds a request waits, even if new requests keep coming
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[date | None, set[str] | None], None],
+        quiet_period: float = 0.5,
+        max_delay: float = 5.0,
+    ):
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self._refresh = refresh
+        self._condition = threading.Condition()
+        self._pending: _RefreshRequest | None = None
+        self._running: _RefreshRequest | None = None
+        self._last_completed: dict | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="views-refresh-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def submit(
+        self, from_date: date | str | None, stream_ids: set[str] | None = None
+    ) -> None:
+        from_date = to_date(from_date)
+        with self._condition:
+            if self._pending is None:
+                self._pending = _RefreshRequest(from_date, stream_ids)
+            else:
+                self._pending.merge(from_date, stream_ids)
+            self._condition.notify_all()
+
+    def status(self) -> dict:
+        with self._condition:
+            return {
+                "quietPeriodMs": round(self.quiet_period * 1000),
+                "maxDelayMs": round(self.max_delay * 1000),
+                "pending": None if self._pending is None else self._pending.to_dict(),
+                "running": None if self._running is None else self._running.to_dict(),
+                "lastCompleted": self._last_completed,
+            }
+
+    def wait_until_idle(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending is not None or self._running is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def _next_request(self) -> _RefreshRequest:
+        with self._condition:
+            while True:
+                if self._pending is None:
+                    self._condition.wait()
+                    continue
+
+                due_at = min(
+                    self._pending.last_requested_at + self.quiet_period,
+                    self._pending.first_requested_at + self.max_delay,
+                )
+                now = time.monotonic()
+                if now >= due_at:
+                    request, self._pending = self._pending, None
+                    request.started_at_utc = datetime.now(timezone.utc)
+                    self._running = request
+                    return request
+                self._condition.wait(due_at - now)
+
+    def _run(self) -> None:
+        while True:
+            request = self._next_request()
+            log.info(
+                f"Refreshing views for {request.requests} coalesced notification(s) from date: {request.from_date}"
+            )
+            error = None
+            try:
+                self._refresh(request.from_date, request.stream_ids)
+            except Exception as ex:
+                log.error(f"Failed to refresh views: {ex}", exc_info=ex)
+                error = str(ex)
+
+            with self._condition:
+                self._last_completed = {
+                    **request.to_dict(),
+                    "finishedAt": datetime.now(timezone.utc).isoformat(),
+                    "error": error,
+                }
+                self._running = None
+                self._condition.notify_all()
+
+
+def parse_notification(payload: str) -> tuple[date | None, set[str] | None]:
+    """Parses ``events_added`` payload into the oldest affected date and ids of affected streams.
+
+    A payload with a plain date (sent by older versions of the trigger) affects all streams.
+    """
+    try:
+        content = json.loads(payload)
+    except ValueError:
+        return to_date(payload), None
+
+    if not isinstance(content, dict):
+        return to_date(payload), None
+
+    stream_ids = content.get("streamIds")
+    return to_date(content.get("minOccuredAt")), (
+        None if stream_ids is None else set(stream_ids)
+    )
+
+
+def to_date(value: date | str | None) -> date | None:
+    """Date of a date, datetime or ISO string (e.g. from a notification), None if it can't be parsed."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        log.warning(f"Could not parse '{value}' as a date, all days will be rebuilt")
+        return None
+
+
+__scheduler: RefreshScheduler | None = None
+__scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RefreshScheduler:
+    global __scheduler
+    with __scheduler_lock:
+        if __scheduler is None:
+            import mankkoo.views as views
+
+            __scheduler = RefreshScheduler(
+                views.update_views,
+                quiet_period=float(os.getenv("VIEWS_REFRESH_QUIET_PERIOD", "0.5")),
+                max_delay=float(os.getenv("VIEWS_REFRESH_MAX_DELAY", "5")),
+            )
+            __scheduler.start()
+        return __scheduler
@@ -0,0 +1,301 @@
+"""Versioned migrations of the database schema.
+
+Migrations are SQL files in the ``mankkoo/migrations`` folder, named ``<version>_<name>.sql`` (e.g.
+``0002_hot_query_indexes.sql``). Pending ones are applied in order of their versions and recorded in
+the ``schema_migrations`` table, together with a checksum, so a migration which was changed after it
+had been applied is reported instead of being silently skipped.
+
+Each migration runs in its own transaction. A migration starting with the
+``-- migration: no-transaction`` line runs statement by statement outside of a transaction instead,
+which is required e.g. by ``CREATE INDEX CONCURRENTLY``. If it fails halfway it's retried from its
+first statement, so its statements need to be idempotent (``IF NOT EXISTS``).
+
+Migrations are applied while holding a Postgres advisory lock, so when several replicas start at the
+same time only one of them migrates the database and the others wait for it to finish. Waiting replicas
+poll for the lock between short transactions, as a session blocked inside a transaction would deadlock
+with ``CREATE INDEX CONCURRENTLY`` (which waits for all running transactions). An index left invalid by
+a failed concurrent build is dropped and built again, instead of being skipped by ``IF NOT EXISTS``.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+
+import mankkoo.database as db
+from mankkoo.base_logger import log
+
+migrations_dir = os.path.join(os.path.dirname(__file__), "migrations")
+migrations_table = "schema_migrations"
+# an arbitrary key, unique among advisory locks taken in the database
+advisory_lock_key = 2_316_741_598
+no_transaction_marker = "-- migration: no-transaction"
+lock_poll_interval = 0.5
+
+__file_name_pattern = re.compile(r"^(\d+)_(\w+)\.sql$")
+__concurrent_index_pattern = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)",
+    re.IGNORECASE,
+)
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(no_transaction_marker)
+
+
+def load_migrations(directory: str = migrations_dir) -> list[Migration]:
+    migrations = {}
+    for file_name in sorted(os.listdir(directory)):
+        match = __file_name_pattern.match(file_name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(
+                f"Migrations '{migrations[version].name}' and '{match.group(2)}' have the same version: {version}"
+            )
+        with open(os.path.join(directory, file_name), encoding="utf-8") as file:
+            migrations[version] = Migration(version, match.group(2), file.read())
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(sql: str) -> list[str]:
+    """Splits a script on semicolons which end a line, skips parts with comments only."""
+    return [
+        statement.strip()
+        for statement in re.split(r";[ \t]*$", sql, flags=re.MULTILINE)
+        if __has_code(statement)
+    ]
+
+
+def migrate(directory: str = migrations_dir) -> list[Migration]:
+    """Apply pending migrations.
+
+    Args:
+        directory (str): folder with migration files, the ``mankkoo/migrations`` by default
+
+    Returns:
+        list[Migration]: migrations applied by this call, empty if the database was up to date
+            or another process applied them in the meantime
+    """
+    migrations = load_migrations(directory)
+    # a dedicated connection in autocommit mode, because the advisory lock is held by a session
+    # and some statements (e.g. CREATE INDEX CONCURRENTLY) can't be run inside a transaction
+    conn = db.create_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            # checked without the lock, so that an up to date database is not locked on each startup
+            if not __pending(migrations, __applied_checksums(cur)):
+                log.info(f"Database schema is up to date (version {__version(cur)})")
+                return []
+
+            log.info("Waiting for the schema migrations lock...")
+            cur.execute("SELECT pg_try_advisory_lock(%s);", (advisory_lock_key,))
+            while not cur.fetchone()[0]:
+                time.sleep(lock_poll_interval)
+                cur.execute("SELECT pg_try_advisory_lock(%s);", (advisory_lock_key,))
+            try:
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {migrations_table}
+                    (
+                        version         BIGINT                    NOT NULL    PRIMARY KEY,
+                        name            TEXT                      NOT NULL,
+                        checksum        TEXT                      NOT NULL,
+                        duration_ms     NUMERIC                   NOT NULL,
+                        applied_at      timestamp with time zone  NOT NULL    default (now())
+                    );
+                    """)
+                # read again, pending migrations may have been applied while waiting for the lock
+                pending = __pending(migrations, __applied_checksums(cur))
+                for migration in pending:
+                    __apply(cur, migration)
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (advisory_lock_key,))
+            log.info(f"Database schema migrated to version {__version(cur)}")
+            return pending
+    finally:
+        conn.close()
+
+
+def status(directory: str = migrations_dir) -> list[dict]:
+    """Migrations known to the service with info whether and when they were applied."""
+    migrations = load_migrations(directory)
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s);", (migrations_table,))
+            applied = {}
+            if cur.fetchone()[0] is not None:
+                cur.execute(
+                    f"SELECT version, checksum, applied_at FROM {migrations_table};"
+                )
+                applied = {row[0]: row for row in cur.fetchall()}
+    return [
+        {
+            "version": migration.version,
+            "name": migration.name,
+            "appliedAt": (
+                applied[migration.version][2] if migration.version in applied else None
+            ),
+            "changed": (
+                migration.version in applied
+                and applied[migration.version][1] != migration.checksum
+            ),
+        }
+        for migration in migrations
+    ]
+
+
+def __applied_checksums(cur) -> dict[int, str]:
+    cur.execute("SELECT to_regclass(%s);", (migrations_table,))
+    if cur.fetchone()[0] is None:
+        return {}
+    cur.execute(f"SELECT version, checksum FROM {migrations_table};")
+    return dict(cur.fetchall())
+
+
+def __pending(migrations: list[Migration], applied: dict[int, str]) -> list[Migration]:
+    changed = [
+        migration
+        for migration in migrations
+        if migration.version in applied
+        and applied[migration.version] != migration.checksum
+    ]
+    if changed:
+        raise MigrationError(
+            "Migrations were changed after they had been applied: "
+            + ", ".join(f"{m.version}_{m.name}" for m in changed)
+        )
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+def __apply(cur, migration: Migration) -> None:
+    log.info(f"Applying migration {migration.version}_{migration.name}...")
+    started_at = time.perf_counter()
+    if migration.transactional:
+        cur.execute("BEGIN;")
+        try:
+            cur.execute(migration.sql)
+            __record(cur, migration, started_at)
+            cur.execute("COMMIT;")
+        except Exception:
+            cur.execute("ROLLBACK;")
+            raise
+    else:
+        for statement in split_statements(migration.sql):
+            __drop_invalid_indexes(cur, __concurrent_index_pattern.findall(statement))
+            cur.execute(statement)
+        invalid = __invalid_indexes(
+            cur, __concurrent_index_pattern.findall(migration.sql)
+        )
+        if invalid:
+            raise MigrationError(
+                f"Migration {migration.version}_{migration.name} left invalid indexes: {', '.join(invalid)}"
+            )
+        __record(cur, migration, started_at)
+    log.info(
+        f"Migration {migration.version}_{migration.name} applied in {time.perf_counter() - started_at:.2f}s"
+    )
+
+
+def __record(cur, migration: Migration, started_at: float) -> None:
+    cur.execute(
+        f"""
+        INSERT INTO {migrations_table} (version, name, checksum, duration_ms)
+        VALUES (%s, %s, %s, %s);
+        """,
+        (
+            migration.version,
+            migration.name,
+            migration.checksum,
+            round((time.perf_counter() - started_at) * 1000, 1),
+        ),
+    )
+
+
+def __invalid_indexes(cur, names: list[str]) -> list[str]:
+    if not names:
+        return []
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(%s) AND c.relnamespace = current_schema()::regnamespace
+          AND NOT i.indisvalid
+        ORDER BY c.relname;
+        """,
+        ([name.lower() for name in names],),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def __drop_invalid_indexes(cur, names: list[str]) -> None:
+    """Drops indexes left invalid by a failed concurrent build, so that they're built again."""
+    for name in __invalid_indexes(cur, names):
+        log.warning(f"Dropping invalid index '{name}', it will be built again")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+
+
+def __version(cur) -> int | None:
+    cur.execute("SELECT to_regclass(%s);", (migrations_table,))
+    if cur.fetchone()[0] is None:
+        return None
+    cur.execute(f"SELECT max(version) FROM {migrations_table};")
+    return cur.fetchone()[0]
+
+
+def __has_code(statement: str) -> bool:
+    return any(
+        line.strip() and not line.strip().startswith("--")
+        for line in statement.splitlines()
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["migrate", "status"],
+        default="migrate",
+        help="apply pending migrations (default) or list migrations with their status",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        migrate()
+        return 0
+
+    for migration in status():
+        state = (
+            "pending"
+            if migration["appliedAt"] is None
+            else f"applied at {migration['appliedAt']:%Y-%m-%d %H:%M:%S}"
+        )
+        if migration["changed"]:
+            state += ", CHANGED since then"
+        print(f"{migration['version']:>6}  {migration['name']:<40}{state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,17 @@
+import gzip
+import hashlib
 import json
-from datetime import date
+import os
+import threading
+import time
+from concurrent import futures
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
+from typing import Any, Callable
 
 import mankkoo.database as db
 from mankkoo.base_logger import log
+from mankkoo.refresh_scheduler import to_date
 
 main_indicators_key = "main-indicators"
 current_savings_distribution_key = "current-savings-distribution"
@@ -20,10 +28,27 @@ monthly_income_key = "monthly-income"
 
 
 def load_view(view_name):
+    entry = load_view_entry(view_name)
+    return None if entry is None else entry.content
+
+
+def load_view_entry(view_name: str) -> "CachedView | None":
+    """Loads a view together with its ETag. Views are served from an in-process cache, which is
+    invalidated whenever a view is stored (see ``invalidate_cache``)."""
+    return __view_cache.get(view_name, __load_view_entry)
+
+
+def invalidate_cache(view_name: str | None = None) -> None:
+    """Removes a view (or all views if no name is provided) from the in-process cache."""
+    __view_cache.invalidate(view_name)
+
+
+def __load_view_entry(view_name: str) -> "CachedView | None":
     log.info(f"Loading '{view_name}' view...")
+    # views stored by other means than __store_view have no payload, it's created from the content
     query = """
     SELECT
-        content
+        COALESCE(payload, convert_to(content::text, 'UTF8')), payload_gzip, updated_at
     FROM
         views
     WHERE name = %s;
@@ -36,27 +61,328 @@ def load_view(view_name):
             if result is None:
                 return None
             else:
-                (view,) = result
+                payload, payload_gzip, updated_at = result
+
+    return CachedView(
+        view_name,
+        bytes(payload),
+        None if payload_gzip is None else bytes(payload_gzip),
+        updated_at,
+    )
+
+
+class CachedView:
+    """A stored view serialized to JSON (and optionally gzip). Its ETag changes with every update of the view.
+
+    The content is parsed from the JSON payload on first access only, API endpoints send the payload as it is.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        payload: bytes,
+        payload_gzip: bytes | None,
+        updated_at: datetime,
+    ):
+        self.name = name
+        self.payload = payload
+        self.payload_gzip = payload_gzip
+        self.updated_at = updated_at
+        self.etag = hashlib.sha1(
+            f"{name}:{updated_at.isoformat()}".encode()
+        ).hexdigest()
+        self._content: Any = None
+        self._content_parsed = False
+
+    @property
+    def content(self):
+        if not self._content_parsed:
+            self._content = json.loads(self.payload)
+            self._content_parsed = True
+        return self._content
+
+
+class ViewCache:
+    """Thread-safe cache of views contents.
+
+    Args:
+        ttl (float): seconds after which a cached view is loaded again, 0 disables caching
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[CachedView, float]] = {}
+        self._generations: dict[str, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(
+        self, view_name: str, loader: Callable[[str], CachedView | None]
+    ) -> CachedView | None:
+        with self._lock:
+            cached = self._entries.get(view_name)
+            if cached is not None and time.monotonic() - cached[1] < self.ttl:
+                return cached[0]
+            generation = self.__generation_of(view_name)
+
+        entry = loader(view_name)
+
+        with self._lock:
+            # don't cache a view which was invalidated while it was being loaded
+            if (
+                entry is not None
+                and self.ttl > 0
+                and generation == self.__generation_of(view_name)
+            ):
+                self._entries[view_name] = (entry, time.monotonic())
+        return entry
+
+    def invalidate(self, view_name: str | None = None) -> None:
+        with self._lock:
+            if view_name is None:
+                self._entries.clear()
+                self._generation += 1
+            else:
+                self._entries.pop(view_name, None)
+                self._generations[view_name] = self._generations.get(view_name, 0) + 1
+
+    def __generation_of(self, view_name: str) -> tuple[int, int]:
+        return self._generation, self._generations.get(view_name, 0)
+
 
-    return view
+__view_cache = ViewCache(ttl=float(os.getenv("VIEWS_CACHE_TTL", "300")))
 
 
-def update_views(oldest_occured_event_date: date):
+def update_views(
+    oldest_occured_event_date: date | str | None, stream_ids: set[str] | None = None
+):
+    """Refreshes all views.
+
+    ``stream_ids`` are ids of streams affected since the last refresh (None if not known). When they are
+    provided only views fed by these streams (see View.sources) are refreshed.
+
+    Views which don't depend on each other are refreshed concurrently (on VIEWS_REFRESH_WORKERS threads,
+    each with its own database connection). Inputs shared by many views are loaded once per refresh.
+    """
     log.info(f"Updating views... (input: {oldest_occured_event_date})")
-    __main_indicators()
-    __current_total_savings_distribution()
-    __total_history_per_day(oldest_occured_event_date)
-    __investment_indicators()
-    __investment_types_distribution()
-    __investment_wallets_distribution()
-    __investment_types_distribution_per_wallet()
-    __monthly_income()
+    context = RefreshContext(oldest_occured_event_date, __shared_inputs, stream_ids)
+    started_at = datetime.now(timezone.utc)
+    timer_start = time.perf_counter()
+
+    timings: dict[str, float] = {}
+    errors: dict[str, Exception] = {}
+    affected = __affected_views(__views, stream_ids)
+    skipped = [view.key for view in __views if view not in affected]
+    if skipped:
+        log.info(f"Views not affected by streams {stream_ids}: {skipped}")
+    pending = {view.key: view for view in affected}
+    running: dict[futures.Future, str] = {}
+
+    with futures.ThreadPoolExecutor(
+        max_workers=__refresh_workers(), thread_name_prefix="views-refresh"
+    ) as executor:
+        while pending or running:
+            for key, view in list(pending.items()):
+                failed_dependencies = [dep for dep in view.depends_on if dep in errors]
+                if failed_dependencies:
+                    del pending[key]
+                    errors[key] = RuntimeError(
+                        f"'{key}' view was not refreshed, because its dependencies failed: {failed_dependencies}"
+                    )
+                elif all(dep in timings or dep in skipped for dep in view.depends_on):
+                    del pending[key]
+                    running[executor.submit(__refresh_view, view, context)] = key
+
+            if not running:
+                if pending:
+                    raise ValueError(
+                        f"Views have unresolvable dependencies: {list(pending)}"
+                    )
+                break
+
+            finished, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                try:
+                    timings[key] = future.result()
+                except Exception as ex:
+                    log.error(f"Failed to update '{key}' view: {ex}", exc_info=ex)
+                    errors[key] = ex
+
+    duration_ms = round((time.perf_counter() - timer_start) * 1000, 3)
+    __record_refresh(
+        {
+            "startedAt": started_at.isoformat(),
+            "fromDate": (
+                None
+                if context.oldest_occured_event_date is None
+                else str(context.oldest_occured_event_date)
+            ),
+            "streamIds": None if stream_ids is None else sorted(stream_ids),
+            "durationMs": duration_ms,
+            "views": timings,
+            "skipped": skipped,
+            "inputs": context.timings(),
+            "errors": {key: str(ex) for key, ex in errors.items()},
+        }
+    )
+    log.info(f"Views updated in {duration_ms} ms. Timings (ms): {timings}")
+
+    if errors:
+        raise next(iter(errors.values()))
+
+
+def last_refresh() -> dict | None:
+    with __last_refresh_lock:
+        return None if __last_refresh is None else dict(__last_refresh)
+
+
+def __record_refresh(refresh: dict) -> None:
+    global __last_refresh
+    with __last_refresh_lock:
+        __last_refresh = refresh
+
 
+def __affected_views(
+    all_views: list["View"], stream_ids: set[str] | None
+) -> list["View"]:
+    if stream_ids is None:
+        return list(all_views)
 
-def __main_indicators() -> None:
+    streams = __load_streams(stream_ids)
+    if len(streams) < len(stream_ids):
+        log.warning(
+            f"Some of streams {stream_ids} were not found, all views will be refreshed"
+        )
+        return list(all_views)
+
+    return [
+        view
+        for view in all_views
+        if view.sources is None
+        or any(source.matches(stream) for source in view.sources for stream in streams)
+    ]
+
+
+def __load_streams(stream_ids: set[str]) -> list[dict]:
+    query = """
+    SELECT type, subtype, labels
+    FROM streams
+    WHERE id = ANY(%s::uuid[]);
+    """
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, (list(stream_ids),))
+            rows = cur.fetchall()
+
+    return [{"type": row[0], "subtype": row[1], "labels": row[2] or {}} for row in rows]
+
+
+def __refresh_workers() -> int:
+    return max(1, int(os.getenv("VIEWS_REFRESH_WORKERS", "4")))
+
+
+def __refresh_view(view: "View", context: "RefreshContext") -> float:
+    timer_start = time.perf_counter()
+    view.update(context)
+    return round((time.perf_counter() - timer_start) * 1000, 3)
+
+
+class View:
+    """Definition of a stored view.
+
+    Args:
+        key (str): name under which the view is stored
+        update (Callable): function which computes and stores the view, it gets a RefreshContext
+        inputs (tuple[str]): names of shared inputs (see RefreshContext) used by the view
+        depends_on (tuple[str]): keys of views which need to be refreshed before this one
+        sources (tuple[StreamSource] | None): streams which feed the view, None if any stream does
+    """
+
+    def __init__(
+        self,
+        key: str,
+        update: Callable[["RefreshContext"], None],
+        inputs: tuple[str, ...] = (),
+        depends_on: tuple[str, ...] = (),
+        sources: tuple["StreamSource", ...] | None = None,
+    ):
+        self.key = key
+        self.update = update
+        self.inputs = inputs
+        self.depends_on = depends_on
+        self.sources = sources
+
+
+class StreamSource:
+    """Streams of a given type (and optionally subtype) which feed a view.
+
+    Args:
+        type (str | None): stream type, None matches any type
+        subtype (str | None): stream subtype, None matches any subtype
+        wealth_only (bool): matches only streams included in wealth ('include_in_wealth' label)
+    """
+
+    def __init__(
+        self,
+        type: str | None = None,
+        subtype: str | None = None,
+        wealth_only: bool = False,
+    ):
+        self.type = type
+        self.subtype = subtype
+        self.wealth_only = wealth_only
+
+    def matches(self, stream: dict) -> bool:
+        if self.type is not None and stream["type"] != self.type:
+            return False
+        if self.subtype is not None and stream["subtype"] != self.subtype:
+            return False
+        if self.wealth_only:
+            include_in_wealth = stream["labels"].get("include_in_wealth")
+            return include_in_wealth is None or str(include_in_wealth).lower() == "true"
+        return True
+
+
+class RefreshContext:
+    """State of a single refresh cycle. Shared inputs are loaded at most once per cycle, even if requested concurrently."""
+
+    def __init__(
+        self,
+        oldest_occured_event_date: date | str | None,
+        shared_inputs: dict[str, Callable[[], Any]],
+        stream_ids: set[str] | None = None,
+    ):
+        self.oldest_occured_event_date = oldest_occured_event_date
+        self.stream_ids = stream_ids
+        self._shared_inputs = shared_inputs
+        self._results: dict[str, Any] = {}
+        self._timings: dict[str, float] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, input_name: str):
+        with self._lock:
+            input_lock = self._locks.setdefault(input_name, threading.Lock())
+
+        with input_lock:
+            if input_name not in self._results:
+                timer_start = time.perf_counter()
+                self._results[input_name] = self._shared_inputs[input_name]()
+                self._timings[input_name] = round(
+                    (time.perf_counter() - timer_start) * 1000, 3
+                )
+            return self._results[input_name]
+
+    def timings(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._timings)
+
+
+def __main_indicators(context: "RefreshContext") -> None:
     log.info(f"Updating '{main_indicators_key}' view...")
-    current_total_savings = __load_current_total_savings()
-    monthly_income_data = __load_monthly_income()
+    current_total_savings = context.get(current_total_savings_input)
+    monthly_income_data = context.get(monthly_income_input)
     last_month_income = (
         monthly_income_data["total"][-1] if monthly_income_data["total"] else None
     )
@@ -89,12 +415,12 @@ def __load_current_total_savings() -> float:
 
     accounts_balance AS (
         SELECT
-            SUM((data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             l.subtype as type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            account_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            account_latest_version l ON c.stream_id = l.id
         GROUP BY
             l.subtype
         ),
@@ -116,12 +442,12 @@ def __load_current_total_savings() -> float:
 
     retirement_balance AS (
         SELECT
-            SUM((data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
              'retirement' as type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            retirement_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            retirement_latest_version l ON c.stream_id = l.id
     ),
 
     investment_latest_version AS (
@@ -140,10 +466,10 @@ def __load_current_total_savings() -> float:
 
     investment_balance AS (
         SELECT
-            (data->>'balance')::numeric AS total,
+            c.balance AS total,
             l.subtype
-        FROM events e
-        JOIN investment_latest_version l ON e.stream_id = l.id AND l.version = e.version
+        FROM stream_current_state c
+        JOIN investment_latest_version l ON c.stream_id = l.id
     ),
 
 
@@ -156,12 +482,12 @@ def __load_current_total_savings() -> float:
 
     stocks_balance AS (
         SELECT
-            ROUND(SUM((data->>'balance')::numeric), 2) AS total,
+            ROUND(SUM(c.balance), 2) AS total,
             'stocks' AS type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            stocks_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            stocks_latest_version l ON c.stream_id = l.id
     ),
 
     all_buckets AS (
@@ -191,7 +517,7 @@ def __load_current_total_savings() -> float:
     return 0 if result is None else result
 
 
-def __current_total_savings_distribution():
+def __current_total_savings_distribution(context: "RefreshContext"):
     log.info(f"Updating '{current_savings_distribution_key}' view...")
     view_content = __load_current_total_savings_distribution()
 
@@ -218,16 +544,16 @@ def __load_current_total_savings_distribution() -> list[dict]:
 
     accounts_balance AS (
         SELECT
-            SUM((data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             CASE
                 WHEN l.subtype = 'checking' THEN 'Checking Accounts'
                 WHEN l.subtype = 'savings' THEN 'Savings Accounts'
             ELSE l.subtype
             END AS type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            account_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            account_latest_version l ON c.stream_id = l.id
         GROUP BY
             l.subtype
         ),
@@ -249,12 +575,12 @@ def __load_current_total_savings_distribution() -> list[dict]:
 
     retirement_balance AS (
         SELECT
-            SUM((data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
              'Retirement' as type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            retirement_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            retirement_latest_version l ON c.stream_id = l.id
     ),
 
     investment_latest_version AS (
@@ -273,10 +599,10 @@ def __load_current_total_savings_distribution() -> list[dict]:
 
     investment_balance AS (
         SELECT
-            SUM((data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             'Investments' AS type
-        FROM events e
-        JOIN investment_latest_version l ON e.stream_id = l.id AND l.version = e.version
+        FROM stream_current_state c
+        JOIN investment_latest_version l ON c.stream_id = l.id
     ),
 
 
@@ -289,12 +615,12 @@ def __load_current_total_savings_distribution() -> list[dict]:
 
     stocks_balance AS (
         SELECT
-            ROUND(SUM((data->>'balance')::numeric), 2) AS total,
+            ROUND(SUM(c.balance), 2) AS total,
             'Stocks & ETFs' AS type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            stocks_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            stocks_latest_version l ON c.stream_id = l.id
     ),
 
     all_buckets AS (
@@ -336,72 +662,142 @@ def __load_current_total_savings_distribution() -> list[dict]:
     return result
 
 
-def __total_history_per_day(oldest_occured_event_date: date):
+def __total_history_per_day(context: "RefreshContext"):
     log.info(f"Updating '{total_history_per_day_key}' view...")
-    view_content = __load_total_history_per_day(oldest_occured_event_date)
+    # the stored content is read from the database, as it may have been changed by another process
+    stored_entry = __load_view_entry(total_history_per_day_key)
+    stored_content = None if stored_entry is None else stored_entry.content
+    recompute_from = __total_history_recompute_from(
+        to_date(context.oldest_occured_event_date), stored_content
+    )
+
+    changed_content = __load_total_history_per_day(recompute_from)
+    if recompute_from is None:
+        view_content = changed_content
+    else:
+        view_content = __merge_total_history(
+            stored_content, changed_content, recompute_from
+        )
 
     __store_view(total_history_per_day_key, view_content)
     log.info(f"The '{total_history_per_day_key}' view was updated")
 
 
-def __load_total_history_per_day(oldest_occured_event_date: date) -> dict[str, list]:
-    log.info("Loading total history per day starting from oldest occured event date...")
+def __total_history_recompute_from(
+    from_date: date | None, stored_content: dict | None
+) -> date | None:
+    """Returns the first day which needs to be recomputed or None if the whole history needs to be rebuilt"""
+    if from_date is None or not stored_content or not stored_content.get("date"):
+        return None
+
+    # stored days are ordered from the newest to the oldest
+    oldest_stored_day = date.fromisoformat(stored_content["date"][-1])
+    if from_date <= oldest_stored_day:
+        return None
+
+    # days between the newest stored day and the notified date need to be filled too
+    newest_stored_day = date.fromisoformat(stored_content["date"][0])
+    return min(from_date, newest_stored_day + timedelta(days=1))
+
+
+def __merge_total_history(
+    stored_content: dict, changed_content: dict, recompute_from: date
+) -> dict[str, list]:
+    result = {
+        "date": list(changed_content["date"]),
+        "total": list(changed_content["total"]),
+    }
+    recompute_from_str = recompute_from.strftime("%Y-%m-%d")
+    for day, total in zip(stored_content["date"], stored_content["total"]):
+        if day < recompute_from_str:
+            result["date"].append(day)
+            result["total"].append(total)
+    return result
+
+
+def __load_total_history_per_day(from_date: date | None = None) -> dict[str, list]:
+    log.info(
+        f"Loading total history per day starting from {from_date or 'the oldest event'}..."
+    )
     query = """
-    WITH date_range AS (
-    SELECT
-        (SELECT MIN(occured_at) FROM events) AS from_date,  -- Start date (earliest event date)
-        (SELECT MAX(occured_at) FROM events) AS till_date -- End date (latest event date)
+    WITH
+    wealth_streams AS (
+        SELECT id FROM streams
+        WHERE labels->>'include_in_wealth' IS NULL OR labels->>'include_in_wealth' = 'true'
     ),
 
-    date_series AS (
-    SELECT
-    generate_series(
-            date_range.from_date,
-            date_range.till_date,
-            '1 day'::interval
-    )::date AS occured_at
-    FROM date_range
+    date_range AS (
+        SELECT
+            MIN(day) AS from_day,  -- earliest event date
+            MAX(day) AS till_day,  -- latest event date
+            GREATEST(MIN(day), COALESCE(%(from_date)s::date, MIN(day))) AS range_start
+        FROM stream_daily_balance
     ),
 
-    all_day_and_accounts AS (
-    SELECT
-        date_series.occured_at,
-        stream_ids.id AS stream_id
-    FROM
-        date_series
-    CROSS JOIN (SELECT id FROM streams WHERE labels->>'include_in_wealth' IS NULL OR labels->>'include_in_wealth' = 'true') stream_ids
-    ORDER BY
-        stream_ids.id, date_series.occured_at
+    date_series AS (
+        SELECT
+            generate_series(
+                date_range.range_start,
+                date_range.till_day,
+                '1 day'::interval
+            )::date AS day
+        FROM date_range
     ),
 
-    all_account_balances_per_day AS (
-    SELECT al.occured_at, al.stream_id,
-       COALESCE((
-            SELECT events.data ->> 'balance'
-            FROM events
-            WHERE events.stream_id = al.stream_id
-              AND events.occured_at <= al.occured_at
-            ORDER BY events.version DESC
+    -- balance of each stream right before the requested range
+    opening_balances AS (
+        SELECT
+            ws.id AS stream_id,
+            ob.balance
+        FROM wealth_streams ws
+        CROSS JOIN date_range dr
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(b.balance, 0) AS balance
+            FROM stream_daily_balance b
+            WHERE b.stream_id = ws.id
+              AND b.day < dr.range_start
+            ORDER BY b.day DESC
             LIMIT 1
-        )::numeric, 0) AS balance
-    FROM all_day_and_accounts al
+        ) ob
+    ),
+
+    stream_changes AS (
+        SELECT
+            b.day,
+            COALESCE(b.balance, 0) - COALESCE(
+                LAG(COALESCE(b.balance, 0)) OVER (PARTITION BY b.stream_id ORDER BY b.day),
+                ob.balance,
+                0
+            ) AS delta
+        FROM stream_daily_balance b
+        JOIN wealth_streams ws ON ws.id = b.stream_id
+        CROSS JOIN date_range dr
+        LEFT JOIN opening_balances ob ON ob.stream_id = b.stream_id
+        WHERE b.day >= dr.range_start
+    ),
+
+    daily_changes AS (
+        SELECT day, SUM(delta) AS delta
+        FROM stream_changes
+        GROUP BY day
     )
 
-     SELECT
-        occured_at,
-        SUM(balance) as balance
+    SELECT
+        ds.day,
+        (SELECT COALESCE(SUM(balance), 0) FROM opening_balances)
+            + SUM(COALESCE(dc.delta, 0)) OVER (ORDER BY ds.day) AS balance
     FROM
-        all_account_balances_per_day
-    GROUP BY
-        occured_at
+        date_series ds
+    LEFT JOIN
+        daily_changes dc ON dc.day = ds.day
     ORDER BY
-        occured_at DESC;
+        ds.day DESC;
     """
 
     result = {"date": [], "total": []}
     with db.get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query, {"from_date": from_date})
             rows = cur.fetchall()
 
             for row in rows:
@@ -421,51 +817,32 @@ def __load_monthly_income() -> dict[str, list]:
 
     month_series AS (
         SELECT generate_series(
-            date_trunc('month', (SELECT MIN(occured_at) FROM events)),
+            date_trunc('month', (SELECT MIN(day) FROM stream_daily_balance)),
             date_trunc('month', now()) - interval '1 month',
             '1 month'::interval
         )::date AS month_start
     ),
 
-    first_day_balance AS (
+    -- change of a stream balance on each day it had any events
+    daily_changes AS (
         SELECT
-            ms.month_start,
-            ws.id AS stream_id,
-            COALESCE((
-                SELECT (e.data->>'balance')::numeric
-                FROM events e
-                WHERE e.stream_id = ws.id
-                  AND e.occured_at <= ms.month_start
-                ORDER BY e.version DESC
-                LIMIT 1
-            ), 0) AS balance
-        FROM month_series ms
-        CROSS JOIN wealth_streams ws
-    ),
-
-    last_day_balance AS (
-        SELECT
-            ms.month_start,
-            ws.id AS stream_id,
-            COALESCE((
-                SELECT (e.data->>'balance')::numeric
-                FROM events e
-                WHERE e.stream_id = ws.id
-                  AND e.occured_at <= (ms.month_start + interval '1 month - 1 day')::date
-                ORDER BY e.version DESC
-                LIMIT 1
-            ), 0) AS balance
-        FROM month_series ms
-        CROSS JOIN wealth_streams ws
+            b.day,
+            COALESCE(b.balance, 0)
+                - LAG(COALESCE(b.balance, 0), 1, 0::numeric) OVER (PARTITION BY b.stream_id ORDER BY b.day) AS delta
+        FROM stream_daily_balance b
+        JOIN wealth_streams ws ON ws.id = b.stream_id
     )
 
+    -- last-day balance minus first-day balance is a sum of changes after the first day of a month
     SELECT
-        f.month_start,
-        SUM(l.balance - f.balance) AS income
-    FROM first_day_balance f
-    JOIN last_day_balance l ON f.stream_id = l.stream_id AND f.month_start = l.month_start
-    GROUP BY f.month_start
-    ORDER BY f.month_start ASC;
+        ms.month_start,
+        COALESCE(SUM(dc.delta), 0) AS income
+    FROM month_series ms
+    LEFT JOIN daily_changes dc
+        ON dc.day > ms.month_start
+        AND dc.day <= (ms.month_start + interval '1 month - 1 day')::date
+    GROUP BY ms.month_start
+    ORDER BY ms.month_start ASC;
     """
 
     result: dict[str, list] = {"date": [], "total": []}
@@ -480,14 +857,14 @@ def __load_monthly_income() -> dict[str, list]:
     return result
 
 
-def __monthly_income() -> None:
+def __monthly_income(context: "RefreshContext") -> None:
     log.info(f"Updating '{monthly_income_key}' view...")
-    view_content = __load_monthly_income()
+    view_content = context.get(monthly_income_input)
     __store_view(monthly_income_key, view_content)
     log.info(f"The '{monthly_income_key}' view was updated")
 
 
-def __investment_indicators() -> None:
+def __investment_indicators(context: "RefreshContext") -> None:
     log.info(f"Updating '{investment_indicators_key}' view...")
     log.info("Loading current total savings value...")
     query = """
@@ -508,10 +885,10 @@ def __investment_indicators() -> None:
     ),
     investment_balance AS (
         SELECT
-            (data->>'balance')::numeric AS total,
+            c.balance AS total,
             l.subtype
-        FROM events e
-        JOIN investment_latest_version l ON e.stream_id = l.id AND l.version = e.version
+        FROM stream_current_state c
+        JOIN investment_latest_version l ON c.stream_id = l.id
     ),
     stocks_latest_version AS (
         SELECT id, version
@@ -522,12 +899,12 @@ def __investment_indicators() -> None:
     ),
     stocks_balance AS (
         SELECT
-            ROUND(SUM((data->>'balance')::numeric), 2) AS total,
+            ROUND(SUM(c.balance), 2) AS total,
             'stocks' AS type
         FROM
-            events e
+            stream_current_state c
         JOIN
-            stocks_latest_version l ON e.stream_id = l.id AND l.version = e.version
+            stocks_latest_version l ON c.stream_id = l.id
     ),
     savings_latest_version AS (
         SELECT id, version
@@ -539,10 +916,10 @@ def __investment_indicators() -> None:
     ),
     savings_balance AS (
         SELECT
-            SUM((data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             'savings' AS type
-        FROM events e
-        JOIN savings_latest_version l ON e.stream_id = l.id AND l.version = e.version
+        FROM stream_current_state c
+        JOIN savings_latest_version l ON c.stream_id = l.id
     ),
     all_buckets AS (
         SELECT * FROM investment_balance
@@ -570,7 +947,7 @@ def __investment_indicators() -> None:
     log.info(f"The '{investment_indicators_key}' view was updated")
 
 
-def __investment_types_distribution():
+def __investment_types_distribution(context: "RefreshContext"):
     log.info(f"Updating '{investment_types_distribution_key}' view...")
     view_content = __load_investment_types_distribution()
     __store_view(investment_types_distribution_key, view_content)
@@ -591,10 +968,10 @@ def __load_investment_types_distribution() -> list[dict]:
     ),
     investment_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.subtype
-        FROM events e
-        JOIN investment_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN investment_streams s ON c.stream_id = s.id
         GROUP BY s.subtype
     ),
     stocks_streams AS (
@@ -606,10 +983,10 @@ def __load_investment_types_distribution() -> list[dict]:
     ),
     stocks_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.subtype
-        FROM events e
-        JOIN stocks_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN stocks_streams s ON c.stream_id = s.id
         GROUP BY s.subtype
     ),
     savings_streams AS (
@@ -622,10 +999,10 @@ def __load_investment_types_distribution() -> list[dict]:
     ),
     savings_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.subtype
-        FROM events e
-        JOIN savings_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN savings_streams s ON c.stream_id = s.id
         GROUP BY s.subtype
     ),
     all_types AS (
@@ -663,7 +1040,7 @@ def __load_investment_types_distribution() -> list[dict]:
     return result
 
 
-def __investment_wallets_distribution():
+def __investment_wallets_distribution(context: "RefreshContext"):
     log.info(f"Updating '{investment_wallets_distribution_key}' view...")
     view_content = __load_investment_wallets_distribution()
     __store_view(investment_wallets_distribution_key, view_content)
@@ -683,10 +1060,10 @@ def __load_investment_wallets_distribution() -> list[dict]:
     ),
     investment_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.wallet
-        FROM events e
-        JOIN investment_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN investment_streams s ON c.stream_id = s.id
         GROUP BY s.wallet
     ),
     stocks_streams AS (
@@ -697,10 +1074,10 @@ def __load_investment_wallets_distribution() -> list[dict]:
     ),
     stocks_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.wallet
-        FROM events e
-        JOIN stocks_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN stocks_streams s ON c.stream_id = s.id
         GROUP BY s.wallet
     ),
     savings_streams AS (
@@ -712,10 +1089,10 @@ def __load_investment_wallets_distribution() -> list[dict]:
     ),
     savings_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.wallet
-        FROM events e
-        JOIN savings_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN savings_streams s ON c.stream_id = s.id
         GROUP BY s.wallet
     ),
     all_wallets_raw AS (
@@ -748,7 +1125,7 @@ def __load_investment_wallets_distribution() -> list[dict]:
     return result
 
 
-def __investment_types_distribution_per_wallet():
+def __investment_types_distribution_per_wallet(context: "RefreshContext"):
     log.info("Updating 'investment-types-distribution-per-wallet' view...")
     view_content = __load_investment_types_distribution_per_wallet()
     __store_view("investment-types-distribution-per-wallet", view_content)
@@ -767,11 +1144,11 @@ def __load_investment_types_distribution_per_wallet() -> list[dict]:
     ),
     investment_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.wallet,
             s.subtype
-        FROM events e
-        JOIN investment_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN investment_streams s ON c.stream_id = s.id
         GROUP BY s.wallet, s.subtype
     ),
     stocks_streams AS (
@@ -781,11 +1158,11 @@ def __load_investment_types_distribution_per_wallet() -> list[dict]:
     ),
     stocks_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.wallet,
             s.subtype
-        FROM events e
-        JOIN stocks_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN stocks_streams s ON c.stream_id = s.id
         GROUP BY s.wallet, s.subtype
     ),
     savings_streams AS (
@@ -795,11 +1172,11 @@ def __load_investment_types_distribution_per_wallet() -> list[dict]:
     ),
     savings_balance AS (
         SELECT
-            SUM((e.data->>'balance')::numeric) AS total,
+            SUM(c.balance) AS total,
             s.wallet,
             s.subtype
-        FROM events e
-        JOIN savings_streams s ON e.stream_id = s.id AND e.version = s.version
+        FROM stream_current_state c
+        JOIN savings_streams s ON c.stream_id = s.id
         GROUP BY s.wallet, s.subtype
     ),
     all_types AS (
@@ -844,6 +1221,77 @@ def __load_investment_types_distribution_per_wallet() -> list[dict]:
     return result
 
 
+current_total_savings_input = "current-total-savings"
+monthly_income_input = "monthly-income"
+
+__shared_inputs: dict[str, Callable[[], Any]] = {
+    current_total_savings_input: __load_current_total_savings,
+    monthly_income_input: __load_monthly_income,
+}
+
+__wealth_sources = (StreamSource(wealth_only=True),)
+__savings_sources = (
+    StreamSource("account", wealth_only=True),
+    StreamSource("retirement", wealth_only=True),
+    StreamSource("investment", wealth_only=True),
+    StreamSource("stocks", wealth_only=True),
+)
+__investment_sources = (
+    StreamSource("investment", wealth_only=True),
+    StreamSource("stocks", wealth_only=True),
+    StreamSource("account", "savings", wealth_only=True),
+)
+__wallet_sources = (
+    StreamSource("investment"),
+    StreamSource("stocks"),
+    StreamSource("account", "savings"),
+)
+
+__views = [
+    View(
+        main_indicators_key,
+        __main_indicators,
+        inputs=(current_total_savings_input, monthly_income_input),
+        sources=__wealth_sources,
+    ),
+    View(
+        current_savings_distribution_key,
+        __current_total_savings_distribution,
+        sources=__savings_sources,
+    ),
+    View(total_history_per_day_key, __total_history_per_day, sources=__wealth_sources),
+    View(
+        investment_indicators_key,
+        __investment_indicators,
+        sources=__investment_sources,
+    ),
+    View(
+        investment_types_distribution_key,
+        __investment_types_distribution,
+        sources=__investment_sources,
+    ),
+    View(
+        investment_wallets_distribution_key,
+        __investment_wallets_distribution,
+        sources=__wallet_sources,
+    ),
+    View(
+        investment_types_distribution_per_wallet_key,
+        __investment_types_distribution_per_wallet,
+        sources=__wallet_sources,
+    ),
+    View(
+        monthly_income_key,
+        __monthly_income,
+        inputs=(monthly_income_input,),
+        sources=__wealth_sources,
+    ),
+]
+
+__last_refresh: dict | None = None
+__last_refresh_lock = threading.Lock()
+
+
 class JSONEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
@@ -852,16 +1300,35 @@ class JSONEncoder(json.JSONEncoder):
 
 
 def __store_view(view_name: str, view_content):
-    json_string = json.dumps(view_content, cls=JSONEncoder)
+    payload = json.dumps(view_content, cls=JSONEncoder, separators=(",", ":")).encode()
+    payload_gzip = (
+        gzip.compress(payload) if len(payload) >= __payload_gzip_min_size() else None
+    )
 
     insert_statement = """
     INSERT INTO
-        views (name, content)
+        views (name, content, payload, payload_gzip)
     VALUES
-        (%s, %s::jsonb)
+        (%(name)s, convert_from(%(payload)s, 'UTF8')::jsonb, %(payload)s, %(payload_gzip)s)
     ON CONFLICT
         (name)
     DO UPDATE
-        SET content = %s::jsonb, updated_at = now();
+        SET content = EXCLUDED.content,
+            payload = EXCLUDED.payload,
+            payload_gzip = EXCLUDED.payload_gzip,
+            updated_at = now();
     """
-    db.execute(insert_statement, (view_name, json_string, json_string))
+    db.execute(
+        insert_statement,
+        {
+            "name": view_name,
+            "payload": payload,
+            "payload_gzip": payload_gzip,
+        },
+    )
+    invalidate_cache(view_name)
+
+
+def __payload_gzip_min_size() -> int:
+    # payloads smaller than that are not compressed, as it wouldn't make them noticeably smaller
+    return int(os.getenv("VIEWS_PAYLOAD_GZIP_MIN_SIZE", "1024"))
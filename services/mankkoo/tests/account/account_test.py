@@ -3,6 +3,8 @@ import pathlib
 import time
 import uuid
 
+import numpy as np
+import pandas as pd
 import pytest
 
 import mankkoo.account.account as account
@@ -11,7 +13,7 @@ import mankkoo.app as app
 import mankkoo.data_for_test as td
 import mankkoo.database as db
 import mankkoo.event_store as es
-from mankkoo.account.models import Bank
+from mankkoo.account.models import Bank, OperationsOrder
 
 account_operations_raw_data = (
     open(
@@ -128,6 +130,225 @@ def test_new_operations_are_added_and_balance_is_calculated(mocker):
     assert float(operations[2].balance) == 796.67
 
 
+def test_balances_are_calculated_without_rounding_errors(mocker):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    account_id = account_stream.id
+    es.create([account_stream])
+    es.store(
+        [
+            td.account_operation_event(
+                account_id,
+                operation=0.3,
+                balance=0,
+                version=1,
+                occured_at=datetime.datetime(
+                    2020, 12, 31, tzinfo=datetime.timezone.utc
+                ),
+            )
+        ]
+    )
+
+    operations = pd.DataFrame(
+        {
+            "Bank": "TEST",
+            "Type": "account",
+            "Account": str(account_id),
+            "Date": pd.date_range("2021-01-01", periods=1000, tz="UTC"),
+            "Title": ["Top up"] * 999 + [np.nan],
+            "Details": "",
+            "Category": "",
+            "Comment": "",
+            "Operation": [0.1] * 1000,
+            "Currency": "PLN",
+        }
+    )
+    mocker.patch(
+        "mankkoo.account.account_db.get_bank_type", side_effect=[Bank.PL_MILLENIUM]
+    )
+    mocker.patch(
+        "mankkoo.account.importer.importer.load_bank_chunks",
+        return_value=(OperationsOrder.FILE, iter([operations])),
+    )
+
+    # WHEN
+    account.add_new_operations(account_id, contents=b"")
+
+    # THEN
+    events = __load_events(account_id)
+    assert len(events) == 1001
+    assert [event.version for event in events] == list(range(1, 1002))
+    assert events[1].data["balance"] == 0.4
+    assert events[-1].data["balance"] == 100.3
+    assert events[-1].data["title"] == "Title not provided"
+    assert all(event.event_type == "MoneyDeposited" for event in events[1:])
+
+
+def test_new_operations_are_added_in_chunks(mocker, monkeypatch):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    account_id = account_stream.id
+    es.create([account_stream])
+    monkeypatch.setenv("IMPORT_CHUNK_SIZE", "4")
+    progress = []
+
+    mocker.patch(
+        "mankkoo.account.account_db.get_bank_type", side_effect=[Bank.PL_MILLENIUM]
+    )
+
+    # WHEN
+    account.add_new_operations(
+        account_id,
+        contents=account_operations_raw_data,
+        progress=lambda stage, rows, total: progress.append((stage, rows, total)),
+    )
+
+    # THEN
+    events = __load_events(account_id)
+    assert [event.version for event in events] == [1, 2, 3, 4, 5, 6]
+    assert [event.data["balance"] for event in events] == [
+        1000.0,
+        800.0,
+        796.67,
+        800.0,
+        400.0,
+        450.0,
+    ]
+    assert progress == [
+        ("parsed", 4, None),
+        ("formatted", 4, None),
+        ("parsed", 6, None),
+        ("formatted", 6, None),
+        ("deduplicated", 6, 6),
+        ("prepared", 6, 6),
+        ("stored", 4, 6),
+        ("stored", 6, 6),
+    ]
+
+
+@pytest.mark.parametrize(
+    "bank, file_name",
+    [
+        (Bank.PL_ING, "test_pl_ing.csv"),
+        (Bank.PL_MBANK, "test_pl_mbank.csv"),
+        (Bank.PL_MILLENIUM, "test_pl_millenium.csv"),
+    ],
+)
+def test_operations_of_chunks_are_added_in_chronological_order(
+    mocker, monkeypatch, bank, file_name
+):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    account_id = account_stream.id
+    es.create([account_stream])
+    monkeypatch.setenv("IMPORT_CHUNK_SIZE", "2")
+
+    mocker.patch("mankkoo.account.account_db.get_bank_type", side_effect=[bank])
+
+    # WHEN
+    account.add_new_operations(
+        account_id,
+        file_name=str(pathlib.Path(__file__).parent.absolute()) + "/data/" + file_name,
+    )
+
+    # THEN
+    events = __load_events(account_id)
+    assert [event.occured_at.strftime("%Y-%m-%d") for event in events] == [
+        "2021-01-01",
+        "2021-02-02",
+        "2021-03-03",
+        "2021-04-04",
+        "2021-05-05",
+        "2021-06-06",
+    ]
+    assert events[-1].data["balance"] == 450.0
+
+
+def test_no_operations_are_stored_if_an_import_fails(mocker, monkeypatch):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    account_id = account_stream.id
+    es.create([account_stream])
+    monkeypatch.setenv("IMPORT_CHUNK_SIZE", "4")
+
+    mocker.patch(
+        "mankkoo.account.account_db.get_bank_type", side_effect=[Bank.PL_MILLENIUM]
+    )
+    append_staged_operations = account_db.append_staged_operations
+    appended = []
+
+    def append_first_chunk_only(cur, account_id, from_version, to_version):
+        if appended:
+            raise RuntimeError("Connection lost")
+        append_staged_operations(cur, account_id, from_version, to_version)
+        appended.append(to_version)
+
+    mocker.patch(
+        "mankkoo.account.account_db.append_staged_operations",
+        side_effect=append_first_chunk_only,
+    )
+
+    # WHEN
+    with pytest.raises(RuntimeError):
+        account.add_new_operations(account_id, contents=account_operations_raw_data)
+
+    # THEN
+    assert appended == [4]
+    assert es.get_stream_by_id(account_id).version == 0
+    assert __load_events(account_id) == []
+    assert account_db.get_account_balance(account_id) == 0
+
+
+def test_already_imported_operations_are_skipped(mocker):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    account_id = account_stream.id
+    es.create([account_stream])
+
+    mocker.patch(
+        "mankkoo.account.account_db.get_bank_type",
+        side_effect=[Bank.PL_MILLENIUM, Bank.PL_MILLENIUM],
+    )
+    account.add_new_operations(account_id, contents=account_operations_raw_data)
+
+    # WHEN
+    account.add_new_operations(account_id, contents=account_operations_raw_data)
+
+    # THEN
+    assert es.get_stream_by_id(account_id).version == 6
+    assert account_db.get_account_balance(account_id) == 450.0
+
+
+def test_only_new_operations_of_overlapping_import_are_added(mocker):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    account_id = account_stream.id
+    es.create([account_stream])
+
+    lines = account_operations_raw_data.decode("utf8").splitlines(keepends=True)
+    header, operations = lines[0], lines[1:]
+    # operations are exported from the newest one
+    older_export = "".join([header] + operations[2:]).encode("utf8")
+
+    mocker.patch(
+        "mankkoo.account.account_db.get_bank_type",
+        side_effect=[Bank.PL_MILLENIUM, Bank.PL_MILLENIUM],
+    )
+    account.add_new_operations(account_id, contents=older_export)
+
+    # WHEN
+    account.add_new_operations(account_id, contents=account_operations_raw_data)
+
+    # THEN
+    events = __load_events(account_id)
+    assert [event.version for event in events] == [1, 2, 3, 4, 5, 6]
+    assert [event.data["title"] for event in events[4:]] == [
+        "Spotify - Out 3",
+        "PKP - In 2",
+    ]
+    assert events[-1].data["balance"] == 450.0
+
+
 def test_new_operations_are_added_and_views_are_updated(mocker):
     # GIVEN
     account_stream = td.any_account_stream()
@@ -180,6 +401,20 @@ def test_new_operations_are_added_to_a_correct_stream_only(mocker):
     assert es.get_stream_by_id(another_account_stream.id).version == 0
 
 
+def test_bank_is_detected_if_account_has_no_importer(mocker):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    es.create([account_stream])
+
+    mocker.patch("mankkoo.account.account_db.get_bank_type", return_value=None)
+
+    # WHEN
+    account.add_new_operations(account_stream.id, contents=account_operations_raw_data)
+
+    # THEN
+    assert es.get_stream_by_id(account_stream.id).version == 6
+
+
 def test_new_operations_are_not_added_if_incorrect_invalid_account_id_is_provided():
     # GIVEN
     invalid_account_id = "14490940-640f-4f23-8468-af18411ab5f5"
@@ -0,0 +1,118 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+
+from mankkoo.account import import_jobs
+
+
+def test_job_reports_rows_and_timing_of_each_stage(mocker):
+    # GIVEN
+    def add_new_operations(account_id, file_name, progress):
+        progress("parsed", 2, None)
+        progress("parsed", 3, None)
+        progress("stored", 2, 3)
+        progress("stored", 3, 3)
+
+    mocker.patch(
+        "mankkoo.account.account.add_new_operations", side_effect=add_new_operations
+    )
+    jobs = import_jobs.ImportJobs()
+
+    # WHEN
+    job = jobs.submit("account-id", io.BytesIO(b"contents"), "statement.csv")
+    jobs.wait(job.id, timeout=5)
+
+    # THEN
+    status = job.to_dict()
+    assert status["status"] == "succeeded"
+    assert status["rowsParsed"] == 3
+    assert status["rowsStored"] == 3
+    assert status["rowsTotal"] == 3
+    assert list(status["stages"]) == ["parsed", "stored"]
+    assert all(stage["durationMs"] >= 0 for stage in status["stages"].values())
+    assert status["durationMs"] >= 0
+    assert status["error"] is None
+
+
+def test_job_is_queued_until_a_worker_is_free(mocker):
+    # GIVEN
+    release = threading.Event()
+    mocker.patch(
+        "mankkoo.account.account.add_new_operations",
+        side_effect=lambda *args, **kwargs: release.wait(5),
+    )
+    jobs = import_jobs.ImportJobs(workers=1)
+    first = jobs.submit("account-id", io.BytesIO(b"first"))
+
+    # WHEN
+    second = jobs.submit("account-id", io.BytesIO(b"second"))
+
+    # THEN
+    assert second.to_dict()["status"] == "queued"
+    release.set()
+    jobs.wait(first.id, timeout=5)
+    jobs.wait(second.id, timeout=5)
+    assert second.status == "succeeded"
+
+
+def test_only_last_finished_jobs_are_remembered(mocker):
+    # GIVEN
+    mocker.patch("mankkoo.account.account.add_new_operations")
+    jobs = import_jobs.ImportJobs(retention=2)
+
+    # WHEN
+    submitted = []
+    for _ in range(4):
+        job = jobs.submit("account-id", io.BytesIO(b"contents"))
+        jobs.wait(job.id, timeout=5)
+        submitted.append(job)
+    last = jobs.submit("account-id", io.BytesIO(b"contents"))
+    jobs.wait(last.id, timeout=5)
+
+    # THEN
+    assert jobs.get(submitted[0].id) is None
+    assert jobs.get(last.id) is last
+
+
+def test_upload_is_read_from_a_temporary_file_removed_after_a_job(
+    mocker, tmp_path, monkeypatch
+):
+    # GIVEN
+    monkeypatch.setenv("IMPORT_SPOOL_DIR", str(tmp_path))
+    uploads = []
+
+    def add_new_operations(account_id, file_name, progress):
+        with open(file_name, "rb") as file:
+            uploads.append(file.read())
+        raise ValueError("Not known bank")
+
+    mocker.patch(
+        "mankkoo.account.account.add_new_operations", side_effect=add_new_operations
+    )
+    jobs = import_jobs.ImportJobs()
+
+    # WHEN
+    job = jobs.submit("account-id", io.BytesIO(b"contents"))
+    jobs.wait(job.id, timeout=5)
+
+    # THEN
+    assert uploads == [b"contents"]
+    assert job.status == "failed"
+    assert os.listdir(tmp_path) == []
+
+
+def test_pandas_is_not_loaded_when_the_app_starts():
+    # GIVEN
+    script = (
+        "import sys, mankkoo.app; print(sorted({'pandas', 'numpy'} & set(sys.modules)))"
+    )
+
+    # WHEN
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+
+    # THEN
+    assert result.stdout.strip() == "[]"
@@ -2,11 +2,14 @@ import pathlib
 
 import numpy as np
 import pandas as pd
+import pytest
 from pandas._testing import assert_frame_equal
 
 import mankkoo.account.importer.importer as importer
+import mankkoo.account.importer.pl_mbank as pl_mbank
 import mankkoo.account.models as models
 import mankkoo.database as db
+from benchmarks import statements
 
 
 def __account_data(rows):
@@ -133,6 +136,39 @@ def test_load_pl_mbank():
     )
 
 
+def test_load_pl_mbank_contents_with_footer():
+    # GIVEN
+    with open(test_data_path + "test_pl_mbank.csv", "rb") as file:
+        contents = file.read()
+    contents += "\n#Saldo końcowe;850,00 PLN;\n".encode("utf8")
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=None,
+        contents=contents,
+        kind=models.Bank.PL_MBANK,
+        account_id="iban-1",
+    )
+
+    # THEN
+    expected = __prepare_expected()
+    result = __drop_empty_columns(result)
+    assert_frame_equal(
+        expected.reset_index(drop=True),
+        result.reset_index(drop=True),
+        check_names=False,
+    )
+
+
+def test_load_pl_mbank_contents_without_header():
+    # WHEN
+    with pytest.raises(ValueError) as ex:
+        pl_mbank.Mbank().load_file_by_contents(b"mBank S.A.;\n2021-01-01;1,00 PLN;\n")
+
+    # THEN
+    assert "#Data operacji" in str(ex.value)
+
+
 def test_load_pl_millenium():
     # GIVEN
     millenium_file = test_data_path + "test_pl_millenium.csv"
@@ -151,9 +187,119 @@ def test_load_pl_millenium():
     assert_frame_equal(expected.reset_index(drop=True), result.reset_index(drop=True))
 
 
+@pytest.mark.parametrize(
+    "kind, file_name",
+    [
+        (models.Bank.PL_ING, "test_pl_ing.csv"),
+        (models.Bank.PL_MBANK, "test_pl_mbank.csv"),
+        (models.Bank.PL_MILLENIUM, "test_pl_millenium.csv"),
+    ],
+)
+def test_load_in_chunks(kind, file_name):
+    # GIVEN
+    progress = []
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=test_data_path + file_name,
+        contents=None,
+        kind=kind,
+        account_id="iban-1",
+        chunksize=4,
+        progress=lambda stage, rows, total: progress.append((stage, rows, total)),
+    )
+
+    # THEN
+    expected = __prepare_expected()
+    result = __drop_empty_columns(result)
+    assert_frame_equal(
+        expected.reset_index(drop=True),
+        result.reset_index(drop=True),
+        check_names=False,
+    )
+    assert ("parsed", 6, None) in progress
+    assert progress[-1] == ("formatted", 6, 6)
+
+
+@pytest.mark.parametrize(
+    "kind, file_name, order",
+    [
+        (models.Bank.PL_ING, "test_pl_ing.csv", models.OperationsOrder.DATE),
+        (models.Bank.PL_MBANK, "test_pl_mbank.csv", models.OperationsOrder.DATE),
+        (
+            models.Bank.PL_MILLENIUM,
+            "test_pl_millenium.csv",
+            models.OperationsOrder.REVERSED,
+        ),
+    ],
+)
+def test_load_chunks_lazily(kind, file_name, order):
+    # GIVEN
+    progress = []
+
+    # WHEN
+    result_order, chunks = importer.load_bank_chunks(
+        file_path=test_data_path + file_name,
+        contents=None,
+        kind=kind,
+        account_id="iban-1",
+        chunksize=4,
+        progress=lambda stage, rows, total: progress.append((stage, rows, total)),
+    )
+
+    # THEN
+    assert result_order is order
+    assert progress == []
+    first_chunk = next(chunks)
+    assert len(first_chunk) == 4
+    assert progress == [("parsed", 4, None), ("formatted", 4, None)]
+    assert [len(chunk) for chunk in chunks] == [2]
+
+
+def test_load_millenium_contents_in_chunks():
+    # GIVEN
+    with open(test_data_path + "test_pl_millenium.csv", "rb") as file:
+        contents = file.read()
+    progress = []
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=None,
+        contents=contents,
+        kind=models.Bank.PL_MILLENIUM,
+        account_id="iban-1",
+        chunksize=2,
+        progress=lambda stage, rows, total: progress.append((stage, rows, total)),
+    )
+
+    # THEN
+    expected = __prepare_expected()
+    result = __drop_empty_columns(result)
+    assert_frame_equal(expected.reset_index(drop=True), result.reset_index(drop=True))
+    assert [rows for stage, rows, _ in progress if stage == "parsed"] == [2, 4, 6]
+
+
+@pytest.mark.parametrize("kind", list(statements.generators))
+def test_synthetic_statements_of_benchmarks_are_imported(kind):
+    # GIVEN
+    contents = statements.generators[kind](100)
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=None, contents=contents, kind=None, account_id="iban-1", chunksize=30
+    )
+
+    # THEN
+    assert len(result) == 100
+    assert result["Operation"].notna().all()
+    assert result["Title"].notna().all()
+    assert result["Date"].is_monotonic_increasing
+
+
 def __prepare_expected():
     result = exp_result
-    result["Account"] = result["Account"].astype("string")
+    result["Account"] = result["Account"].astype("category")
+    result["Currency"] = result["Currency"].astype("category")
     result = __drop_empty_columns(result)
     return result
 
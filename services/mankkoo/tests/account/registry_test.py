@@ -0,0 +1,111 @@
+import pathlib
+
+import pandas as pd
+import pytest
+
+import mankkoo.account.importer.importer as importer
+import mankkoo.account.importer.registry as registry
+import mankkoo.account.models as models
+from mankkoo.account.models import Bank
+
+test_data_path = pathlib.Path(__file__).parent.absolute() / "data"
+
+
+@pytest.fixture
+def unregister_mankkoo_importer():
+    yield
+    registry.unregister(Bank.MANKKOO)
+
+
+@pytest.mark.parametrize(
+    "file_name, bank",
+    [
+        ("test_pl_ing.csv", Bank.PL_ING),
+        ("test_pl_mbank.csv", Bank.PL_MBANK),
+        ("test_pl_millenium.csv", Bank.PL_MILLENIUM),
+    ],
+)
+def test_bank_is_detected_from_the_beginning_of_a_file(file_name, bank):
+    # GIVEN
+    contents = (test_data_path / file_name).read_bytes()
+
+    # WHEN
+    detected = registry.detect(contents)
+
+    # THEN
+    assert detected is bank
+
+
+def test_bank_is_not_detected_for_unknown_file():
+    # WHEN
+    detected = registry.detect(b"Date,Amount\n2021-01-01,100\n")
+
+    # THEN
+    assert detected is None
+
+
+def test_importer_is_a_singleton():
+    # WHEN
+    first = registry.get_importer(Bank.PL_ING)
+    second = registry.get_importer(Bank.PL_ING)
+
+    # THEN
+    assert first is second
+
+
+def test_importer_module_is_not_loaded_until_first_use(unregister_mankkoo_importer):
+    # GIVEN
+    registry.register(Bank.MANKKOO, "mankkoo.account.importer.not_existing:Importer")
+
+    # WHEN
+    spec = registry.get_spec(Bank.MANKKOO)
+
+    # THEN
+    assert spec.streaming is False
+    with pytest.raises(ModuleNotFoundError):
+        registry.get_importer(Bank.MANKKOO)
+
+
+def test_importer_is_registered_with_decorator(unregister_mankkoo_importer):
+    # GIVEN
+    @registry.importer(Bank.MANKKOO, markers=(b"#mankkoo",))
+    class MankkooImporter(models.Importer):
+        def load_file_by_filename(self, file_name, file_format=None):
+            raise NotImplementedError
+
+        def load_file_by_contents(self, contents, file_format=None):
+            return pd.DataFrame({"rows": [1, 2]})
+
+        def format_file(self, df, account_id):
+            return df.assign(Account=account_id)
+
+    progress = []
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=None,
+        contents=b"#mankkoo\n",
+        kind=None,
+        account_id="iban-1",
+        chunksize=1,
+        progress=lambda stage, rows, total: progress.append((stage, rows, total)),
+    )
+
+    # THEN
+    assert isinstance(registry.get_importer(Bank.MANKKOO), MankkooImporter)
+    assert result["Account"].tolist() == ["iban-1", "iban-1"]
+    assert progress == [("parsed", 2, None), ("formatted", 2, 2)]
+
+
+def test_unknown_file_without_bank_is_rejected():
+    # WHEN
+    with pytest.raises(ValueError) as ex:
+        importer.load_bank_data(
+            file_path=None,
+            contents=b"Date,Amount\n2021-01-01,100\n",
+            kind=None,
+            account_id="iban-1",
+        )
+
+    # THEN
+    assert "could not be detected" in str(ex.value)
@@ -0,0 +1,123 @@
+import pathlib
+
+import pytest
+
+import mankkoo.account.importer.importer as importer
+import mankkoo.account.importer.sniffer as sniffer
+from mankkoo.account.models import Bank
+
+test_data_path = pathlib.Path(__file__).parent.absolute() / "data"
+
+
+@pytest.mark.parametrize(
+    "file_name, bank, delimiter",
+    [
+        ("test_pl_ing.csv", Bank.PL_ING, ";"),
+        ("test_pl_mbank.csv", Bank.PL_MBANK, ";"),
+        ("test_pl_millenium.csv", Bank.PL_MILLENIUM, ","),
+    ],
+)
+def test_format_of_bank_export_is_recognized(file_name, bank, delimiter):
+    # GIVEN
+    contents = (test_data_path / file_name).read_bytes()
+
+    # WHEN
+    file_format = sniffer.sniff(contents)
+
+    # THEN
+    assert file_format == sniffer.FileFormat(bank, "utf-8", delimiter)
+
+
+def test_windows_1250_encoding_is_recognized():
+    # GIVEN
+    contents = (test_data_path / "test_pl_ing.csv").read_text(encoding="utf-8")
+    contents = contents.encode("windows-1250", errors="replace")
+
+    # WHEN
+    file_format = sniffer.sniff(contents)
+
+    # THEN
+    assert file_format == sniffer.FileFormat(Bank.PL_ING, "windows-1250", ";")
+
+
+def test_utf8_character_cut_at_the_end_of_sniffed_bytes_is_not_treated_as_windows_1250():
+    # GIVEN
+    contents = b"a" * (sniffer.registry.sniff_size - 1) + "ż".encode("utf-8")
+
+    # WHEN
+    encoding = sniffer.detect_encoding(contents)
+
+    # THEN
+    assert encoding == "utf-8"
+
+
+def test_unknown_file_has_no_bank_nor_delimiter():
+    # WHEN
+    file_format = sniffer.sniff(b"Lorem ipsum dolor sit amet")
+
+    # THEN
+    assert file_format == sniffer.FileFormat(None, "utf-8", None)
+
+
+def test_export_of_another_bank_is_rejected_before_parsing(mocker):
+    # GIVEN
+    contents = (test_data_path / "test_pl_ing.csv").read_bytes()
+    get_importer = mocker.spy(sniffer.registry, "get_importer")
+
+    # WHEN
+    with pytest.raises(ValueError) as ex:
+        importer.load_bank_data(
+            file_path=None,
+            contents=contents,
+            kind=Bank.PL_MILLENIUM,
+            account_id="iban-1",
+        )
+
+    # THEN
+    assert "It is not a PL_MILLENIUM export" in str(ex.value)
+    assert "It looks like a PL_ING export" in str(ex.value)
+    get_importer.assert_not_called()
+
+
+def test_windows_1250_ing_export_is_imported():
+    # GIVEN
+    text = (test_data_path / "test_pl_ing.csv").read_text(encoding="utf-8")
+    contents = text.replace("�", "ł").encode("windows-1250")
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=None,
+        contents=contents,
+        kind=None,
+        account_id="iban-1",
+        chunksize=2,
+    )
+
+    # THEN
+    assert len(result) == 6
+    assert result["Title"].iloc[0] == "Jane Doe - Init money"
+
+
+def test_export_is_parsed_with_a_detected_delimiter(mocker):
+    # GIVEN
+    text = (test_data_path / "test_pl_millenium.csv").read_text(encoding="utf-8")
+    contents = text.replace('","', '";"').encode("utf-8")
+    load_chunks = mocker.spy(
+        sniffer.registry.get_importer(Bank.PL_MILLENIUM), "load_chunks_by_contents"
+    )
+
+    # WHEN
+    result = importer.load_bank_data(
+        file_path=None,
+        contents=contents,
+        kind=Bank.PL_MILLENIUM,
+        account_id="iban-1",
+        chunksize=4,
+    )
+
+    # THEN
+    assert load_chunks.call_args.args[2] == sniffer.FileFormat(
+        Bank.PL_MILLENIUM, "utf-8", ";"
+    )
+    assert len(result) == 6
+    assert result["Title"].iloc[0] == "Jane Doe - Init money"
@@ -9,6 +9,8 @@ from testcontainers.postgres import PostgresContainer
 
 import mankkoo.database as db
 import mankkoo.event_store as es
+import mankkoo.schema as schema
+import mankkoo.views as views
 from mankkoo.app import create_app
 from mankkoo.config import TestConfig
 
@@ -39,7 +41,7 @@ def setup(request):
     else:
         print("Using local PostgreSQL instance for tests...")
         os.environ["DB_NAME"] = "test"
-    db.init_db()
+    schema.migrate()
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -48,7 +50,10 @@ def setup_data():
     for attempt in range(max_retries):
         try:
             print("Cleaning database...")
-            db.execute("TRUNCATE events, streams, views;")
+            db.execute(
+                "TRUNCATE events, streams, views, stream_daily_balance, stream_current_state, operation_fingerprints;"
+            )
+            views.invalidate_cache()
             break
         except psycopg2.errors.DeadlockDetected:
             if attempt < max_retries - 1:
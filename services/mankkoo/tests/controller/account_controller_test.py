@@ -1,7 +1,12 @@
+import io
+import pathlib
 import uuid
 from datetime import datetime, timedelta, timezone
 
+import mankkoo.data_for_test as td
 import mankkoo.event_store as es
+from mankkoo.account import import_jobs
+from mankkoo.account.models import Bank
 
 
 def test_all_accounts_are_loaded(test_client):
@@ -127,3 +132,76 @@ def test_all_account_operations_are_laoded__if_valid_account_id_is_provided(
 
     payload = response.get_json()
     assert len(payload) == len(account_with_two_operations)
+
+
+def test_operations_import_is_submitted_as_a_job_and_its_progress_is_reported(
+    test_client, mocker
+):
+    # GIVEN
+    account_stream = td.any_account_stream()
+    es.create([account_stream])
+    mocker.patch(
+        "mankkoo.account.account_db.get_bank_type", return_value=Bank.PL_MILLENIUM
+    )
+    contents = (
+        pathlib.Path(__file__).parent.parent / "account/data/test_pl_millenium.csv"
+    ).read_bytes()
+
+    # WHEN
+    response = test_client.post(
+        f"/api/accounts/{account_stream.id}/operations/import",
+        data={"operations": (io.BytesIO(contents), "test_pl_millenium.csv")},
+        content_type="multipart/form-data",
+    )
+
+    # THEN
+    assert response.status_code == 202
+    job_id = response.get_json()["jobId"]
+    import_jobs.get_import_jobs().wait(job_id, timeout=30)
+
+    response = test_client.get(f"/api/accounts/imports/{job_id}")
+    assert response.status_code == 200
+
+    payload = response.get_json()
+    assert payload["status"] == "succeeded"
+    assert payload["accountId"] == str(account_stream.id)
+    assert payload["fileName"] == "test_pl_millenium.csv"
+    assert payload["rowsParsed"] == 6
+    assert payload["rowsStored"] == 6
+    assert payload["rowsTotal"] == 6
+    assert set(payload["stages"]) == {
+        "parsed",
+        "formatted",
+        "deduplicated",
+        "prepared",
+        "stored",
+    }
+    assert payload["error"] is None
+
+
+def test_failed_import_job_reports_an_error(test_client):
+    # GIVEN
+    not_existing_account_id = uuid.uuid4()
+
+    # WHEN
+    response = test_client.post(
+        f"/api/accounts/{not_existing_account_id}/operations/import",
+        data={"operations": (io.BytesIO(b"not a statement"), "statement.csv")},
+        content_type="multipart/form-data",
+    )
+    job_id = response.get_json()["jobId"]
+    import_jobs.get_import_jobs().wait(job_id, timeout=30)
+
+    # THEN
+    payload = test_client.get(f"/api/accounts/imports/{job_id}").get_json()
+    assert payload["status"] == "failed"
+    assert str(not_existing_account_id) in payload["error"]
+    assert payload["rowsStored"] == 0
+
+
+def test_status_of_unknown_import_job_is_not_found(test_client):
+    # WHEN
+    response = test_client.get(f"/api/accounts/imports/{uuid.uuid4()}")
+
+    # THEN
+    assert response.status_code == 404
@@ -33,3 +33,56 @@ def test_specific_view_is_loaded(test_client):
     payload = response.get_json()
     assert payload is not None
     assert isinstance(payload, dict)
+
+
+def test_db_pool_stats_are_returned(test_client):
+    # WHEN
+    response = test_client.get("/api/admin/db-pool")
+
+    # THEN
+    assert response.status_code == 200
+
+    payload = response.get_json()
+    assert payload["maxSize"] >= 1
+    assert payload["checkouts"] > 0
+    assert 0 <= payload["saturation"] <= 1
+
+
+def test_last_views_refresh_timings_are_returned(test_client):
+    # GIVEN
+    views.update_views(None)
+
+    # WHEN
+    response = test_client.get("/api/admin/views-refresh")
+
+    # THEN
+    assert response.status_code == 200
+
+    payload = response.get_json()
+    assert payload["durationMs"] >= 0
+    assert payload["errors"] == {}
+    assert set(payload["views"]) == {
+        views.main_indicators_key,
+        views.current_savings_distribution_key,
+        views.total_history_per_day_key,
+        views.investment_indicators_key,
+        views.investment_types_distribution_key,
+        views.investment_wallets_distribution_key,
+        views.investment_types_distribution_per_wallet_key,
+        views.monthly_income_key,
+    }
+    assert set(payload["inputs"]) == {"current-total-savings", "monthly-income"}
+
+
+def test_views_refresh_scheduler_status_is_returned(test_client):
+    # WHEN
+    response = test_client.get("/api/admin/views-refresh/scheduler")
+
+    # THEN
+    assert response.status_code == 200
+
+    payload = response.get_json()
+    assert payload["quietPeriodMs"] >= 0
+    assert payload["maxDelayMs"] >= payload["quietPeriodMs"]
+    assert "pending" in payload
+    assert "running" in payload
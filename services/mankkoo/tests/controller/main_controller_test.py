@@ -1,3 +1,4 @@
+import gzip
 import json
 
 import mankkoo.database as db
@@ -61,6 +62,62 @@ def test_total_history(test_client):
     assert view == res_body
 
 
+def test_unchanged_view_is_not_sent_again(test_client):
+    # GIVEN
+    view = {"date": ["2021-01-01"], "total": [1123.34]}
+    insert_view(views.total_history_per_day_key, view)
+    first_response = test_client.get("/api/main/total-history")
+    etag = first_response.headers["ETag"]
+
+    # WHEN
+    response = test_client.get(
+        "/api/main/total-history", headers={"If-None-Match": etag}
+    )
+
+    # THEN
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_changed_view_is_sent_with_new_etag(test_client):
+    # GIVEN
+    insert_view(views.total_history_per_day_key, {"date": [], "total": []})
+    etag = test_client.get("/api/main/total-history").headers["ETag"]
+
+    # WHEN
+    view = {"date": ["2021-01-01"], "total": [1123.34]}
+    insert_view(views.total_history_per_day_key, view)
+    views.invalidate_cache(views.total_history_per_day_key)
+    response = test_client.get(
+        "/api/main/total-history", headers={"If-None-Match": etag}
+    )
+
+    # THEN
+    assert response.status_code == 200
+    assert response.get_json() == view
+    assert response.headers["ETag"] != etag
+
+
+def test_view_is_sent_as_stored_gzipped_payload(test_client, monkeypatch):
+    # GIVEN
+    monkeypatch.setenv("VIEWS_PAYLOAD_GZIP_MIN_SIZE", "0")
+    views.update_views(None)
+
+    # WHEN
+    response = test_client.get(
+        "/api/main/total-history", headers={"Accept-Encoding": "gzip"}
+    )
+
+    # THEN
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert json.loads(gzip.decompress(response.data)) == views.load_view(
+        views.total_history_per_day_key
+    )
+
+
 def insert_view(name: str, content: dict | list):
     # not sure why this is needed since before each test db is cleaned up
     db.execute("TRUNCATE views;")
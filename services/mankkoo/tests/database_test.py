@@ -0,0 +1,139 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import mankkoo.database as db
+
+
+def __new_pool(**kwargs) -> db.ConnectionPool:
+    return db.ConnectionPool(db.connection_params(), **kwargs)
+
+
+def test_connection_is_reused_after_it_was_returned_to_the_pool():
+    # GIVEN
+    pool = __new_pool(min_size=0, max_size=2)
+
+    # WHEN
+    with pool.getconn() as conn:
+        first_backend_pid = conn.get_backend_pid()
+    with pool.getconn() as conn:
+        second_backend_pid = conn.get_backend_pid()
+
+    # THEN
+    assert first_backend_pid == second_backend_pid
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["connectionsCreated"] == 1
+    assert stats["inUse"] == 0
+    pool.close()
+
+
+def test_pooled_connection_commits_and_returns_to_pool_on_exit():
+    # GIVEN
+    pool = __new_pool(min_size=1, max_size=1)
+
+    # WHEN
+    with pool.getconn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            (result,) = cur.fetchone()
+
+    # THEN
+    assert result == 1
+    assert pool.stats()["idle"] == 1
+    pool.close()
+
+
+def test_attributes_set_on_pooled_connection_are_set_on_the_connection():
+    # GIVEN
+    pool = __new_pool(min_size=1, max_size=1)
+
+    # WHEN
+    with pool.getconn() as conn:
+        conn.autocommit = True
+        raw_autocommit = conn.raw.autocommit
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            transaction_status = conn.get_transaction_status()
+
+    # THEN
+    assert raw_autocommit is True
+    assert "autocommit" not in vars(conn)
+    assert transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    with pool.getconn() as conn:
+        assert conn.autocommit is False
+    pool.close()
+
+
+def test_checkout_waits_for_a_connection_when_pool_is_saturated():
+    # GIVEN
+    pool = __new_pool(min_size=0, max_size=1, timeout=5)
+    conn = pool.getconn()
+
+    def release_later():
+        time.sleep(0.2)
+        conn.close()
+
+    threading.Thread(target=release_later).start()
+
+    # WHEN
+    with pool.getconn():
+        stats = pool.stats()
+
+    # THEN
+    assert stats["waits"] == 1
+    assert stats["saturation"] == 1.0
+    assert stats["waitTimeMaxMs"] >= 100
+    pool.close()
+
+
+def test_checkout_fails_when_no_connection_is_released_in_time():
+    # GIVEN
+    pool = __new_pool(min_size=0, max_size=1, timeout=0.1)
+    conn = pool.getconn()
+
+    # WHEN
+    with pytest.raises(db.PoolTimeoutError):
+        pool.getconn()
+
+    # THEN
+    assert pool.stats()["timeouts"] == 1
+    conn.close()
+    pool.close()
+
+
+def test_connection_is_replaced_after_its_max_lifetime():
+    # GIVEN
+    pool = __new_pool(min_size=0, max_size=1, max_lifetime=0)
+
+    # WHEN
+    with pool.getconn() as conn:
+        first_backend_pid = conn.get_backend_pid()
+    with pool.getconn() as conn:
+        second_backend_pid = conn.get_backend_pid()
+
+    # THEN
+    assert first_backend_pid != second_backend_pid
+    assert pool.stats()["connectionsCreated"] == 2
+    pool.close()
+
+
+def test_broken_connection_is_replaced_on_checkout():
+    # GIVEN
+    pool = __new_pool(min_size=1, max_size=1, health_check_after=0)
+    with pool.getconn() as conn:
+        backend_pid = conn.get_backend_pid()
+    db.execute("SELECT pg_terminate_backend(%s)", (backend_pid,))
+
+    # WHEN
+    with pool.getconn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            (result,) = cur.fetchone()
+
+    # THEN
+    assert result == 1
+    assert pool.stats()["connectionsDiscarded"] == 1
+    pool.close()
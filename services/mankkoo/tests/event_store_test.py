@@ -1,6 +1,9 @@
+import json
+import select
 import uuid
 from datetime import datetime, timedelta, timezone
 
+import psycopg2
 import pytest
 
 import mankkoo.database as db
@@ -149,6 +152,127 @@ def test_event_is_not_stored_if_it_skips_couple_versions():
     assert len(saved_events) == 1
 
 
+def test_events_for_multiple_streams_are_stored_in_a_single_batch():
+    # given
+    other_stream_id = uuid.uuid4()
+    events = [
+        initEvent,
+        es.Event(
+            stream_type,
+            other_stream_id,
+            "AccountOpened",
+            accountOpenedData,
+            occured_at,
+            1,
+        ),
+        es.Event(
+            stream_type,
+            stream_id,
+            "MoneyDeposited",
+            moneyDepositedData,
+            occured_at + timedelta(days=1),
+            2,
+        ),
+    ]
+
+    # when
+    es.store(events)
+
+    # then
+    saved_events = __load_events(stream_id)
+    assert [event.version for event in saved_events] == [1, 2]
+    assert saved_events[1] == events[2]
+    assert es.get_stream_by_id(str(stream_id)).version == 2
+
+    other_saved_events = __load_events(other_stream_id)
+    assert other_saved_events == [events[1]]
+    assert es.get_stream_by_id(str(other_stream_id)).version == 1
+
+
+def test_batch_is_not_stored_if_one_of_events_has_invalid_version():
+    # given
+    es.store([initEvent])
+
+    # when
+    with pytest.raises(Exception):
+        es.store(
+            [
+                es.Event(
+                    stream_type,
+                    stream_id,
+                    "MoneyDeposited",
+                    moneyDepositedData,
+                    occured_at + timedelta(days=1),
+                    2,
+                ),
+                es.Event(
+                    stream_type,
+                    stream_id,
+                    "MoneyWithdrawn",
+                    moneyWithdrawnData,
+                    occured_at + timedelta(days=2),
+                    4,
+                ),
+            ]
+        )
+
+    # then
+    saved_events = __load_events(stream_id)
+    assert len(saved_events) == 1
+    assert es.get_stream_by_id(str(stream_id)).version == 1
+
+
+def test_notification_carries_date_range_and_ids_of_affected_streams():
+    # given
+    other_stream_id = uuid.uuid4()
+    listener = db.create_connection()
+    listener.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with listener.cursor() as cur:
+        cur.execute("LISTEN events_added;")
+
+    # when
+    es.store(
+        [
+            initEvent,
+            es.Event(
+                stream_type,
+                stream_id,
+                "MoneyDeposited",
+                moneyDepositedData,
+                occured_at + timedelta(days=3),
+                2,
+            ),
+            es.Event(
+                stream_type,
+                other_stream_id,
+                "AccountOpened",
+                accountOpenedData,
+                occured_at + timedelta(days=1),
+                1,
+            ),
+        ]
+    )
+
+    # then
+    payloads = []
+    while len(payloads) < 2 and select.select([listener], [], [], 5) != ([], [], []):
+        listener.poll()
+        payloads += [json.loads(notify.payload) for notify in listener.notifies]
+        listener.notifies.clear()
+    listener.close()
+
+    payload_per_stream = {payload["streamIds"][0]: payload for payload in payloads}
+    assert set(payload_per_stream) == {str(stream_id), str(other_stream_id)}
+    assert all(len(payload["streamIds"]) == 1 for payload in payloads)
+
+    payload = payload_per_stream[str(stream_id)]
+    assert payload["minOccuredAt"][:10] == occured_at.date().isoformat()
+    assert (
+        payload["maxOccuredAt"][:10]
+        == (occured_at + timedelta(days=3)).date().isoformat()
+    )
+
+
 def test_load_events():
     # given
     events = [
@@ -181,6 +305,49 @@ def test_load_events():
     assert events[0] == saved_events[0]
 
 
+def test_load_stream_states_folds_events_in_the_database():
+    # given
+    etf_id = uuid.uuid4()
+    empty_id = uuid.uuid4()
+    es.store(
+        [
+            es.Event(
+                "investment",
+                etf_id,
+                "ETFBought",
+                {"units": 10, "balance": 1000, "pricePerUnit": 100},
+                occured_at,
+                1,
+            ),
+            es.Event(
+                "investment",
+                etf_id,
+                "ETFPriced",
+                {"balance": "1 200,50", "pricePerUnit": 120.05},
+                occured_at + timedelta(days=1),
+                2,
+            ),
+            es.Event(
+                "investment",
+                etf_id,
+                "ETFSold",
+                {"units": -4, "balance": 720.3},
+                occured_at + timedelta(days=2),
+                3,
+            ),
+        ]
+    )
+
+    # when
+    states = es.load_stream_states([etf_id, str(empty_id)])
+
+    # then
+    assert states[etf_id] == es.StreamState(
+        etf_id, 3, 6.0, 720.3, 120.05, occured_at + timedelta(days=2)
+    )
+    assert states[empty_id] == es.StreamState(empty_id)
+
+
 def test_udpate_streams_empty_metadata():
     # given
     es.store([initEvent])
@@ -162,6 +162,8 @@ def test_gold_stream_with_gold_priced_shows_revalued_balance():
     assert len(result) == 1
     gold = result[0]
     assert gold["balance"] == 9330.0
+    assert gold["units"] == 31.1
+    assert gold["pricePerUnit"] == 300.0
 
 
 def test_gold_stream_with_all_sold_shows_zero_balance():
@@ -327,3 +327,45 @@ def test_create_treasury_bonds_priced_event_sets_price_per_unit():
     assert events[1].event_type == "TreasuryBondsPriced"
     assert events[1].data["pricePerUnit"] == 150.0
     assert events[1].data["balance"] == 1500.0
+
+
+def test_treasury_bonds_units_are_not_counted_twice_after_price_update():
+    stream = es.Stream(
+        id=uuid.uuid4(),
+        type="investment",
+        subtype="treasury_bonds",
+        name="10-year Bonds",
+        bank="Bank 1",
+        active=True,
+        version=0,
+        metadata={},
+        labels={"wallet": "Personal"},
+    )
+    es.create([stream])
+
+    for entry in [
+        {"eventType": "buy", "units": 10.0, "totalValue": 1000.0},
+        {"eventType": "price_update", "totalValue": 1500.0},
+        {"eventType": "sell", "units": 4.0, "totalValue": 600.0},
+    ]:
+        _, status = investment.create_investment_event_entry(
+            {"streamId": str(stream.id), "occuredAt": "2026-03-01", **entry}
+        )
+        assert status == 201
+
+    payload, status = investment.create_investment_event_entry(
+        {
+            "streamId": str(stream.id),
+            "eventType": "sell",
+            "occuredAt": "2026-03-02",
+            "units": 7.0,
+            "totalValue": 1050.0,
+        }
+    )
+
+    assert status == 400
+    assert payload["details"] == "Cannot sell more units than currently owned"
+    state = es.load_stream_state(stream.id)
+    assert state.units == 6.0
+    assert state.balance == 900.0
+    assert state.price == 150.0
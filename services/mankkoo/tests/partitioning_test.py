@@ -0,0 +1,227 @@
+import os
+import uuid
+from datetime import datetime, timezone
+
+import psycopg2
+import pytest
+
+import mankkoo.database as db
+import mankkoo.event_store as es
+import mankkoo.partitioning as partitioning
+import mankkoo.schema as schema
+
+database_name = "test_partitioning"
+
+
+@pytest.fixture
+def database():
+    """A separate database, so that partitioning doesn't affect other tests."""
+    previous_name = os.environ.get("DB_NAME")
+    __recreate_database(database_name)
+    os.environ["DB_NAME"] = database_name
+    schema.migrate()
+    yield
+    db.close_pool()
+    os.environ["DB_NAME"] = previous_name
+    __drop_database(database_name)
+
+
+def __admin_connection():
+    conn = psycopg2.connect(**{**db.connection_params(), "database": "postgres"})
+    conn.autocommit = True
+    return conn
+
+
+def __recreate_database(name: str) -> None:
+    __drop_database(name)
+    conn = __admin_connection()
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE {name} ENCODING 'UTF8' TEMPLATE template0;")
+    conn.close()
+
+
+def __drop_database(name: str) -> None:
+    conn = __admin_connection()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE);")
+    conn.close()
+
+
+def __account_with_events(dates: list[datetime]) -> uuid.UUID:
+    stream_id = uuid.uuid4()
+    es.create(
+        [es.Stream(stream_id, "account", "checking", "Account", "Bank", True, 0, {})]
+    )
+    es.store(
+        [
+            es.Event(
+                "account",
+                stream_id,
+                "MoneyDeposited",
+                {"amount": 10, "balance": 10 * (i + 1), "title": f"Operation {i}"},
+                occured_at,
+                i + 1,
+            )
+            for i, occured_at in enumerate(dates)
+        ]
+    )
+    return stream_id
+
+
+def __query(sql: str, params=None) -> list[tuple]:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+
+def test_existing_events_are_moved_to_partitions_without_updating_projections(
+    database,
+):
+    # GIVEN
+    stream_id = __account_with_events(
+        [
+            datetime(2021, 3, 1, tzinfo=timezone.utc),
+            datetime(2023, 7, 1, tzinfo=timezone.utc),
+        ]
+    )
+    state_before = __query("SELECT * FROM stream_current_state;")
+    fingerprints_before = __query("SELECT count(*) FROM operation_fingerprints;")
+
+    # WHEN
+    created = partitioning.partition_events("year", ahead=1)
+
+    # THEN
+    current_year = datetime.now(timezone.utc).year
+    assert created == [f"events_y{year}" for year in range(2021, current_year + 2)]
+    assert partitioning.is_partitioned()
+    assert __query("SELECT tableoid::regclass::text FROM events ORDER BY version;") == [
+        ("events_y2021",),
+        ("events_y2023",),
+    ]
+    assert [event.version for event in es.load(stream_id)] == [1, 2]
+    assert __query("SELECT * FROM stream_current_state;") == state_before
+    assert (
+        __query("SELECT count(*) FROM operation_fingerprints;") == fingerprints_before
+    )
+
+
+def test_projections_are_maintained_after_events_are_partitioned(database):
+    # GIVEN
+    stream_id = __account_with_events([datetime(2022, 1, 10, tzinfo=timezone.utc)])
+    partitioning.partition_events("month", ahead=1)
+
+    # WHEN
+    es.store(
+        [
+            es.Event(
+                "account",
+                stream_id,
+                "MoneyDeposited",
+                {"amount": 5, "balance": 15, "title": "Next operation"},
+                datetime(2022, 1, 20, tzinfo=timezone.utc),
+                2,
+            )
+        ]
+    )
+
+    # THEN
+    assert __query(
+        "SELECT version, balance FROM stream_current_state WHERE stream_id = %s;",
+        (str(stream_id),),
+    ) == [(2, 15)]
+    assert __query(
+        "SELECT count(*) FROM stream_daily_balance WHERE stream_id = %s;",
+        (str(stream_id),),
+    ) == [(2,)]
+
+
+@pytest.mark.parametrize(
+    "duplicate",
+    [
+        "(gen_random_uuid(), %(stream_id)s, 'MoneyDeposited', '{}', 1, '2023-07-01')",
+        "(%(event_id)s, %(stream_id)s, 'MoneyDeposited', '{}', 2, '2023-07-01')",
+    ],
+    ids=["version", "id"],
+)
+def test_events_keys_are_unique_across_partitions(database, duplicate):
+    # GIVEN
+    stream_id = __account_with_events([datetime(2021, 3, 1, tzinfo=timezone.utc)])
+    partitioning.partition_events("year", ahead=0)
+    (event_id,) = __query(
+        "SELECT id FROM events WHERE stream_id = %s;", (str(stream_id),)
+    )[0]
+
+    # WHEN
+    with pytest.raises(psycopg2.errors.UniqueViolation):
+        db.execute(
+            "INSERT INTO events (id, stream_id, type, data, version, occured_at) VALUES "
+            + duplicate,
+            {"stream_id": str(stream_id), "event_id": event_id},
+        )
+
+    # THEN
+    assert [event.version for event in es.load(stream_id)] == [1]
+
+
+def test_events_outside_of_partitions_are_moved_out_of_the_default_partition(
+    database,
+):
+    # GIVEN
+    partitioning.partition_events("year", ahead=1)
+    stream_id = __account_with_events([datetime(2010, 5, 1, tzinfo=timezone.utc)])
+    assert __query("SELECT count(*) FROM events_default;") == [(1,)]
+
+    # WHEN
+    created = partitioning.ensure_partitions(ahead=1)
+
+    # THEN
+    assert created == ["events_y2010"]
+    assert __query("SELECT count(*) FROM events_default;") == [(0,)]
+    assert __query("SELECT tableoid::regclass::text FROM events;") == [
+        ("events_y2010",)
+    ]
+    assert [event.version for event in es.load(stream_id)] == [1]
+    assert partitioning.ensure_partitions(ahead=1) == []
+
+
+def test_date_bounded_queries_scan_only_matching_partitions(database):
+    # GIVEN
+    __account_with_events([datetime(2020, 1, 1, tzinfo=timezone.utc) for _ in range(3)])
+    partitioning.partition_events("month", ahead=0)
+
+    # WHEN
+    plan = __query("""
+        EXPLAIN (FORMAT JSON)
+        SELECT count(*) FROM events
+        WHERE occured_at >= '2023-06-01' AND occured_at < '2023-06-15';
+        """)[0][0]
+
+    # THEN
+    scanned = set(__relations(plan[0]["Plan"]))
+    assert scanned == {"events_m2023_06"}
+
+
+def test_events_table_is_partitioned_only_once(database):
+    # GIVEN
+    partitioning.partition_events("year", ahead=0)
+
+    # WHEN
+    with pytest.raises(ValueError, match="already partitioned"):
+        partitioning.partition_events("month")
+
+
+def test_partitions_are_not_created_for_not_partitioned_events_table():
+    # WHEN
+    created = partitioning.ensure_partitions()
+
+    # THEN
+    assert created == []
+    assert partitioning.partitions() == []
+
+
+def __relations(plan: dict):
+    if "Relation Name" in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from __relations(child)
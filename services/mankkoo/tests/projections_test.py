@@ -0,0 +1,304 @@
+import uuid
+from datetime import datetime
+
+import mankkoo.data_for_test as dt
+import mankkoo.database as db
+import mankkoo.event_store as es
+import mankkoo.projections as projections
+
+
+def test_daily_balance_is_maintained_when_events_are_appended():
+    # GIVEN
+    account = dt.an_account_with_operations(
+        [
+            {"date": "02-01-2021", "operation": 1000},
+            {"date": "02-01-2021", "operation": -200},
+            {"date": "05-01-2021", "operation": 50.5},
+        ]
+    )
+    es.create([account["stream"]])
+
+    # WHEN
+    es.store(account["events"])
+
+    # THEN
+    assert __load_daily_balance(account["stream"].id) == [
+        ("2021-01-01", 0, 1),
+        ("2021-01-02", 800, 3),
+        ("2021-01-05", 850.5, 4),
+    ]
+
+
+def test_daily_balance_is_rebuilt_from_events():
+    # GIVEN
+    account = dt.an_account_with_operations(
+        [
+            {"date": "02-01-2021", "operation": 1000},
+            {"date": "03-01-2021", "operation": -200},
+        ]
+    )
+    es.create([account["stream"]])
+    es.store(account["events"])
+    maintained = __load_daily_balance(account["stream"].id)
+    db.execute("TRUNCATE stream_daily_balance;")
+
+    # WHEN
+    projections.rebuild_stream_daily_balance()
+
+    # THEN
+    assert __load_daily_balance(account["stream"].id) == maintained
+
+
+def __savings_deposit(stream_id, balance: float, day: int, version: int) -> es.Event:
+    return es.Event(
+        "account",
+        stream_id,
+        "MoneyDeposited",
+        {"amount": 10, "balance": balance},
+        datetime(2021, 1, day),
+        version,
+    )
+
+
+def test_back_dated_event_updates_balances_of_later_days():
+    # GIVEN
+    stream_id = uuid.uuid4()
+    es.store(
+        [
+            __savings_deposit(stream_id, 100, day=1, version=1),
+            __savings_deposit(stream_id, 150, day=5, version=2),
+        ]
+    )
+
+    # WHEN
+    es.store([__savings_deposit(stream_id, 160, day=3, version=3)])
+
+    # THEN
+    maintained = __load_daily_balance(stream_id)
+    assert maintained == [
+        ("2021-01-01", 100, 1),
+        ("2021-01-03", 160, 3),
+        ("2021-01-05", 160, 3),
+    ]
+    db.execute("TRUNCATE stream_daily_balance;")
+    projections.rebuild_stream_daily_balance(stream_id)
+    assert __load_daily_balance(stream_id) == maintained
+
+
+def test_daily_balance_accepts_legacy_text_balances():
+    # GIVEN
+    stream_id = uuid.uuid4()
+    event = es.Event(
+        "stocks",
+        stream_id,
+        "ETFBought",
+        {"balance": "1 234,56", "units": "2"},
+        datetime(2021, 1, 2),
+    )
+
+    # WHEN
+    es.store([event])
+
+    # THEN
+    assert __load_daily_balance(stream_id) == [("2021-01-02", 1234.56, 1)]
+
+
+def test_current_state_is_maintained_when_events_are_appended():
+    # GIVEN
+    stock = dt.stock_events(
+        [
+            {"date": "02-01-2021", "operation": 100},
+            {"date": "05-01-2021", "operation": 50},
+        ]
+    )
+    es.create([stock["stream"]])
+
+    # WHEN
+    es.store(stock["events"][:1])
+    es.store(stock["events"][1:])
+
+    # THEN
+    assert __load_current_state(stock["stream"].id) == (
+        2,
+        150.0,
+        4.0,
+        "PLN",
+        "2021-01-05",
+    )
+
+
+def __investment_event(stream_id, event_type: str, data: dict, version: int):
+    return es.Event(
+        "investment", stream_id, event_type, data, datetime(2021, 1, version), version
+    )
+
+
+def test_current_state_counts_weight_and_skips_units_of_priced_events():
+    # GIVEN
+    bonds_id, gold_id = uuid.uuid4(), uuid.uuid4()
+    events = [
+        __investment_event(
+            bonds_id, "TreasuryBondsBought", {"units": 2, "balance": 200}, 1
+        ),
+        __investment_event(
+            bonds_id, "TreasuryBondsBought", {"units": 3, "balance": 500}, 2
+        ),
+        __investment_event(
+            bonds_id, "TreasuryBondsPriced", {"units": 5, "balance": 510}, 3
+        ),
+        __investment_event(gold_id, "GoldBought", {"weight": 31.1, "balance": 900}, 1),
+        __investment_event(gold_id, "GoldPriced", {"weight": 31.1, "balance": 950}, 2),
+    ]
+
+    # WHEN
+    es.store(events)
+
+    # THEN
+    maintained = [__load_current_state(bonds_id)[2], __load_current_state(gold_id)[2]]
+    assert maintained == [5.0, 31.1]
+    db.execute("TRUNCATE stream_current_state;")
+    projections.rebuild_stream_current_state()
+    assert [
+        __load_current_state(bonds_id)[2],
+        __load_current_state(gold_id)[2],
+    ] == maintained
+
+
+def test_current_state_keeps_the_latest_price_of_a_stream():
+    # GIVEN
+    bonds_id = uuid.uuid4()
+    es.store(
+        [
+            __investment_event(
+                bonds_id, "TreasuryBondsBought", {"units": 2, "pricePerUnit": 100}, 1
+            ),
+            __investment_event(
+                bonds_id, "TreasuryBondsPriced", {"units": 2, "unitPrice": 101.5}, 2
+            ),
+        ]
+    )
+
+    # WHEN
+    es.store(
+        [__investment_event(bonds_id, "TreasuryBondsInterest", {"balance": 203}, 3)]
+    )
+
+    # THEN
+    assert __load_price(bonds_id) == 101.5
+    db.execute("TRUNCATE stream_current_state;")
+    projections.rebuild_stream_current_state(bonds_id)
+    assert __load_price(bonds_id) == 101.5
+
+
+def test_current_state_is_rebuilt_from_events():
+    # GIVEN
+    account = dt.an_account_with_operations(
+        [
+            {"date": "02-01-2021", "operation": 1000},
+            {"date": "03-01-2021", "operation": -200},
+        ]
+    )
+    es.create([account["stream"]])
+    es.store(account["events"])
+    maintained = __load_current_state(account["stream"].id)
+    db.execute("TRUNCATE stream_current_state;")
+
+    # WHEN
+    projections.rebuild_stream_current_state()
+
+    # THEN
+    assert __load_current_state(account["stream"].id) == maintained
+    assert maintained == (3, 800.0, 0.0, "PLN", "2021-01-03")
+
+
+def test_identical_operations_get_consecutive_fingerprints():
+    # GIVEN
+    account = dt.an_account_with_operations(
+        [
+            {"date": "02-01-2021", "operation": -5},
+            {"date": "02-01-2021", "operation": -5},
+            {"date": "03-01-2021", "operation": -5},
+        ]
+    )
+    es.create([account["stream"]])
+
+    # WHEN
+    es.store(account["events"])
+
+    # THEN
+    fingerprints = __load_fingerprints(account["stream"].id)
+    assert [
+        (day, amount, occurrence) for day, amount, _, occurrence in fingerprints
+    ] == [
+        ("2021-01-02", -500, 0),
+        ("2021-01-02", -500, 1),
+        ("2021-01-03", -500, 0),
+    ]
+
+
+def test_operation_fingerprints_are_rebuilt_from_events():
+    # GIVEN
+    account = dt.an_account_with_operations(
+        [
+            {"date": "02-01-2021", "operation": 1000},
+            {"date": "02-01-2021", "operation": 1000},
+            {"date": "03-01-2021", "operation": -200},
+        ]
+    )
+    es.create([account["stream"]])
+    es.store(account["events"])
+    maintained = __load_fingerprints(account["stream"].id)
+    db.execute("TRUNCATE operation_fingerprints;")
+
+    # WHEN
+    projections.rebuild_operation_fingerprints()
+
+    # THEN
+    assert __load_fingerprints(account["stream"].id) == maintained
+    assert len(maintained) == 3
+
+
+def __load_fingerprints(stream_id: uuid.UUID) -> list[tuple]:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT day, amount, title, occurrence FROM operation_fingerprints WHERE stream_id = %s ORDER BY day, occurrence",
+                (str(stream_id),),
+            )
+            rows = cur.fetchall()
+    return [(row[0].strftime("%Y-%m-%d"), row[1], row[2], row[3]) for row in rows]
+
+
+def __load_price(stream_id: uuid.UUID) -> float | None:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT price FROM stream_current_state WHERE stream_id = %s",
+                (str(stream_id),),
+            )
+            (price,) = cur.fetchone()
+    return None if price is None else float(price)
+
+
+def __load_current_state(stream_id: uuid.UUID) -> tuple | None:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT version, balance, units, currency, last_occured_at FROM stream_current_state WHERE stream_id = %s",
+                (str(stream_id),),
+            )
+            row = cur.fetchone()
+    if row is None:
+        return None
+    return (row[0], float(row[1]), float(row[2]), row[3], row[4].strftime("%Y-%m-%d"))
+
+
+def __load_daily_balance(stream_id: uuid.UUID) -> list[tuple]:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT day, balance, version FROM stream_daily_balance WHERE stream_id = %s ORDER BY day",
+                (str(stream_id),),
+            )
+            rows = cur.fetchall()
+    return [(row[0].strftime("%Y-%m-%d"), float(row[1]), row[2]) for row in rows]
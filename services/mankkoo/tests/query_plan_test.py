@@ -0,0 +1,195 @@
+import os
+import time
+
+import pytest
+
+import mankkoo.account.account_db as account_db
+import mankkoo.database as db
+import mankkoo.event_store as es
+import mankkoo.investment.investment_db as investment_db
+import mankkoo.views as views
+
+# set QUERY_PLAN_TEST_EVENTS=1000000 to check plans on a database of a realistic size
+events_count = int(os.getenv("QUERY_PLAN_TEST_EVENTS", "100000"))
+streams_count = 20000
+# most of streams are stocks, so filters of other types, wallets and labels are selective;
+# for others a planner may rightly prefer a seq scan of the streams table, so it's checked
+# only for selective lookups of a single stream
+selective_stream_lookups = {"es.get_stream_by_metadata"}
+
+
+class ExplainingCursor:
+    """Records a plan of each executed SELECT, before executing it."""
+
+    def __init__(self, cursor, plans: list):
+        self._cursor = cursor
+        self._plans = plans
+
+    def execute(self, query, params=None):
+        if query.lstrip().upper().startswith(("SELECT", "WITH")):
+            self._cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            self._plans.append((query, self._cursor.fetchone()[0][0]["Plan"]))
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return self._cursor.__exit__(*args)
+
+
+@pytest.fixture
+def plans(mocker):
+    plans = []
+    mocker.patch.object(
+        db.PooledConnection,
+        "cursor",
+        lambda conn, *args, **kwargs: ExplainingCursor(
+            conn.raw.cursor(*args, **kwargs), plans
+        ),
+        create=True,
+    )
+    return plans
+
+
+@pytest.fixture
+def seeded_database():
+    started_at = time.time()
+    db.execute(
+        """
+        INSERT INTO streams (id, type, subtype, name, bank, active, version, metadata, labels)
+        SELECT
+            gen_random_uuid(),
+            (ARRAY['account', 'investment', 'retirement', 'stocks'])[least(i %% 50, 3) + 1],
+            (ARRAY['savings', 'treasury_bonds', 'PPK', 'ETF'])[least(i %% 50, 3) + 1],
+            'Stream ' || i,
+            'Bank ' || (i %% 10),
+            i %% 7 != 0,
+            0,
+            jsonb_build_object('accountNumber', 'number-' || i, 'importer', 'PL_ING'),
+            jsonb_build_object(
+                'wallet', 'Wallet ' || (i %% 1000),
+                'include_in_wealth', CASE WHEN i %% 3 = 0 THEN 'false' ELSE 'true' END
+            )
+        FROM generate_series(0, %(streams)s - 1) AS i;
+
+        WITH numbered AS (
+            SELECT id, row_number() OVER (ORDER BY id) - 1 AS n FROM streams
+        )
+        INSERT INTO events (id, stream_id, type, data, version, occured_at)
+        SELECT
+            gen_random_uuid(),
+            s.id,
+            CASE WHEN i %% 3 = 0 THEN 'MoneyWithdrawn' ELSE 'MoneyDeposited' END,
+            jsonb_build_object('amount', i %% 100, 'balance', i, 'title', 'Operation ' || (i %% 50), 'currency', 'PLN'),
+            i / %(streams)s + 1,
+            timestamp '2015-01-01' + (i / %(streams)s) * interval '1 hour'
+        FROM generate_series(0, %(events)s - 1) AS i
+        JOIN numbered s ON s.n = i %% %(streams)s;
+
+        UPDATE streams s SET version = c.version
+        FROM (SELECT stream_id, max(version) AS version FROM events GROUP BY stream_id) c
+        WHERE c.stream_id = s.id;
+
+        ANALYZE;
+        """,
+        {"streams": streams_count, "events": events_count},
+    )
+    print(f"Seeded {events_count} events in {time.time() - started_at:.1f}s")
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM streams WHERE type = 'account' LIMIT 1;")
+            (stream_id,) = cur.fetchone()
+    return stream_id
+
+
+def test_hot_queries_use_indexes(seeded_database, plans):
+    # GIVEN
+    stream_id = seeded_database
+    hot_queries = {
+        "es.load": lambda: es.load(stream_id),
+        "es.load_stream_state": lambda: es.load_stream_state(stream_id),
+        "es.get_stream_by_metadata": lambda: es.get_stream_by_metadata(
+            "accountNumber", "number-42"
+        ),
+        "account_db.load_operations_for_account": lambda: account_db.load_operations_for_account(
+            stream_id
+        ),
+        "investment_db.load_investment_transactions": lambda: investment_db.load_investment_transactions(
+            stream_id
+        ),
+        "investment_db.load_investments": lambda: investment_db.load_investments(
+            True, "Wallet 3"
+        ),
+    }
+
+    # WHEN
+    not_indexed = {}
+    for name, run in hot_queries.items():
+        plans.clear()
+        run()
+        assert plans, f"{name} did not run any query"
+        checked = (
+            {"events", "streams"} if name in selective_stream_lookups else {"events"}
+        )
+        for query, plan in plans:
+            seq_scans = [
+                node["Relation Name"]
+                for node in __nodes(plan)
+                if node["Node Type"] == "Seq Scan" and node["Relation Name"] in checked
+            ]
+            if seq_scans:
+                not_indexed[name] = seq_scans
+
+    # THEN
+    assert not_indexed == {}
+
+
+def test_streams_are_filtered_with_indexes(seeded_database, plans):
+    # GIVEN
+    queries_by_index = {
+        "streams_type_active_idx": account_db.load_all_accounts,
+        "streams_in_wealth_idx": views.__load_current_total_savings,
+        "streams_labels_idx": lambda: investment_db.load_investments(None, "Wallet 3"),
+    }
+
+    # WHEN
+    used_indexes = {}
+    for index, run in queries_by_index.items():
+        plans.clear()
+        run()
+        used_indexes[index] = {
+            node.get("Index Name") for _, plan in plans for node in __nodes(plan)
+        }
+
+    # THEN
+    assert {
+        index: index in used for index, used in used_indexes.items()
+    } == dict.fromkeys(queries_by_index, True)
+
+
+def test_views_are_refreshed_without_reading_events(seeded_database, plans):
+    # WHEN
+    views.update_views(None)
+
+    # THEN
+    scanned = {
+        node["Relation Name"]
+        for _, plan in plans
+        for node in __nodes(plan)
+        if "Relation Name" in node
+    }
+    assert "events" not in scanned
+    assert views.load_view(views.main_indicators_key) is not None
+
+
+def __nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from __nodes(child)
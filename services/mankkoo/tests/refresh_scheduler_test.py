@@ -0,0 +1,179 @@
+import threading
+import time
+from datetime import date, datetime
+
+import mankkoo.refresh_scheduler as refresh_scheduler
+from mankkoo.refresh_scheduler import RefreshScheduler, parse_notification
+
+
+class RefreshSpy:
+    def __init__(self, duration: float = 0):
+        self.calls = []
+        self.stream_ids = []
+        self.duration = duration
+        self.started = threading.Event()
+
+    def __call__(self, from_date, stream_ids):
+        self.started.set()
+        time.sleep(self.duration)
+        self.calls.append(from_date)
+        self.stream_ids.append(stream_ids)
+
+
+def test_burst_of_notifications_is_coalesced_into_single_refresh_from_oldest_date():
+    # GIVEN
+    refresh = RefreshSpy()
+    scheduler = RefreshScheduler(refresh, quiet_period=0.2, max_delay=5)
+    scheduler.start()
+
+    # WHEN
+    for day in ["2024-03-10", "2024-01-15", "2024-02-01", "2024-01-20"]:
+        scheduler.submit(day)
+
+    # THEN
+    assert scheduler.wait_until_idle(timeout=5)
+    assert refresh.calls == [date(2024, 1, 15)]
+    assert scheduler.status()["lastCompleted"]["requests"] == 4
+
+
+def test_notification_without_date_triggers_full_refresh():
+    # GIVEN
+    refresh = RefreshSpy()
+    scheduler = RefreshScheduler(refresh, quiet_period=0.2, max_delay=5)
+    scheduler.start()
+
+    # WHEN
+    scheduler.submit("2024-01-15")
+    scheduler.submit("")
+    scheduler.submit("2024-01-01")
+
+    # THEN
+    assert scheduler.wait_until_idle(timeout=5)
+    assert refresh.calls == [None]
+
+
+def test_refresh_starts_after_max_delay_even_if_notifications_keep_coming():
+    # GIVEN
+    refresh = RefreshSpy()
+    scheduler = RefreshScheduler(refresh, quiet_period=0.3, max_delay=0.5)
+    scheduler.start()
+
+    # WHEN
+    started_at = time.monotonic()
+    while not refresh.started.is_set() and time.monotonic() - started_at < 3:
+        scheduler.submit("2024-01-15")
+        time.sleep(0.05)
+
+    # THEN
+    assert refresh.started.is_set()
+    assert time.monotonic() - started_at < 1.5
+
+
+def test_notifications_received_during_refresh_are_pending_until_it_finishes():
+    # GIVEN
+    refresh = RefreshSpy(duration=0.5)
+    scheduler = RefreshScheduler(refresh, quiet_period=0.05, max_delay=5)
+    scheduler.start()
+    scheduler.submit("2024-02-01")
+    assert refresh.started.wait(timeout=5)
+
+    # WHEN
+    scheduler.submit("2024-03-01")
+    status = scheduler.status()
+
+    # THEN
+    assert status["running"]["fromDate"] == "2024-02-01"
+    assert status["pending"]["fromDate"] == "2024-03-01"
+    assert scheduler.wait_until_idle(timeout=5)
+    assert refresh.calls == [date(2024, 2, 1), date(2024, 3, 1)]
+
+
+def test_failed_refresh_does_not_stop_the_scheduler():
+    # GIVEN
+    calls = []
+
+    def failing_refresh(from_date, stream_ids):
+        calls.append(from_date)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    scheduler = RefreshScheduler(failing_refresh, quiet_period=0.05, max_delay=5)
+    scheduler.start()
+
+    # WHEN
+    scheduler.submit("2024-01-01")
+    assert scheduler.wait_until_idle(timeout=5)
+    first_error = scheduler.status()["lastCompleted"]["error"]
+    scheduler.submit("2024-01-02")
+
+    # THEN
+    assert scheduler.wait_until_idle(timeout=5)
+    assert first_error == "boom"
+    assert scheduler.status()["lastCompleted"]["error"] is None
+    assert calls == [date(2024, 1, 1), date(2024, 1, 2)]
+
+
+def test_stream_ids_of_coalesced_notifications_are_merged():
+    # GIVEN
+    refresh = RefreshSpy()
+    scheduler = RefreshScheduler(refresh, quiet_period=0.2, max_delay=5)
+    scheduler.start()
+
+    # WHEN
+    scheduler.submit("2024-01-15", {"a"})
+    scheduler.submit("2024-01-10", {"b", "c"})
+
+    # THEN
+    assert scheduler.wait_until_idle(timeout=5)
+    assert refresh.calls == [date(2024, 1, 10)]
+    assert refresh.stream_ids == [{"a", "b", "c"}]
+
+
+def test_notification_without_stream_ids_affects_all_streams():
+    # GIVEN
+    refresh = RefreshSpy()
+    scheduler = RefreshScheduler(refresh, quiet_period=0.2, max_delay=5)
+    scheduler.start()
+
+    # WHEN
+    scheduler.submit("2024-01-15", {"a"})
+    scheduler.submit("2024-01-10", None)
+    scheduler.submit("2024-01-12", {"b"})
+
+    # THEN
+    assert scheduler.wait_until_idle(timeout=5)
+    assert refresh.stream_ids == [None]
+
+
+def test_notification_payload_is_parsed():
+    # WHEN
+    from_date, stream_ids = parse_notification(
+        '{"minOccuredAt": "2024-01-10T12:00:00", "maxOccuredAt": "2024-02-01T00:00:00", "streamIds": ["a", "b"]}'
+    )
+
+    # THEN
+    assert from_date == date(2024, 1, 10)
+    assert stream_ids == {"a", "b"}
+
+
+def test_legacy_notification_payload_with_date_only_is_parsed():
+    # WHEN
+    from_date, stream_ids = parse_notification("2024-01-10")
+
+    # THEN
+    assert from_date == date(2024, 1, 10)
+    assert stream_ids is None
+
+
+def test_dates_datetimes_and_iso_strings_are_converted_to_dates():
+    # WHEN
+    converted = [
+        refresh_scheduler.to_date(date(2024, 1, 10)),
+        refresh_scheduler.to_date(datetime(2024, 1, 10, 23, 59)),
+        refresh_scheduler.to_date("2024-01-10T12:00:00+00:00"),
+        refresh_scheduler.to_date("not a date"),
+        refresh_scheduler.to_date(None),
+    ]
+
+    # THEN
+    assert converted == [date(2024, 1, 10)] * 3 + [None, None]
@@ -0,0 +1,261 @@
+import threading
+
+import pytest
+
+import mankkoo.database as db
+import mankkoo.schema as schema
+
+# versions far above the real ones, so that test migrations don't clash with them
+test_version = 9000
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    yield tmp_path
+    db.execute(f"""
+        DELETE FROM schema_migrations WHERE version >= {test_version};
+        DROP TABLE IF EXISTS migration_test_a, migration_test_b;
+        """)
+
+
+def __write(directory, file_name: str, sql: str) -> None:
+    (directory / file_name).write_text(sql, encoding="utf-8")
+
+
+def __query(sql: str) -> list[tuple]:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            return cur.fetchall()
+
+
+def test_application_migrations_are_applied():
+    # WHEN
+    statuses = schema.status()
+
+    # THEN
+    assert [status["version"] for status in statuses] == [
+        migration.version for migration in schema.load_migrations()
+    ]
+    assert all(status["appliedAt"] is not None for status in statuses)
+    assert not any(status["changed"] for status in statuses)
+
+
+def test_pending_migrations_are_applied_in_order_and_only_once(migrations_dir):
+    # GIVEN
+    __write(
+        migrations_dir,
+        f"{test_version + 1}_insert_row.sql",
+        "INSERT INTO migration_test_a (value) VALUES ('second');",
+    )
+    __write(
+        migrations_dir,
+        f"{test_version}_create_table.sql",
+        "CREATE TABLE migration_test_a (value TEXT);",
+    )
+    __write(migrations_dir, "README.md", "not a migration")
+
+    # WHEN
+    first = schema.migrate(str(migrations_dir))
+    second = schema.migrate(str(migrations_dir))
+
+    # THEN
+    assert [migration.name for migration in first] == ["create_table", "insert_row"]
+    assert second == []
+    assert __query("SELECT value FROM migration_test_a;") == [("second",)]
+    assert __query(
+        f"SELECT version, name FROM schema_migrations WHERE version >= {test_version} ORDER BY version;"
+    ) == [(test_version, "create_table"), (test_version + 1, "insert_row")]
+
+
+def test_failed_migration_is_rolled_back_and_not_recorded(migrations_dir):
+    # GIVEN
+    __write(
+        migrations_dir,
+        f"{test_version}_broken.sql",
+        "CREATE TABLE migration_test_a (value TEXT);\nSELECT * FROM not_existing_table;",
+    )
+
+    # WHEN
+    with pytest.raises(Exception, match="not_existing_table"):
+        schema.migrate(str(migrations_dir))
+
+    # THEN
+    assert __query("SELECT to_regclass('migration_test_a');") == [(None,)]
+    assert (
+        __query(
+            f"SELECT version FROM schema_migrations WHERE version >= {test_version};"
+        )
+        == []
+    )
+
+
+def test_no_transaction_migration_creates_index_concurrently(migrations_dir):
+    # GIVEN
+    __write(
+        migrations_dir,
+        f"{test_version}_create_table.sql",
+        "CREATE TABLE migration_test_b (value TEXT);",
+    )
+    __write(
+        migrations_dir,
+        f"{test_version + 1}_create_index.sql",
+        """-- migration: no-transaction
+-- an index, which can't be created within a transaction block
+CREATE INDEX CONCURRENTLY IF NOT EXISTS migration_test_b_idx ON migration_test_b (value);
+
+-- a comment only
+""",
+    )
+
+    # WHEN
+    applied = schema.migrate(str(migrations_dir))
+
+    # THEN
+    assert [migration.transactional for migration in applied] == [True, False]
+    assert __query("SELECT to_regclass('migration_test_b_idx');") == [
+        ("migration_test_b_idx",)
+    ]
+
+
+def test_migration_changed_after_it_was_applied_is_reported(migrations_dir):
+    # GIVEN
+    __write(
+        migrations_dir,
+        f"{test_version}_create_table.sql",
+        "CREATE TABLE migration_test_a (value TEXT);",
+    )
+    schema.migrate(str(migrations_dir))
+    __write(
+        migrations_dir,
+        f"{test_version}_create_table.sql",
+        "CREATE TABLE migration_test_a (value INTEGER);",
+    )
+
+    # WHEN
+    with pytest.raises(schema.MigrationError, match=f"{test_version}_create_table"):
+        schema.migrate(str(migrations_dir))
+
+    # THEN
+    assert schema.status(str(migrations_dir))[0]["changed"] is True
+
+
+def test_migrations_with_the_same_version_are_rejected(migrations_dir):
+    # GIVEN
+    __write(migrations_dir, f"{test_version}_first.sql", "SELECT 1;")
+    __write(migrations_dir, f"{test_version}_second.sql", "SELECT 2;")
+
+    # WHEN
+    with pytest.raises(schema.MigrationError, match="the same version"):
+        schema.load_migrations(str(migrations_dir))
+
+
+def test_concurrent_replicas_apply_a_migration_once(migrations_dir):
+    # GIVEN
+    __write(
+        migrations_dir,
+        f"{test_version}_slow.sql",
+        """
+        CREATE TABLE IF NOT EXISTS migration_test_a (value TEXT);
+        SELECT pg_sleep(0.5);
+        INSERT INTO migration_test_a (value) VALUES ('applied');
+        """,
+    )
+    applied = []
+
+    def start_replica():
+        applied.append(schema.migrate(str(migrations_dir)))
+
+    # WHEN
+    replicas = [threading.Thread(target=start_replica) for _ in range(3)]
+    for replica in replicas:
+        replica.start()
+    for replica in replicas:
+        replica.join()
+
+    # THEN
+    assert sorted(len(migrations) for migrations in applied) == [0, 0, 1]
+    assert __query("SELECT value FROM migration_test_a;") == [("applied",)]
+
+
+def test_replica_waiting_for_the_lock_does_not_block_a_concurrent_index(
+    migrations_dir,
+):
+    # GIVEN
+    __write(
+        migrations_dir,
+        f"{test_version}_create_table.sql",
+        "CREATE TABLE migration_test_b (value TEXT);",
+    )
+    __write(
+        migrations_dir,
+        f"{test_version + 1}_create_index.sql",
+        """-- migration: no-transaction
+SELECT pg_sleep(1.5);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS migration_test_b_idx ON migration_test_b (value);
+""",
+    )
+    applied, errors = [], []
+
+    def start_replica():
+        try:
+            applied.append(schema.migrate(str(migrations_dir)))
+        except Exception as ex:
+            errors.append(ex)
+
+    # WHEN
+    replicas = [threading.Thread(target=start_replica) for _ in range(2)]
+    for replica in replicas:
+        replica.start()
+    for replica in replicas:
+        replica.join()
+
+    # THEN
+    assert errors == []
+    assert sorted(len(migrations) for migrations in applied) == [0, 2]
+    assert __query(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('migration_test_b_idx');"
+    ) == [(True,)]
+
+
+def test_invalid_index_left_by_a_failed_build_is_built_again(migrations_dir):
+    # GIVEN
+    db.execute("""
+        CREATE TABLE migration_test_b (value TEXT);
+        INSERT INTO migration_test_b (value) VALUES ('duplicate'), ('duplicate');
+        """)
+    __write(
+        migrations_dir,
+        f"{test_version}_create_index.sql",
+        """-- migration: no-transaction
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS migration_test_b_idx ON migration_test_b (value);
+""",
+    )
+    with pytest.raises(Exception, match="could not create unique index"):
+        schema.migrate(str(migrations_dir))
+    assert __query(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('migration_test_b_idx');"
+    ) == [(False,)]
+    db.execute("DELETE FROM migration_test_b;")
+
+    # WHEN
+    applied = schema.migrate(str(migrations_dir))
+
+    # THEN
+    assert [migration.name for migration in applied] == ["create_index"]
+    assert __query(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('migration_test_b_idx');"
+    ) == [(True,)]
+
+
+def test_statements_are_split_on_semicolons_ending_a_line():
+    # WHEN
+    statements = schema.split_statements("""
+        -- a comment
+        SELECT 'a;b';
+        SELECT 2 ;
+        -- a trailing comment
+        """)
+
+    # THEN
+    assert statements == ["-- a comment\n        SELECT 'a;b'", "SELECT 2"]
@@ -1,9 +1,12 @@
+import json
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import mankkoo.app as app
 import mankkoo.data_for_test as dt
+import mankkoo.database as db
 import mankkoo.event_store as es
 import mankkoo.views as views
 
@@ -58,6 +61,116 @@ def test_view_is_not_loaded_if_incorrect_name_was_provided():
     assert views.load_view("invalid-view-name") is None
 
 
+def test_shared_input_is_loaded_once_per_refresh():
+    # GIVEN
+    calls = []
+
+    def load_input():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    context = views.RefreshContext(None, {"some-input": load_input})
+
+    # WHEN
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: context.get("some-input"), range(4)))
+
+    # THEN
+    assert results == [42, 42, 42, 42]
+    assert len(calls) == 1
+    assert "some-input" in context.timings()
+
+
+def test_only_views_fed_by_affected_streams_are_refreshed():
+    # GIVEN
+    es.create([checking_events["stream"]])
+    es.store(checking_events["events"])
+
+    # WHEN
+    views.update_views(None, {str(checking_events["stream"].id)})
+
+    # THEN
+    refresh = views.last_refresh()
+    assert set(refresh["views"]) == {
+        views.main_indicators_key,
+        views.current_savings_distribution_key,
+        views.total_history_per_day_key,
+        views.monthly_income_key,
+    }
+    assert set(refresh["skipped"]) == {
+        views.investment_indicators_key,
+        views.investment_types_distribution_key,
+        views.investment_wallets_distribution_key,
+        views.investment_types_distribution_per_wallet_key,
+    }
+
+
+def test_stream_excluded_from_wealth_refreshes_only_wallet_views():
+    # GIVEN
+    excluded_stocks = dt.stock_events(stock_operations, include_in_wealth=False)
+    es.create([excluded_stocks["stream"]])
+    es.store(excluded_stocks["events"])
+
+    # WHEN
+    views.update_views(None, {str(excluded_stocks["stream"].id)})
+
+    # THEN
+    assert set(views.last_refresh()["views"]) == {
+        views.investment_wallets_distribution_key,
+        views.investment_types_distribution_per_wallet_key,
+    }
+
+
+def test_all_views_are_refreshed_if_affected_stream_is_not_known():
+    # WHEN
+    views.update_views(None, {str(uuid.uuid4())})
+
+    # THEN
+    refresh = views.last_refresh()
+    assert refresh["skipped"] == []
+    assert len(refresh["views"]) == 8
+
+
+def test_view_is_loaded_once_until_it_is_invalidated():
+    # GIVEN
+    calls = []
+
+    def loader(view_name):
+        calls.append(view_name)
+        return views.CachedView(
+            view_name, json.dumps({"value": len(calls)}).encode(), None, datetime.now()
+        )
+
+    cache = views.ViewCache(ttl=60)
+
+    # WHEN
+    first = cache.get("some-view", loader)
+    second = cache.get("some-view", loader)
+    cache.invalidate("some-view")
+    third = cache.get("some-view", loader)
+
+    # THEN
+    assert first is second
+    assert third.content == {"value": 2}
+    assert calls == ["some-view", "some-view"]
+
+
+def test_view_invalidated_while_loading_is_not_cached():
+    # GIVEN
+    cache = views.ViewCache(ttl=60)
+
+    def loader(view_name):
+        cache.invalidate()
+        return views.CachedView(view_name, b"{}", None, datetime.now())
+
+    # WHEN
+    cache.get("some-view", loader)
+
+    # THEN
+    assert cache.get("some-view", lambda name: None) is None
+
+
 def test_main_indicators_view_is_updated():
     # GIVEN
     app.start_listener_thread()
@@ -150,6 +263,117 @@ def test_total_history_per_day_is_updated():
     )
 
 
+def test_total_history_per_day_is_recomputed_only_from_notified_date():
+    # GIVEN
+    app.start_listener_thread()
+    __store_events()
+
+    def full_history_is_stored():
+        result = views.load_view(views.total_history_per_day_key)
+        return result is not None and len(result["date"]) == 9
+
+    __wait_for_condition(condition_func=full_history_is_stored, timeout=10, interval=1)
+
+    stored_history = views.load_view(views.total_history_per_day_key)
+    stored_history["total"] = [-1 for _ in stored_history["total"]]
+    db.execute(
+        "UPDATE views SET content = %s::jsonb WHERE name = %s",
+        (json.dumps(stored_history), views.total_history_per_day_key),
+    )
+
+    # WHEN
+    views.update_views("2021-01-05")
+
+    # THEN
+    result = views.load_view(views.total_history_per_day_key)
+    assert result["date"] == stored_history["date"]
+    assert result["total"] == [
+        1004.78,
+        1004.78,
+        1004.78,
+        1004.78,
+        1004.78,
+        -1,
+        -1,
+        -1,
+        -1,
+    ]
+
+
+def test_total_history_per_day_includes_back_dated_events():
+    # GIVEN
+    app.start_listener_thread()
+    __store_events()
+
+    def full_history_is_stored():
+        result = views.load_view(views.total_history_per_day_key)
+        return result is not None and len(result["date"]) == 9
+
+    __wait_for_condition(condition_func=full_history_is_stored, timeout=10, interval=1)
+
+    # WHEN
+    back_dated_account = dt.an_account_with_operations(
+        [{"date": "03-01-2021", "operation": 100}]
+    )
+    es.create([back_dated_account["stream"]])
+    es.store(back_dated_account["events"])
+
+    # THEN
+    def back_dated_event_is_included():
+        result = views.load_view(views.total_history_per_day_key)
+        return result["total"] == [
+            1104.78,
+            1104.78,
+            1104.78,
+            1104.78,
+            1104.78,
+            1245.78,
+            1100,
+            1000,
+            0,
+        ]
+
+    __wait_for_condition(
+        condition_func=back_dated_event_is_included, timeout=10, interval=1
+    )
+
+
+def test_total_history_per_day_includes_back_dated_events_of_existing_stream():
+    # GIVEN
+    stream_id = uuid.uuid4()
+    es.create(
+        [es.Stream(stream_id, "account", "savings", "Savings", "Bank", True, 0, {})]
+    )
+    es.store(
+        [
+            __deposit(stream_id, 100, "2021-01-01", 1),
+            __deposit(stream_id, 150, "2021-01-05", 2),
+        ]
+    )
+    views.update_views(None)
+
+    # WHEN
+    es.store([__deposit(stream_id, 160, "2021-01-03", 3)])
+    views.update_views("2021-01-03")
+
+    # THEN
+    result = views.load_view(views.total_history_per_day_key)
+    assert result["date"][0] == "2021-01-05"
+    assert result["total"] == [160, 160, 160, 100, 100]
+    assert views.load_view(views.main_indicators_key)["savings"] == 160
+
+
+def __deposit(stream_id, balance: float, day: str, version: int) -> es.Event:
+    return es.Event(
+        "account",
+        stream_id,
+        "MoneyDeposited",
+        {"amount": 10, "balance": balance, "currency": "PLN"},
+        datetime.fromisoformat(day),
+        version,
+    )
+
+
 def test_investment_types_distribution_view_is_updated():
     # GIVEN
     app.start_listener_thread()